@@ -0,0 +1,55 @@
+import argparse
+import os
+import sys; sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pandas as pd
+from torinax.benchmarks import run_benchmarks, save_results, load_history, compare_results, last_run, check_import_times, check_memory_bound
+
+if __name__ == "__main__":
+    # making command line input parser
+    parser = argparse.ArgumentParser("A script for benchmarking the file parsers and input writers on synthetic files")
+    parser.add_argument("--size", type=str, default="small", help="(str) size of the files and directory trees (small, medium or large). default=small")
+    parser.add_argument("--repeats", type=int, default=3, help="(int) number of timed runs of every benchmark. default=3")
+    parser.add_argument("--only", type=str, default=None, help="(str) run only benchmarks with this text in their name")
+    parser.add_argument("--history", type=str, default="benchmarks.jsonl", help="(str) history file of the benchmark runs. default=benchmarks.jsonl")
+    parser.add_argument("--label", type=str, default=None, help="(str) label of the run in the history")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="(float) allowed relative slowdown from the last run. default=0.2")
+    parser.add_argument("--memory_tolerance", type=float, default=0.2, help="(float) allowed relative peak memory growth from the last run. default=0.2")
+    parser.add_argument("--no_save", action="store_true", help="Don't add the run to the history")
+    parser.add_argument("--no_memory", action="store_true", help="Don't check that the peak memory of the parsers is bounded by their chunk size")
+    parser.add_argument("--no_imports", action="store_true", help="Don't check the import time budgets of the package and the parsers")
+    # setting user variables
+    args = parser.parse_args()
+    previous = last_run(load_history(args.history), args.size)
+    results = run_benchmarks(args.size, args.repeats, args.only)
+    with pd.option_context("display.width", 200, "display.max_columns", 10):
+        print(pd.DataFrame(results).round(3).to_string(index=False))
+    if not args.no_save:
+        save_results(results, args.history, args.size, args.label)
+    failed = False
+    # flagging regressions from the last run of the same size
+    if previous is not None:
+        regressions = compare_results(results, previous["results"], args.tolerance, args.memory_tolerance)
+        if len(regressions) > 0:
+            print("\nREGRESSIONS from the run of commit {}:".format(previous.get("commit")))
+            print(pd.DataFrame(regressions).round(3).to_string(index=False))
+            failed = True
+        else:
+            print("\nno regressions from the run of commit {}".format(previous.get("commit")))
+    # flagging parsers whose peak memory grows with the file size
+    if not args.no_memory:
+        memory = check_memory_bound()
+        print("\npeak memory of parsing (small and large files):")
+        print(pd.DataFrame(memory).round(3).to_string(index=False))
+        if not all(res["within_bound"] for res in memory):
+            print("\nMEMORY BOUND EXCEEDED")
+            failed = True
+    # flagging modules that import slower than their budget
+    if not args.no_imports:
+        imports = check_import_times()
+        print("\nimport times:")
+        print(pd.DataFrame(imports).round(3).to_string(index=False))
+        if not all(res["within_budget"] for res in imports):
+            print("\nIMPORT TIME BUDGETS EXCEEDED")
+            failed = True
+    if failed:
+        sys.exit(1)
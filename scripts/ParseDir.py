@@ -5,6 +5,9 @@ import sys; sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__fi
 from torinax.DirParser import DirParser
 
 def get_type_from_str(type_str):
+    # files of several programs, each file is parsed by the parser that matches its content
+    if type_str == "auto":
+        return None
     try:
         pkg = import_module("torinax.io.{}".format(type_str, type_str))
         return getattr(pkg, type_str)
@@ -15,9 +18,14 @@ if __name__ == "__main__":
     # making command line input parser
     parser = argparse.ArgumentParser("A script for parsing an out directory")
     parser.add_argument("directoryPath", type=str, help="The path to the directory with files to parse")
-    parser.add_argument("fileType", type=str, help="The name of the type of of the files in the directory. Must have same name as io object")
+    parser.add_argument("fileType", type=str, help="The name of the type of of the files in the directory. Must have same name as io object, or auto for directories with files of several programs")
     parser.add_argument("--create_mol_files", type=bool, default=False, help="(bool) Create a directory with molecule files (xyz, cif...)")
     parser.add_argument("--mol_file_ext", type=str, default="xyz", help="(str) molecule file extension. default=xyz")
+    parser.add_argument("--n_workers", type=int, default=1, help="(int) number of worker processes for parsing files. default=1")
+    parser.add_argument("--no_cache", action="store_true", help="Parse all files, without using the parse cache in the directory")
+    parser.add_argument("--prune_cache", action="store_true", help="Remove cache entries of deleted files and of other versions of the parsers before parsing")
+    parser.add_argument("--output", type=str, default="results.csv", help="(str) name of the output table in the directory (.csv, .arrow or .parquet). default=results.csv")
+    parser.add_argument("--chunk_rows", type=int, default=10000, help="(int) number of rows written to the output at once. default=10000")
     # setting user variables
     args = parser.parse_args()
     path = args.directoryPath
@@ -25,8 +33,10 @@ if __name__ == "__main__":
     make_mol_files = args.create_mol_files
     # reading information from directory
     dir_parser = DirParser(file_parser)
-    dir_parser.read_data(path)
-    dir_parser.to_csv(os.path.join(path, "results.csv"))
-    if make_mol_files:
-        dir_parser.save_species(path, args.mol_file_ext)
+    if args.prune_cache:
+        dir_parser.prune_cache(path)
+    # scalar data and species are read in a single pass over each file, rows are streamed to the output in chunks
+    species_ext = args.mol_file_ext if make_mol_files else None
+    dir_parser.export_data(path, os.path.join(path, args.output), chunk_rows=args.chunk_rows, n_workers=args.n_workers,
+                            cache=not args.no_cache, species_ext=species_ext)
     
\ No newline at end of file
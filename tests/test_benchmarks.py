@@ -0,0 +1,27 @@
+import os
+import sys
+import pytest
+from subprocess import run
+from torinax.benchmarks import check_memory_bound
+
+# the package root, imported by the fresh interpreters
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "pyarrow", "dask", "pymatgen"]
+
+
+def test_parsing_memory_is_bounded_by_chunk_size():
+    results = check_memory_bound()
+    # the large files are larger than the bound, so reading a whole file would fail the check
+    assert any(res["bytes"] > res["bound_mb"] * 1e6 for res in results)
+    over = [res for res in results if not res["within_bound"]]
+    assert over == []
+
+
+@pytest.mark.parametrize("module", ["torinax", "torinax.io", "torinax.io.OrcaOut", "torinax.io.MopacOut", "torinax.io.QeOut"])
+def test_imports_are_light(module):
+    # the import time budgets are checked by scripts/Benchmark.py, here only the heavy dependencies are checked (in a fresh interpreter)
+    code = "import sys; import {}; print(' '.join(m for m in {!r} if m in sys.modules))".format(module, HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")]))
+    out = run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == []
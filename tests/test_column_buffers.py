@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+from torinax.ColumnBuffers import ColumnBuffers
+from torinax.DirParser import DirParser
+from torinax.benchmarks import write_tree
+from torinax.io import MopacOut, OrcaOut
+
+SCHEMA = {"energy": "float64", "converged": "boolean", "n_electrons": "Int64", "dir": "category", "name": "string", "extra": "object"}
+
+
+def test_dtypes_and_null_masks():
+    columns = ColumnBuffers(SCHEMA)
+    columns.append({"energy": 1.5, "converged": True, "n_electrons": 10, "dir": "a", "name": "x", "extra": [1]})
+    columns.append({"energy": None, "converged": None, "n_electrons": None, "dir": None, "name": None, "extra": None})
+    columns.append({"energy": 2, "converged": False, "n_electrons": 12, "dir": "b", "name": "y", "extra": "z"})
+    df = columns.to_frame()
+    assert len(columns) == 3
+    assert {name: str(dtype) for name, dtype in df.dtypes.items()} == SCHEMA
+    assert df["energy"].isna().tolist() == [False, True, False]
+    assert df["energy"].iloc[2] == 2.0
+    # missing values of boolean and integer columns are masked, not converted to floats
+    assert df["converged"].isna().tolist() == [False, True, False]
+    assert df["converged"].dropna().tolist() == [True, False]
+    assert df["n_electrons"].isna().tolist() == [False, True, False]
+    assert df["n_electrons"].dropna().tolist() == [10, 12]
+    assert df["dir"].cat.categories.tolist() == ["a", "b"]
+    assert df["dir"].isna().tolist() == [False, True, False]
+    assert df["name"].isna().tolist() == [False, True, False]
+    assert df["extra"].tolist() == [[1], None, "z"]
+
+
+def test_columns_order_and_late_columns():
+    columns = ColumnBuffers({"energy": "float64", "converged": "boolean"})
+    columns.append({"converged": True})
+    # columns that appear late have missing values in the earlier rows, columns not in the schema are inferred
+    columns.append({"energy": 1.0, "other": 3})
+    df = columns.to_frame()
+    assert list(df.columns) == ["converged", "energy", "other"]
+    assert df["energy"].isna().tolist() == [True, False]
+    assert df["converged"].isna().tolist() == [False, True]
+    assert df["other"].isna().tolist() == [True, False]
+    # with all_columns, the columns of the schema are made up front
+    columns = ColumnBuffers({"energy": "float64", "converged": "boolean"}, all_columns=True)
+    columns.append({"converged": True})
+    assert list(columns.to_frame().columns) == ["energy", "converged"]
+    assert ColumnBuffers(SCHEMA).to_frame().empty
+
+
+def test_bad_dtypes_and_values():
+    with pytest.raises(ValueError):
+        ColumnBuffers({"energy": "float32"})
+    columns = ColumnBuffers({"energy": "float64"})
+    with pytest.raises(ValueError):
+        columns.append({"energy": "not a number"})
+
+
+def test_dir_parser_schema(tmp_path):
+    write_tree(str(tmp_path / "orca"), "orca", 2, n_atoms=4, n_steps=1)
+    write_tree(str(tmp_path / "mopac"), "mopac", 2, n_atoms=4, n_steps=1)
+    df = DirParser(OrcaOut).read_data(str(tmp_path / "orca"))
+    assert {name: str(dtype) for name, dtype in df.dtypes.items()} == DirParser(OrcaOut).schema
+    assert DirParser(OrcaOut).schema == dict(OrcaOut.schema, dir="category", name="string")
+    # mixed directories have the columns of all parsers, with the dtypes of the parsers
+    parser = DirParser([OrcaOut, MopacOut])
+    df = parser.read_data(str(tmp_path))
+    dtypes = {name: str(dtype) for name, dtype in df.dtypes.items()}
+    for name, dtype in dtypes.items():
+        assert parser.schema[name] == dtype
+    assert parser.schema["runtime"] == "float64"
+    assert parser.schema["program"] == "category"
+    assert sorted(df["program"].cat.categories) == ["mopac", "orca"]
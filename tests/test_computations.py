@@ -0,0 +1,280 @@
+import os
+import pytest
+from sqlalchemy import Column, Float, String, create_engine, event
+from sqlalchemy.orm import sessionmaker
+from torinax.pipelines import SqlBase
+from torinax.clients import LocalClient
+from torinax.pipelines.database import make_sqlite_engine
+from torinax.pipelines.computations import Computation, ComputationCheckpoint, DaskComputation, SlurmComputation, run_computations
+
+
+class BulkComputation (Computation):
+
+    tablename = "test_bulk"
+    name = "bulk"
+    bulk_insert = True
+    __results_columns__ = {"id": Column(String, primary_key=True), "value": Column(Float)}
+
+    def execute(self, db_session):
+        # one object is added to the session by the computation, the other is only returned
+        added = self.sql_model(id="added", value=1.0)
+        db_session.add(added)
+        return [added, self.sql_model(id="returned", value=2.0)]
+
+
+class SourceComputation (Computation):
+
+    tablename = "test_source"
+    name = "source"
+    reads = []
+    __results_columns__ = {"id": Column(String, primary_key=True), "value": Column(Float)}
+
+    def execute(self, db_session):
+        return [self.sql_model(id="a", value=1.0)]
+
+
+class DoubleComputation (Computation):
+
+    tablename = "test_double"
+    name = "double"
+    reads = ["test_source"]
+    __results_columns__ = {"id": Column(String, primary_key=True), "value": Column(Float)}
+
+    def execute(self, db_session):
+        return [self.sql_model(id=row.id, value=2 * row.value) for row in db_session.query(SourceComputation().sql_model)]
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    SqlBase.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_bulk_insert_of_pending_objects():
+    comp = BulkComputation()
+    session = make_session()
+    comp._execute(session)
+    assert sorted((row.id, row.value) for row in session.query(comp.sql_model)) == [("added", 1.0), ("returned", 2.0)]
+
+
+def test_bulk_insert_rejects_unknown_columns():
+    comp = BulkComputation()
+    with pytest.raises(ValueError):
+        comp.save_entries(make_session(), [{"id": "a", "unknown": 1.0}])
+
+
+def test_run_computations_in_memory_session():
+    # an in-memory database is visible only to its connection, computations must run in the given session
+    session = make_session()
+    double = DoubleComputation()
+    run_computations([SourceComputation(), double], db_session=session, verbose=0)
+    assert [(row.id, row.value) for row in session.query(double.sql_model)] == [("a", 2.0)]
+
+
+def test_run_computations_in_memory_engine():
+    engine = create_engine("sqlite://")
+    double = DoubleComputation()
+    run_computations([SourceComputation(), double], db_engine=engine, verbose=0)
+    assert sessionmaker(bind=engine)().query(double.sql_model).count() == 1
+
+
+def test_run_computations_with_session_factory(tmp_path):
+    # computations run concurrently, each in a new session of the factory
+    engine = make_sqlite_engine(str(tmp_path / "pipeline.sqlite"))
+    double = DoubleComputation()
+    run_computations([SourceComputation(), double], db_session=sessionmaker(bind=engine), verbose=0)
+    assert sessionmaker(bind=engine)().query(double.sql_model).count() == 1
+
+
+class CommandComputation (SlurmComputation):
+
+    """Runs one command per entry, the command of the "retried" entry fails until the flag file exists"""
+
+    tablename = "test_commands"
+    name = "commands"
+    __results_columns__ = {"id": Column(String, primary_key=True)}
+
+    def __init__(self, flag_path: str):
+        self.flag_path = flag_path
+        super().__init__(LocalClient(n_workers=2))
+
+    def make_cmd_list(self, db_session):
+        return [{"id": "ok"}, {"id": "retried"}], ["true", "test -f {}".format(self.flag_path)]
+
+
+def test_resume_retries_failed_commands(tmp_path):
+    db_path = str(tmp_path / "pipeline.sqlite")
+    flag_path = str(tmp_path / "flag")
+    comp = CommandComputation(flag_path)
+    run_computations([comp], db_path=db_path, verbose=0)
+    session = sessionmaker(bind=create_engine("sqlite:///{}".format(db_path)))()
+    # the failed entry isn't saved and the computation isn't done
+    assert [row.id for row in session.query(comp.sql_model)] == ["ok"]
+    assert session.query(ComputationCheckpoint).get("test_commands").status == "incomplete"
+    open(flag_path, "w").close()
+    run_computations([CommandComputation(flag_path)], db_path=db_path, verbose=0, resume=True)
+    session.expire_all()
+    assert sorted(row.id for row in session.query(comp.sql_model)) == ["ok", "retried"]
+    assert session.query(ComputationCheckpoint).get("test_commands").status == "done"
+
+
+class BundledComputation (SlurmComputation):
+
+    """Runs a single command for all entries (entries and commands are not 1:1)"""
+
+    tablename = "test_bundled"
+    name = "bundled"
+    __results_columns__ = {"id": Column(String, primary_key=True)}
+
+    def __init__(self, n_entries: int):
+        self.n_entries = n_entries
+        super().__init__(LocalClient())
+
+    def make_cmd_list(self, db_session):
+        return [{"id": str(i)} for i in range(self.n_entries)], ["true"]
+
+
+def test_resume_skips_saved_rows(tmp_path):
+    db_path = str(tmp_path / "pipeline.sqlite")
+    run_computations([BundledComputation(1)], db_path=db_path, verbose=0)
+    session = sessionmaker(bind=create_engine("sqlite:///{}".format(db_path)))()
+    session.query(ComputationCheckpoint).update({"status": "incomplete"})
+    session.commit()
+    # the saved row is not inserted again
+    comp = BundledComputation(3)
+    run_computations([comp], db_path=db_path, verbose=0, resume=True)
+    assert session.query(comp.sql_model).count() == 3
+
+
+class SharedClientComputation (SlurmComputation):
+
+    """Independent computation (reads no tables) running one command per entry"""
+
+    reads = []
+
+    def __init__(self, tablename: str, client: LocalClient, cmd: str):
+        self.tablename = tablename
+        self.name = tablename
+        self.__results_columns__ = {"id": Column(String, primary_key=True)}
+        self.cmd = cmd
+        super().__init__(client)
+
+    def make_cmd_list(self, db_session):
+        return [{"id": "{}{}".format(self.tablename, i)} for i in range(3)], [self.cmd] * 3
+
+
+def test_computations_sharing_a_client(tmp_path):
+    db_path = str(tmp_path / "pipeline.sqlite")
+    client = LocalClient(n_workers=4)
+    good = SharedClientComputation("test_shared_good", client, "sleep 0.2")
+    bad = SharedClientComputation("test_shared_bad", client, "false")
+    run_computations([good, bad], db_path=db_path, verbose=0)
+    session = sessionmaker(bind=create_engine("sqlite:///{}".format(db_path)))()
+    # every computation gets the results of its own commands
+    assert session.query(good.sql_model).count() == 3
+    assert session.query(bad.sql_model).count() == 0
+    assert session.query(ComputationCheckpoint).get("test_shared_good").status == "done"
+    assert session.query(ComputationCheckpoint).get("test_shared_bad").status == "incomplete"
+
+
+class PartialResultsClient (LocalClient):
+
+    """Local client that loses the result of the first command (like a task whose status file is missing)"""
+
+    def wait(self, timeout=None):
+        states = super().wait(timeout)
+        self.command_results = self.command_results[1:]
+        return states
+
+
+class PartialComputation (SlurmComputation):
+
+    tablename = "test_partial"
+    name = "partial"
+    __results_columns__ = {"id": Column(String, primary_key=True)}
+
+    def make_cmd_list(self, db_session):
+        return [{"id": "lost"}, {"id": "ok"}, {"id": "failed"}], ["true", "exit 0", "exit 1"]
+
+
+def test_unmatched_results_save_only_attributed_successes(tmp_path):
+    db_path = str(tmp_path / "pipeline.sqlite")
+    comp = PartialComputation(PartialResultsClient())
+    run_computations([comp], db_path=db_path, verbose=0)
+    session = sessionmaker(bind=create_engine("sqlite:///{}".format(db_path)))()
+    # the entry of the lost result runs again on resume
+    assert [row.id for row in session.query(comp.sql_model)] == ["ok"]
+    assert not comp.successful
+
+
+def square(i: int) -> dict:
+    if i == 3:
+        raise ValueError("bad task")
+    return {"id": str(i), "value": float(i * i)}
+
+
+class SquaresComputation (DaskComputation):
+
+    """Squares of 0-9, the task of 3 fails. Records the number of tasks on the cluster when every task is submitted"""
+
+    tablename = "test_squares"
+    name = "squares"
+    batch_size = 3
+    __results_columns__ = {"id": Column(String, primary_key=True), "value": Column(Float)}
+
+    def __init__(self, dask_client, **kwargs):
+        super().__init__(dask_client, **kwargs)
+        self.in_flight = []
+        self.n_finished = 0
+
+    def _iter_completed(self, tasks):
+        for result in super()._iter_completed(tasks):
+            self.n_finished += 1
+            yield result
+
+    def make_futures(self, db_session):
+        import dask
+        for i in range(10):
+            self.in_flight.append(i - self.n_finished - len(self.failed_tasks))
+            yield dask.delayed(square)(i)
+
+
+class SquaresObjectsComputation (DaskComputation):
+
+    """Squares of 4-9, saved as ORM objects"""
+
+    tablename = "test_squares_objects"
+    name = "squares_objects"
+    bulk_insert = False
+    __results_columns__ = {"id": Column(String, primary_key=True), "value": Column(Float)}
+
+    def make_futures(self, db_session):
+        import dask
+        return [dask.delayed(square)(i) for i in range(4, 10)]
+
+
+def test_dask_computation_as_completed():
+    distributed = pytest.importorskip("distributed")
+    session = make_session()
+    commits = []
+    event.listen(session, "after_commit", commits.append)
+    with distributed.LocalCluster(n_workers=1, processes=False) as cluster, distributed.Client(cluster) as client:
+        comp = SquaresComputation(client, as_completed=True, max_in_flight=2)
+        comp._execute(session)
+    assert max(comp.in_flight) < 2
+    # results are saved in batches as they finish, the failed task is recorded
+    assert sorted(row.value for row in session.query(comp.sql_model)) == [i * i for i in range(10) if not i == 3]
+    assert len(commits) >= 3
+    assert [i for i, _ in comp.failed_tasks] == [3]
+    assert not comp.successful
+
+
+def test_dask_computation_without_bulk_insert():
+    pytest.importorskip("dask")
+    session = make_session()
+    comp = SquaresObjectsComputation(None)
+    # results are added to the session as ORM objects
+    entries = comp.execute(session)
+    assert all(isinstance(entry, comp.sql_model) for entry in entries)
+    comp._execute(session)
+    assert sorted(row.value for row in session.query(comp.sql_model)) == [i * i for i in range(4, 10)]
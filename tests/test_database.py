@@ -0,0 +1,45 @@
+import threading
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool, StaticPool
+from torinax.pipelines.database import make_sqlite_engine, sqlite_url
+
+
+def pragma(connection, name: str):
+    return connection.execute(text("PRAGMA {}".format(name))).scalar()
+
+
+def test_pragmas(tmp_path):
+    engine = make_sqlite_engine(str(tmp_path / "db.sqlite"), busy_timeout=5, synchronous="full", cache_size_mb=8, mmap_size_mb=16)
+    assert isinstance(engine.pool, QueuePool)
+    with engine.connect() as connection:
+        assert pragma(connection, "journal_mode") == "wal"
+        # FULL
+        assert pragma(connection, "synchronous") == 2
+        assert pragma(connection, "busy_timeout") == 5000
+        assert pragma(connection, "cache_size") == -8 * 1024
+        assert pragma(connection, "mmap_size") == 16 * 1024 * 1024
+        # MEMORY
+        assert pragma(connection, "temp_store") == 2
+    with pytest.raises(ValueError):
+        make_sqlite_engine(str(tmp_path / "db.sqlite"), synchronous="fast")
+
+
+def test_memory_database_is_shared_by_threads():
+    engine = make_sqlite_engine(":memory:")
+    assert sqlite_url(":memory:") == "sqlite://"
+    assert isinstance(engine.pool, StaticPool)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE t (x INTEGER)"))
+        connection.execute(text("INSERT INTO t VALUES (1)"))
+    # a new connection in another thread sees the same database
+    counts = []
+
+    def count():
+        with engine.connect() as connection:
+            counts.append(connection.execute(text("SELECT COUNT(*) FROM t")).scalar())
+
+    thread = threading.Thread(target=count)
+    thread.start()
+    thread.join()
+    assert counts == [1]
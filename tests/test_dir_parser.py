@@ -0,0 +1,84 @@
+import os
+import importlib
+import pandas as pd
+from torinax.DirParser import DirParser
+from torinax.benchmarks import write_tree
+from torinax.io import MopacOut, OrcaOut, QeOut, sniff_parser
+
+# the module (torinax.DirParser is the class)
+dir_parser_module = importlib.import_module("torinax.DirParser")
+
+
+def write_mixed_tree(root: str):
+    write_tree(os.path.join(root, "orca"), "orca", 3, n_atoms=5, n_steps=2)
+    write_tree(os.path.join(root, "mopac"), "mopac", 3, n_atoms=5, n_steps=2)
+    # files of no known program are skipped
+    with open(os.path.join(root, "unknown.out"), "w") as f:
+        f.write("not an output file\n")
+
+
+def test_sniff_parser(tmp_path):
+    paths = {parser: write_tree(str(tmp_path / program), program, 1, n_atoms=4, n_steps=1)[0]
+             for program, parser in (("orca", OrcaOut), ("mopac", MopacOut), ("qe", QeOut))}
+    for parser, path in paths.items():
+        assert sniff_parser(path) is parser
+
+
+def test_read_mixed_directory(tmp_path):
+    write_mixed_tree(str(tmp_path))
+    df = DirParser().read_data(str(tmp_path))
+    assert sorted(df["program"].tolist()) == ["mopac"] * 3 + ["orca"] * 3
+    assert df.loc[df["program"] == "orca", "final_energy"].notna().all()
+    assert df.loc[df["program"] == "mopac", "final_energy"].isna().all()
+
+
+def test_export_mixed_directory_in_chunks(tmp_path):
+    write_mixed_tree(str(tmp_path))
+    out_path = str(tmp_path / "results.csv")
+    # chunks of files of a single program still have the columns of both programs
+    n_rows = DirParser().export_data(str(tmp_path), out_path, chunk_rows=2)
+    df = pd.read_csv(out_path)
+    assert n_rows == len(df) == 6
+    assert set(DirParser().schema) == set(df.columns)
+
+
+def test_parallel_read_equals_serial(tmp_path):
+    write_tree(str(tmp_path), "orca", 12, n_dirs=3, n_atoms=5, n_steps=2)
+    serial = DirParser(OrcaOut).read_data(str(tmp_path))
+    assert len(serial) == 12
+    for n_workers, chunksize in ((2, None), (3, 1)):
+        df = DirParser(OrcaOut).read_data(str(tmp_path), n_workers=n_workers, chunksize=chunksize)
+        pd.testing.assert_frame_equal(df, serial)
+    # files of several programs, read by the parsers of their programs
+    write_mixed_tree(str(tmp_path / "mixed"))
+    pd.testing.assert_frame_equal(DirParser().read_data(str(tmp_path / "mixed"), n_workers=2), DirParser().read_data(str(tmp_path / "mixed")))
+
+
+def test_parallel_species_equal_serial(tmp_path):
+    paths = write_tree(str(tmp_path), "orca", 6, n_dirs=2, n_atoms=5, n_steps=2)
+    species = [str(tmp_path / "molecule_files" / os.path.basename(path).replace(".out", ".xyz")) for path in paths]
+    DirParser(OrcaOut).read_data(str(tmp_path), species_ext="xyz")
+    serial = [open(path).read() for path in species]
+    for path in species:
+        os.remove(path)
+    DirParser(OrcaOut).read_data(str(tmp_path), species_ext="xyz", n_workers=2)
+    assert [open(path).read() for path in species] == serial
+
+
+def test_mixed_files_are_sniffed_by_workers(tmp_path, monkeypatch):
+    write_mixed_tree(str(tmp_path))
+    parser = DirParser([OrcaOut, MopacOut])
+    # files are listed by extension, without reading them
+    monkeypatch.setattr(dir_parser_module, "sniff_parser", None)
+    files = parser._list_files(str(tmp_path))
+    assert len(files) == 7
+    assert all(candidates == (OrcaOut, MopacOut) for _, _, candidates in files)
+    monkeypatch.undo()
+    # the unknown file is dropped where it is read, also with the cache
+    expected = parser.read_data(str(tmp_path))
+    assert len(expected) == 6
+    pd.testing.assert_frame_equal(parser.read_data(str(tmp_path), n_workers=2, cache=True), expected)
+    pd.testing.assert_frame_equal(parser.read_data(str(tmp_path), cache=True), expected)
+    assert parser.apply_function_to_directory(lambda file_parser, dir, fname: file_parser, str(tmp_path)).count(OrcaOut) == 3
+    parser.save_species(str(tmp_path), "xyz", n_workers=2)
+    assert len(os.listdir(str(tmp_path / "molecule_files"))) == 6
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pytest
+from torinax.benchmarks import write_tree
+from torinax.benchmarks.generators import mopac_output, orca_output, qe_output
+from torinax.io import MopacOut, OrcaOut, QeOut, sniff_parser
+
+
+def write_text(tmp_path, text: str) -> str:
+    path = str(tmp_path / "generated.out")
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def test_orca_output(tmp_path):
+    reader = OrcaOut(write_text(tmp_path, orca_output(n_atoms=7, n_steps=4, n_freqs=5)))
+    data = reader.read_scalar_data()
+    # the energy of the last step, 4 MOs per atom and half of them occupied
+    assert data["final_energy"] == -113.123459
+    assert data["n_electrons"] == 14
+    assert data["homo_ev"] < data["lumo_ev"]
+    assert data["finished_normally"] and not data["has_imaginary_freq"]
+    assert (data["runtime"], data["gibbs_free_energy"]) == (5.123, -113.1)
+    specie = reader.read_specie()
+    assert specie.symbols == ["C", "O", "H", "N", "H", "H", "C"]
+    np.testing.assert_allclose(specie.coordinates[:, 0], 1.1 * np.arange(7) + 0.03)
+    df = reader.read_loewdin_reduced_orbital_populations()
+    assert len(df) > 0 and len(df) % 6 == 0
+    assert df.columns[:2].tolist() == ["energy [Ha]", "occupation"]
+
+
+def test_unrestricted_orca_output(tmp_path):
+    reader = OrcaOut(write_text(tmp_path, orca_output(n_atoms=6, n_steps=1, unrestricted=True)))
+    up = reader.read_loewdin_reduced_orbital_populations(spin="UP")
+    down = reader.read_loewdin_reduced_orbital_populations(spin="DOWN")
+    assert up.index.tolist() == down.index.tolist()
+    # the populations of the spins are drawn separately
+    assert not up.equals(down)
+
+
+def test_mopac_output(tmp_path):
+    reader = MopacOut(write_text(tmp_path, mopac_output(n_atoms=7, n_steps=4, n_states=4)))
+    data = reader.read_scalar_data()
+    # states alternate between singlets and triplets, the reader keeps the last of each
+    assert (data["singlet_energy"], data["triplet_energy"]) == (2.1, 2.4)
+    assert (data["total_energy"], data["ionization_energy"], data["homo_lumo_gap"]) == (-500.12345, 9.51234, 1.234)
+    assert data["finished_normally"] and data["converged"]
+    specie = reader.read_specie()
+    assert specie.symbols == ["C", "O", "H"] * 2 + ["C"]
+    np.testing.assert_allclose(specie.coordinates[:, 0], 1.1 * np.arange(7) + 0.03, atol=1e-4)
+    frequencies = reader.read_frequency_dict()
+    assert len(frequencies["frequencies"]) == 3 * 7 - 6
+
+
+def test_qe_output(tmp_path):
+    reader = QeOut(write_text(tmp_path, qe_output(n_atoms=5, n_steps=4)))
+    assert reader.read_scalar_data() == {"total_energy": -15.80000003}
+    specie = reader.read_specie()
+    assert specie.symbols == ["Si"] * 5
+    assert specie.coordinates.shape == (5, 3)
+    # fcc lattice of alat = 10.2 bohr
+    np.testing.assert_allclose(np.linalg.norm(specie.lattice.vectors, axis=1), [10.2 * 0.529177 / np.sqrt(2)] * 3, rtol=1e-4)
+
+
+def test_write_tree(tmp_path):
+    paths = write_tree(str(tmp_path / "tree"), "mopac", 5, n_dirs=2, n_atoms=3, n_steps=1)
+    assert sorted(os.path.relpath(path, str(tmp_path / "tree")) for path in paths) == \
+        sorted(os.path.join("dir{}".format(i % 2), "mopac_{}.out".format(i)) for i in range(5))
+    assert all(sniff_parser(path) is MopacOut for path in paths)
+    with pytest.raises(ValueError):
+        write_tree(str(tmp_path), "gaussian", 1)
@@ -0,0 +1,58 @@
+import os
+import importlib
+from time import monotonic, sleep
+from torinax.clients import LocalClient
+
+# the module (torinax.clients.LocalClient is the class)
+local_module = importlib.import_module("torinax.clients.LocalClient")
+
+
+def test_exit_codes_and_states():
+    client = LocalClient(n_workers=2)
+    cmds = ["true", "exit 3", "sh -c 'exit 4'"]
+    assert client.submit(cmds) == ["1"]
+    assert client.submit(["false"]) == ["2"]
+    states = client.wait()
+    assert states == {"1_1": "COMPLETED", "1_2": "FAILED", "1_3": "FAILED", "2_1": "FAILED"}
+    assert [res["command"] for res in client.command_results] == cmds + ["false"]
+    assert [res["exit_code"] for res in client.command_results] == [0, 3, 4, 1]
+    # the results are collected, the next wait has nothing to wait for
+    assert client.wait() == {}
+    client.close()
+
+
+def test_timeout_kills_process_group(tmp_path):
+    pid_file = tmp_path / "pid"
+    client = LocalClient(timeout=0.5)
+    # the shell waits for a child process, which must be killed with it
+    client.submit(["sleep 30 & echo $! > {}; wait".format(pid_file)])
+    start = monotonic()
+    assert client.wait() == {"1_1": "TIMEOUT"}
+    assert monotonic() - start < 10
+    assert client.command_results[0]["state"] == "TIMEOUT"
+    pid = int(pid_file.read_text())
+    for _ in range(50):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        sleep(0.1)
+    else:
+        raise AssertionError("child process {} of the timed out command is still running".format(pid))
+    client.close()
+
+
+def test_concurrency_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_module, "_available_cpus", lambda: 4)
+    client = LocalClient(cpus_per_task=2)
+    assert client.n_workers == 2
+    # every command counts the commands running with it
+    running = tmp_path / "running"
+    running.mkdir()
+    counts = tmp_path / "counts"
+    cmd = "touch {0}/$$; ls {0} | wc -l >> {1}; sleep 0.2; rm {0}/$$".format(running, counts)
+    client.submit([cmd] * 6)
+    client.wait()
+    assert all(res["exit_code"] == 0 for res in client.command_results)
+    assert max(int(count) for count in counts.read_text().split()) <= 2
+    client.close()
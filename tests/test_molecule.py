@@ -0,0 +1,50 @@
+from torinax.base import Molecule
+from torinax.base.Bond import Bond
+
+
+def make_molecule() -> Molecule:
+    # chain 0-1-2 and a separate atom 3
+    return Molecule(symbols=["C", "C", "O", "H"], coordinates=[[0, 0, 0], [1, 0, 0], [2, 0, 0], [5, 0, 0]],
+                    bonds=[Bond(0, 1, 1), Bond(1, 2, 2)])
+
+
+def test_neighbors_and_fragments():
+    mol = make_molecule()
+    assert mol.get_neighbors(1) == [0, 2]
+    assert mol.get_degree(3) == 0
+    assert mol.get_neighbors(10) == []
+    assert mol.get_fragments() == [[0, 1, 2], [3]]
+
+
+def test_add_bond_and_join_update_adjacency():
+    mol = make_molecule()
+    assert mol.get_fragments() == [[0, 1, 2], [3]]
+    mol.add_bond(Bond(2, 3, 1))
+    assert mol.get_neighbors(3) == [2]
+    assert mol.get_fragments() == [[0, 1, 2, 3]]
+    mol.join(make_molecule())
+    assert mol.get_neighbors(5) == [4, 6]
+    assert mol.get_fragments() == [[0, 1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_changes_of_bonds_list_rebuild_adjacency():
+    mol = make_molecule()
+    assert mol.get_fragments() == [[0, 1, 2], [3]]
+    # replacing a bond keeps the number of bonds
+    mol.bonds[1] = Bond(1, 3, 1)
+    assert mol.get_neighbors(1) == [0, 3]
+    assert mol.get_fragments() == [[0, 1, 3], [2]]
+    mol.bonds.remove(mol.bonds[0])
+    assert mol.get_neighbors(0) == []
+    assert mol.get_fragments() == [[0], [1, 3], [2]]
+    # removal and addition between two reads
+    mol.bonds.pop()
+    mol.bonds.append(Bond(0, 2, 1))
+    assert mol.get_neighbors(2) == [0]
+    assert mol.get_fragments() == [[0, 2], [1], [3]]
+    mol.bonds += [Bond(1, 3, 1)]
+    assert mol.get_fragments() == [[0, 2], [1, 3]]
+    mol.bonds = [Bond(0, 3, 1)]
+    assert mol.get_fragments() == [[0, 3], [1], [2]]
+    del mol.bonds[:]
+    assert mol.get_fragments() == [[0], [1], [2], [3]]
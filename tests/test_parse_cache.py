@@ -0,0 +1,81 @@
+import os
+from torinax.ParseCache import ParseCache
+from torinax.io import MopacOut, OrcaOut
+
+
+class VersionedParser (OrcaOut):
+
+    version = 0
+
+
+def write_file(path, text: str="text") -> str:
+    with open(str(path), "w") as f:
+        f.write(text)
+    return str(path)
+
+
+def test_hits(tmp_path):
+    path = write_file(tmp_path / "a.out")
+    cache = ParseCache(str(tmp_path / "cache.sqlite"), [OrcaOut, MopacOut])
+    key = ParseCache.method_key("read_scalar_data")
+    assert cache.get(path, key) is None
+    cache.put(path, key, {"energy": 1.5})
+    assert cache.get(path, key) == {"energy": 1.5}
+    # entries are kept per parser and per method arguments
+    assert cache.get(path, key, file_parser=MopacOut) is None
+    assert cache.get(path, ParseCache.method_key("read_scalar_data", kwargs={"tail_first": False})) is None
+    cache.close()
+    # entries are kept on disk
+    cache = ParseCache(str(tmp_path / "cache.sqlite"), OrcaOut)
+    assert cache.get(path, key) == {"energy": 1.5}
+    cache.close()
+
+
+def test_file_changes_invalidate(tmp_path):
+    path = write_file(tmp_path / "a.out")
+    cache = ParseCache(str(tmp_path / "cache.sqlite"), OrcaOut)
+    key = ParseCache.method_key("read_scalar_data")
+    cache.put(path, key, {"energy": 1.5})
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    assert cache.get(path, key) is None
+    cache.put(path, key, {"energy": 1.5})
+    # same modification time, other size
+    write_file(path, "longer text")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    assert cache.get(path, key) is None
+    cache.close()
+
+
+def test_parser_changes_invalidate(tmp_path, monkeypatch):
+    path = write_file(tmp_path / "a.out")
+    db_path = str(tmp_path / "cache.sqlite")
+    key = ParseCache.method_key("read_scalar_data")
+    cache = ParseCache(db_path, VersionedParser)
+    cache.put(path, key, {"energy": 1.5})
+    cache.close()
+    monkeypatch.setattr(VersionedParser, "version", 1)
+    cache = ParseCache(db_path, VersionedParser)
+    assert not cache.fingerprint == ParseCache.parser_fingerprint(OrcaOut)
+    assert cache.get(path, key) is None
+    cache.close()
+
+
+def test_prune(tmp_path, monkeypatch):
+    kept = write_file(tmp_path / "kept.out")
+    deleted = write_file(tmp_path / "deleted.out")
+    db_path = str(tmp_path / "cache.sqlite")
+    key = ParseCache.method_key("read_scalar_data")
+    cache = ParseCache(db_path, [VersionedParser, MopacOut])
+    for path in (kept, deleted):
+        cache.put(path, key, {"energy": 1.5})
+        cache.put(path, key, {"energy": 2.5}, file_parser=MopacOut)
+    cache.close()
+    os.remove(deleted)
+    # entries of the deleted file and of the old version of the parser are removed
+    monkeypatch.setattr(VersionedParser, "version", 1)
+    cache = ParseCache(db_path, [VersionedParser, MopacOut])
+    assert cache.prune() == 3
+    assert cache.get(kept, key, file_parser=MopacOut) == {"energy": 2.5}
+    assert cache.prune() == 0
+    cache.close()
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+import pytest
+from torinax.base.Specie import Specie
+from torinax.benchmarks.generators import mopac_output, orca_output, qe_output
+from torinax.io import MopacOut, OrcaOut, QeOut
+
+PARSERS = {"orca": (OrcaOut, orca_output, {"n_atoms": 6}), "mopac": (MopacOut, mopac_output, {"n_atoms": 6}),
+           "qe": (QeOut, qe_output, {"n_atoms": 4})}
+
+
+def write_output(tmp_path, program: str, **kwargs) -> str:
+    parser, generator, default_kwargs = PARSERS[program]
+    path = str(tmp_path / "{}.out".format(program))
+    with open(path, "w") as f:
+        f.write(generator(n_steps=3, **dict(default_kwargs, **kwargs)))
+    return path
+
+
+def write_file_text(path, text: str) -> str:
+    with open(str(path), "w") as f:
+        f.write(text)
+    return str(path)
+
+
+def assert_same(a, b):
+    """Asserts that two parser results (dicts, lists, dataframes, arrays or species) are equal"""
+    assert type(a) is type(b)
+    if isinstance(a, pd.DataFrame):
+        pd.testing.assert_frame_equal(a, b)
+    elif isinstance(a, np.ndarray):
+        np.testing.assert_array_equal(a, b)
+    elif isinstance(a, Specie):
+        assert list(a.symbols) == list(b.symbols)
+        np.testing.assert_array_equal(a.coordinates, b.coordinates)
+        if hasattr(a, "lattice"):
+            np.testing.assert_array_equal(a.lattice.vectors, b.lattice.vectors)
+    elif isinstance(a, dict):
+        assert list(a) == list(b)
+        for key in a:
+            assert_same(a[key], b[key])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            assert_same(x, y)
+    else:
+        assert a == b
+
+
+def read_results(parser, path: str) -> dict:
+    """Reads all the data of a file with all reading paths (single sections, one pass and tail-first reads)"""
+    reader = parser(path)
+    results = {"scalar_data": reader.read_scalar_data(), "specie": reader.read_specie(),
+               "all": reader.read_all(["scalar_data", "specie"])}
+    if issubclass(parser, OrcaOut):
+        results["specie_forward"] = reader.read_specie(tail_first=False)
+        results["loewdin"] = reader.read_loewdin_reduced_orbital_populations()
+        results["final_energy"] = reader.read_final_energy()
+    if issubclass(parser, MopacOut):
+        results["frequencies"] = reader.read_frequency_dict()
+    if issubclass(parser, QeOut):
+        results["scalar_data_forward"] = reader.read_scalar_data(tail_first=False)
+        results["specie_forward"] = reader.read_specie(tail_first=False)
+    return results
+
+
+@pytest.mark.parametrize("program", list(PARSERS))
+@pytest.mark.parametrize("chunk_size", [7, 100, 1000])
+def test_chunk_size_doesnt_change_results(tmp_path, program, chunk_size):
+    parser = PARSERS[program][0]
+    path = write_output(tmp_path, program)
+    # chunks end in the middle of lines and of the trigger strings
+    chunked = type(parser.__name__, (parser,), {"chunk_size": chunk_size})
+    assert_same(read_results(chunked, path), read_results(parser, path))
+
+
+def loewdin_reference(path: str, focus_orbitals=None, spin=None) -> pd.DataFrame:
+    """The Loewdin populations reader before it was vectorized (a dataframe per block, concatenated)"""
+    with open(path, "r", encoding="utf8") as f:
+        LoewdinBlock = False
+        title_line_no = 0
+        res = pd.DataFrame()
+        current = pd.DataFrame()
+        TableBlock = False
+        for counter, line in enumerate(f.readlines()):
+            splitted = line.strip().split()
+            if "LOEWDIN REDUCED ORBITAL POPULATIONS PER MO" in line:
+                LoewdinBlock = True
+                continue
+            if not spin is None:
+                opposite_spin_text = "SPIN UP" if spin.lower() == 'down' else "SPIN DOWN"
+                spin_text = "SPIN " + spin.upper()
+                if opposite_spin_text in line and not len(res) == 0:
+                    break
+                elif spin_text in line and not len(res) == 0:
+                    res = pd.DataFrame()
+                    current = pd.DataFrame()
+            if LoewdinBlock and len(splitted) == 6 and counter - title_line_no > 3:
+                title_line_no = counter
+                res = pd.concat([res, current])
+                current = pd.DataFrame(index=[int(s) for s in splitted])
+                continue
+            if LoewdinBlock and counter - title_line_no == 1:
+                current["energy [Ha]"] = [float(s) for s in splitted]
+            if LoewdinBlock and counter - title_line_no == 2:
+                current["occupation"] = [float(s) for s in splitted]
+            if LoewdinBlock and counter - title_line_no == 3:
+                TableBlock = True
+                continue
+            if len(splitted) == 0:
+                TableBlock = False
+                continue
+            if TableBlock:
+                if focus_orbitals is None or "_".join(splitted[1:3]) in focus_orbitals:
+                    current["_".join(splitted[:3])] = [float(s) for s in splitted[3:]]
+                continue
+            if "****************" in line:
+                LoewdinBlock = False
+        return res.fillna(0)
+
+
+@pytest.mark.parametrize("unrestricted,spin", [(False, None), (True, "UP"), (True, "DOWN")])
+@pytest.mark.parametrize("focus_orbitals", [None, ["O_px", "C_s"]])
+def test_loewdin_populations(tmp_path, unrestricted, spin, focus_orbitals):
+    path = write_output(tmp_path, "orca", n_atoms=9, unrestricted=unrestricted)
+    reader = OrcaOut(path)
+    df = reader.read_loewdin_reduced_orbital_populations(focus_orbitals=focus_orbitals, spin=spin)
+    expected = loewdin_reference(path, focus_orbitals=focus_orbitals, spin=spin)
+    assert len(df) > 6
+    pd.testing.assert_frame_equal(df, expected)
+    arrays = reader.read_loewdin_reduced_orbital_populations(focus_orbitals=focus_orbitals, spin=spin, as_arrays=True)
+    np.testing.assert_array_equal(arrays["index"], df.index)
+    assert arrays["columns"] == list(df.columns)
+    np.testing.assert_array_equal(arrays["values"], df.values)
+
+
+# all sections of every parser, with the reads that return them
+SECTIONS = {
+    "orca": {"scalar_data": lambda f: f.read_scalar_data(), "specie": lambda f: f.read_specie(),
+             "loewdin_reduced_orbital_populations": lambda f: f.read_loewdin_reduced_orbital_populations()},
+    "mopac": {"scalar_data": lambda f: f.read_scalar_data(), "specie": lambda f: f.read_specie(), "frequency_dict": lambda f: f.read_frequency_dict()},
+    "qe": {"scalar_data": lambda f: f.read_scalar_data(), "specie": lambda f: f.read_specie()},
+}
+
+
+@pytest.mark.parametrize("program", list(PARSERS))
+def test_read_all_equals_separate_reads(tmp_path, program):
+    path = write_output(tmp_path, program)
+    reader = PARSERS[program][0](path)
+    sections = SECTIONS[program]
+    assert_same(reader.read_all(list(sections)), {name: read(reader) for name, read in sections.items()})
+    # any subset of the sections, with arguments
+    if program == "orca":
+        section = "loewdin_reduced_orbital_populations"
+        kwargs = {"focus_orbitals": ["C_s"], "as_arrays": True}
+        data = reader.read_all(["specie", section], {section: kwargs})
+        assert_same(data, {"specie": reader.read_specie(), section: reader.read_loewdin_reduced_orbital_populations(**kwargs)})
+
+
+@pytest.mark.parametrize("program", ["orca", "qe"])
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_tail_first_reads_equal_forward_reads(tmp_path, program, newline):
+    path = write_output(tmp_path, program)
+    with open(path, "r") as f:
+        text = f.read()
+    with open(path, "w", newline=newline) as f:
+        f.write(text)
+    reader = PARSERS[program][0](path)
+    assert_same(reader.read_specie(), reader.read_specie(tail_first=False))
+    if program == "orca":
+        assert reader.read_final_energy() == reader.read_scalar_data()["final_energy"]
+    else:
+        assert_same(reader.read_scalar_data(), reader.read_scalar_data(tail_first=False))
+
+
+@pytest.mark.parametrize("text", ["", "* O   R   C   A *\nProgram PWSCF\nno data in this file\n"])
+def test_tail_first_reads_without_match(tmp_path, text):
+    path = write_file_text(tmp_path / "empty.out", text)
+    assert OrcaOut(path).read_final_energy() is None
+    assert QeOut(path).read_scalar_data() == QeOut(path).read_scalar_data(tail_first=False) == {}
+    # a file without a geometry fails the same way in both reads
+    for parser in (OrcaOut, QeOut):
+        for tail_first in (True, False):
+            with pytest.raises(ValueError):
+                parser(path).read_specie(tail_first=tail_first)
+
+
+def test_last_block_and_line(tmp_path):
+    lines = ["header", "ENERGY 1", "BLOCK A", "a 1", "", "ENERGY 2 !", "BLOCK B", "b 1", "b 2", "", "ENERGY 3", "BLOCK C", "c 1 END", "tail"]
+    text = "\n".join(lines) + "\n"
+    reader = OrcaOut(write_file_text(tmp_path / "blocks.out", text))
+    # the last occurrence, from the start of its line to the first end string after it
+    start = text.rfind("\nBLOCK C") + 1
+    assert reader._last_block("BLOCK") == (start, "BLOCK C\nc 1 END\ntail\n")
+    assert reader._last_block("BLOCK", ("END", "\n\n")) == (start, "BLOCK C\nc 1 END")
+    assert reader._last_block("b 1") == (text.find("b 1"), "b 1\nb 2\n\n")
+    assert reader._last_line("ENERGY") == "ENERGY 3\n"
+    assert reader._last_line("ENERGY", lambda line: "!" in line) == "ENERGY 2 !\n"
+    # the last line has no line ending
+    assert reader._last_line("tail") == "tail\n"
+    assert OrcaOut(write_file_text(tmp_path / "no_newline.out", text.strip()))._last_line("tail") == "tail"
+    assert reader._last_block("MISSING") is None
+    assert reader._last_line("MISSING") is None
+    assert reader._last_line("ENERGY", lambda line: "?" in line) is None
+    empty = OrcaOut(write_file_text(tmp_path / "empty.out", ""))
+    assert empty._last_block("BLOCK") is None
+    assert empty._last_line("ENERGY") is None
@@ -0,0 +1,66 @@
+import json
+from sqlalchemy import Column, String
+from torinax.DirParser import DirParser
+from torinax.Recorder import Recorder, get_recorder, recording, timer
+from torinax.benchmarks import write_tree
+from torinax.clients import LocalClient
+from torinax.io import OrcaOut
+from torinax.pipelines.computations import SlurmComputation, run_computations
+
+
+class EchoComputation (SlurmComputation):
+
+    tablename = "test_recorded"
+    name = "recorded"
+    __results_columns__ = {"id": Column(String, primary_key=True)}
+
+    def make_cmd_list(self, db_session):
+        return [{"id": "a"}, {"id": "b"}], ["true", "false"]
+
+
+def test_records_and_summary(tmp_path):
+    write_tree(str(tmp_path / "files"), "orca", 3, n_atoms=4, n_steps=1)
+    jsonl_path = str(tmp_path / "records.jsonl")
+    with recording(Recorder(jsonl_path)) as recorder:
+        assert get_recorder() is recorder
+        DirParser(OrcaOut).read_data(str(tmp_path / "files"), n_workers=2)
+        run_computations([EchoComputation(LocalClient(job_name="echo"))], db_path=str(tmp_path / "db.sqlite"), verbose=0)
+        with timer("custom", "block", bytes=2e6):
+            pass
+    recorder.close()
+    assert get_recorder() is None
+    kinds = {}
+    for rec in recorder.records:
+        kinds.setdefault(rec["kind"], []).append(rec)
+    # records of the worker processes are sent back to the recorder
+    assert [rec["bytes"] > 0 for rec in kinds["parse_file"]] == [True] * 3
+    assert {rec["name"] for rec in kinds["read"]} == {"OrcaOut"}
+    assert all(rec["name"].startswith("OrcaOut.") for rec in kinds["section"])
+    assert [rec["phase"] for rec in kinds["computation"]] == ["pre_execution", "execute", "post_execution", "commit"]
+    assert [(rec["name"], rec["n_tasks"], rec["failed_tasks"]) for rec in kinds["local_job"]] == [("echo", 2, 1)]
+    assert all(rec["duration"] >= 0 and rec["start"] > 0 for rec in recorder.records)
+    # every record is also written to the JSON lines file
+    with open(jsonl_path) as f:
+        assert [json.loads(line) for line in f] == json.loads(json.dumps(recorder.records))
+    summary = recorder.summary()
+    assert summary["total"].is_monotonic_decreasing
+    parse = summary[summary["kind"] == "parse_file"].iloc[0]
+    assert (parse["name"], parse["count"]) == ("OrcaOut", 3)
+    assert parse["MB/s"] > 0
+    commit = summary[(summary["kind"] == "computation") & (summary["phase"] == "commit")].iloc[0]
+    assert commit["count"] == 1
+    custom = summary[summary["kind"] == "custom"].iloc[0]
+    assert custom["bytes"] == 2e6
+
+
+def test_no_records_when_disabled(tmp_path):
+    write_tree(str(tmp_path / "files"), "orca", 2, n_atoms=4, n_steps=1)
+    recorder = Recorder()
+    assert get_recorder() is None
+    # a recorder that isn't set gets nothing
+    DirParser(OrcaOut).read_data(str(tmp_path / "files"))
+    run_computations([EchoComputation(LocalClient())], db_path=str(tmp_path / "db.sqlite"), verbose=0)
+    with timer("custom", "block"):
+        pass
+    assert recorder.records == []
+    assert list(recorder.summary().columns) == ["kind", "name", "count", "total", "mean", "max"]
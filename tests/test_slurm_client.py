@@ -0,0 +1,142 @@
+import os
+import sys
+import importlib
+import pytest
+from torinax.clients import SlurmClient
+
+# the module (torinax.clients.SlurmClient is the class)
+slurm_module = importlib.import_module("torinax.clients.SlurmClient")
+
+# fake SLURM commands. they keep their state (job counter, scripted outputs and call logs) in the FAKE_SLURM directory
+_FAKE_COMMANDS = {
+    "sbatch": """
+import os, re, subprocess, sys
+state = os.environ["FAKE_SLURM"]
+counter = os.path.join(state, "job_id")
+job_id = int(open(counter).read()) if os.path.isfile(counter) else 100
+open(counter, "w").write(str(job_id + 1))
+open(os.path.join(state, "sbatch.log"), "a").write(sys.argv[1] + "\\n")
+if os.environ.get("FAKE_SLURM_RUN"):
+    # runs the array tasks right away
+    n_tasks = int(re.search(r"--array=1-(\\d+)", open(sys.argv[1]).read()).group(1))
+    for task_id in range(1, n_tasks + 1):
+        subprocess.run(["bash", sys.argv[1]], env=dict(os.environ, SLURM_ARRAY_TASK_ID=str(task_id)))
+print("Submitted batch job {}".format(job_id))
+""",
+    "squeue": """
+import os, sys
+state = os.environ["FAKE_SLURM"]
+open(os.path.join(state, "squeue.log"), "a").write(" ".join(sys.argv[1:]) + "\\n")
+# prints the next scripted output (outputs are separated by lines with ---), an empty queue when there are none
+path = os.path.join(state, "squeue.out")
+outputs = open(path).read().split("---\\n") if os.path.isfile(path) else [""]
+print(outputs[0], end="")
+open(path, "w").write("---\\n".join(outputs[1:]))
+""",
+    "sacct": """
+import os, sys
+state = os.environ["FAKE_SLURM"]
+open(os.path.join(state, "sacct.log"), "a").write(" ".join(sys.argv[1:]) + "\\n")
+path = os.path.join(state, "sacct.out")
+print(open(path).read() if os.path.isfile(path) else "", end="")
+""",
+    "scontrol": """
+import os
+print("MaxArraySize            = {}".format(os.environ.get("FAKE_SLURM_MAX_ARRAY_SIZE", "1001")))
+""",
+}
+
+
+@pytest.fixture
+def fake_slurm(tmp_path, monkeypatch):
+    """Puts the fake SLURM commands first in the PATH. Returns the state directory"""
+    bin_dir = tmp_path / "bin"
+    state = tmp_path / "state"
+    bin_dir.mkdir()
+    state.mkdir()
+    for name, code in _FAKE_COMMANDS.items():
+        path = bin_dir / name
+        path.write_text("#!{}\n{}".format(sys.executable, code))
+        path.chmod(0o755)
+    monkeypatch.setenv("PATH", "{}{}{}".format(bin_dir, os.pathsep, os.environ["PATH"]))
+    monkeypatch.setenv("FAKE_SLURM", str(state))
+    return state
+
+
+def read_log(state, name: str) -> list:
+    path = state / "{}.log".format(name)
+    return path.read_text().splitlines() if path.exists() else []
+
+
+def test_wait_polls_all_jobs_with_backoff(fake_slurm, tmp_path, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(slurm_module, "sleep", sleeps.append)
+    client = SlurmClient(max_array_size=10, staging_dir=str(tmp_path))
+    assert client.submit(["true", "true"]) == ["100"]
+    assert client.submit(["true"]) == ["101"]
+    pending = "100_1|PENDING\n100_2|PENDING\n101|PENDING\n"
+    running = "100_1|RUNNING\n100_2|PENDING\n101|RUNNING\n"
+    (fake_slurm / "squeue.out").write_text("---\n".join([pending, pending, pending, running, ""]))
+    # job 101 has no accounting record
+    (fake_slurm / "sacct.out").write_text("100_1|COMPLETED\n100_2|CANCELLED by 0\n")
+    states = client.wait(update_time=1, max_update_time=3, backoff=2)
+    # one squeue call for all jobs per checkup, the interval grows while the queue doesn't change and is reset on a change
+    squeue_calls = read_log(fake_slurm, "squeue")
+    assert len(squeue_calls) == len(sleeps) == 5
+    assert all("--jobs=100,101" in call for call in squeue_calls)
+    assert sleeps == [1, 1, 2, 3, 1]
+    # final states from sacct (first word only), UNKNOWN for jobs without a record
+    assert len(read_log(fake_slurm, "sacct")) == 1
+    assert states == {"100_1": "COMPLETED", "100_2": "CANCELLED", "101": "UNKNOWN"}
+
+
+def test_submit_shards_by_max_array_size(fake_slurm, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_SLURM_MAX_ARRAY_SIZE", "3")
+    monkeypatch.setenv("FAKE_SLURM_RUN", "1")
+    client = SlurmClient(max_concurrent=2, staging_dir=str(tmp_path), keep_staging=True)
+    cmds = ["true", "false", "true", "false", "false"]
+    # array task IDs start at 1, so an array job has at most MaxArraySize - 1 tasks
+    assert client.submit(cmds) == ["100", "101", "102"]
+    scripts = [open(path).read() for path in read_log(fake_slurm, "sbatch")]
+    assert [script.splitlines()[1] for script in scripts] == ["#SBATCH --array=1-2%2", "#SBATCH --array=1-2%2", "#SBATCH --array=1-1%2"]
+    staging_dir = os.path.dirname(read_log(fake_slurm, "sbatch")[0])
+    shards = [open(os.path.join(staging_dir, "slurm_args_{}.txt".format(k))).read().splitlines() for k in range(3)]
+    assert shards == [cmds[:2], cmds[2:4], cmds[4:]]
+    client.wait(update_time=0)
+    # results of all shards, in submission order
+    assert [res["command"] for res in client.command_results] == cmds
+    assert [res["exit_code"] for res in client.command_results] == [0, 1, 0, 1, 1]
+
+
+def test_no_throttle_by_default(fake_slurm, tmp_path):
+    client = SlurmClient(max_array_size=10, staging_dir=str(tmp_path))
+    client.submit(["true"] * 4)
+    assert open(read_log(fake_slurm, "sbatch")[0]).read().splitlines()[1] == "#SBATCH --array=1-4"
+
+
+def test_bundled_tasks_run_their_lines(fake_slurm, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_SLURM_RUN", "1")
+    client = SlurmClient(max_array_size=10, staging_dir=str(tmp_path), commands_per_task=2)
+    # every command writes the array task that ran it
+    codes = [0, 3, 1, 0, 5]
+    cmds = ["sh -c 'echo $SLURM_ARRAY_TASK_ID > {}; exit {}'".format(tmp_path / "cmd_{}".format(i), code) for i, code in enumerate(codes)]
+    client.submit(cmds)
+    assert open(read_log(fake_slurm, "sbatch")[0]).read().splitlines()[1] == "#SBATCH --array=1-3"
+    client.wait(update_time=0)
+    tasks = [int((tmp_path / "cmd_{}".format(i)).read_text()) for i in range(len(cmds))]
+    assert tasks == [1, 1, 2, 2, 3]
+    # quoted command lines are run as written, every command gets its own exit code
+    assert [res["command"] for res in client.command_results] == cmds
+    assert [res["exit_code"] for res in client.command_results] == codes
+    assert all(res["duration"] >= 0 for res in client.command_results)
+    # the staging directory is removed once the results are collected
+    assert not any(path.name.startswith("slurm_") for path in tmp_path.iterdir())
+
+
+def test_parallel_bundled_commands(fake_slurm, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_SLURM_RUN", "1")
+    client = SlurmClient(cpus_per_task=2, max_array_size=10, staging_dir=str(tmp_path), commands_per_task=3, parallel_commands=True)
+    cmds = ["exit {}".format(i) for i in range(5)]
+    client.submit(cmds)
+    client.wait(update_time=0)
+    assert [res["exit_code"] for res in client.command_results] == list(range(5))
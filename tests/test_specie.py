@@ -0,0 +1,95 @@
+import copy
+import pickle
+import numpy as np
+import pytest
+from torinax.base import Molecule
+from torinax.base.Atom import Atom
+from torinax.base.Bond import Bond
+
+
+def make_molecule() -> Molecule:
+    return Molecule(symbols=["C", "O", "H"], coordinates=[[0, 0, 0], [1, 0, 0], [0, 1, 0]], bonds=[Bond(0, 1, 2), Bond(0, 2, 1)])
+
+
+def test_atoms_are_copied_to_arrays():
+    atoms = [Atom("C", np.zeros(3)), Atom("H")]
+    mol = Molecule(atoms=atoms)
+    assert mol.symbols == ["C", "H"]
+    assert mol.coordinates.shape == (2, 3)
+    # atoms without coordinates get NaN coordinates
+    assert np.isnan(mol.coordinates[1]).all()
+    mol.coordinates[0, 0] = 5
+    assert atoms[0].coordinates[0] == 0
+
+
+def test_append_and_remove():
+    mol = make_molecule()
+    mol.atoms.append(Atom("N", np.array([2.0, 2.0, 2.0])))
+    # like the constructor, atoms without coordinates get NaN coordinates
+    mol.atoms.append(Atom("H"))
+    assert len(mol.atoms) == 5
+    assert mol.symbols == ["C", "O", "H", "N", "H"]
+    assert mol.coordinates[3].tolist() == [2.0, 2.0, 2.0]
+    assert np.isnan(mol.coordinates[4]).all()
+    mol.atoms.remove(mol.atoms[1])
+    assert mol.symbols == ["C", "H", "N", "H"]
+    assert mol.coordinates[1].tolist() == [0, 1, 0]
+    # bonds of the removed atom are removed, the others are renumbered
+    assert [(bond.first_atom_idx, bond.second_atom_idx) for bond in mol.bonds] == [(0, 1)]
+    assert mol.get_neighbors(1) == [0]
+    del mol.atoms[-2:]
+    assert mol.symbols == ["C", "H"]
+    with pytest.raises(ValueError):
+        mol.atoms.remove(Atom("C", np.zeros(3)))
+    with pytest.raises(IndexError):
+        del mol.atoms[2]
+
+
+def test_index_views():
+    mol = make_molecule()
+    assert mol.atoms[-1].symbol == "H"
+    assert [atom.symbol for atom in mol.atoms[1:]] == ["O", "H"]
+    assert [atom.index for atom in mol.atoms] == [0, 1, 2]
+    with pytest.raises(IndexError):
+        mol.atoms[3]
+    # atoms are views, they see changes of the arrays
+    atom = mol.atoms[1]
+    mol.symbols[1] = "S"
+    mol.coordinates[1] = [3, 3, 3]
+    assert atom.symbol == "S"
+    assert atom.coordinates.tolist() == [3, 3, 3]
+
+
+def test_atom_writes_reach_arrays():
+    mol = make_molecule()
+    atom = mol.atoms[2]
+    atom.symbol = "F"
+    atom.coordinates = [4, 5, 6]
+    assert mol.symbols[2] == "F"
+    assert mol.coordinates[2].tolist() == [4, 5, 6]
+    # item writes of the coordinates of a view change the array too
+    mol.atoms[0].coordinates[2] = 7
+    assert mol.coordinates[0, 2] == 7
+    for atom in mol.atoms:
+        atom.coordinates += 1
+    assert mol.coordinates[:, 0].tolist() == [1, 2, 5]
+
+
+def test_atom_round_trips():
+    atom = Atom("C", np.array([1.0, 2.0, 3.0]))
+    assert not hasattr(atom, "__dict__")
+    for other in (copy.copy(atom), copy.deepcopy(atom), pickle.loads(pickle.dumps(atom))):
+        assert other.symbol == "C"
+        assert other.coordinates.tolist() == [1.0, 2.0, 3.0]
+        assert other.parent_specie is None
+    # an atom of a specie is copied to a new specie and back
+    mol = Molecule(atoms=[atom])
+    view = mol.atoms[0]
+    assert (view.symbol, view.coordinates.tolist()) == ("C", [1.0, 2.0, 3.0])
+    copied = Molecule(atoms=list(mol.atoms))
+    copied.coordinates[0, 0] = 0
+    assert mol.coordinates[0, 0] == 1.0
+    # a pickled view keeps its specie
+    view = pickle.loads(pickle.dumps(view))
+    assert view.parent_specie.symbols == ["C"]
+    assert view.coordinates.tolist() == [1.0, 2.0, 3.0]
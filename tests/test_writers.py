@@ -0,0 +1,69 @@
+import os
+import numpy as np
+import pytest
+from torinax.base import Molecule
+from torinax.io import MopacIn, OrcaIn
+
+ORCA_KWDICT = {"input_text": "! OPT B3LYP def2-SVP", "charge": 0, "mult": 1}
+MOPAC_KWDICT = {"top_kwds": ["PM7", "EF"], "bottom_kwds": ["OLDGEO", "FORCE"]}
+
+
+def make_molecules(n: int=200, seed: int=0) -> list:
+    """Random molecules, with coordinates at rounding ties, negative zeros after rounding and large values"""
+    rng = np.random.default_rng(seed)
+    molecules = []
+    for _ in range(n):
+        n_atoms = int(rng.integers(1, 30))
+        coordinates = rng.normal(scale=5, size=(n_atoms, 3))
+        coordinates[::3, 0] = np.round(coordinates[::3, 0], 4) + 0.00005
+        coordinates[1::4, 1] = -rng.random(len(coordinates[1::4, 1])) * 1e-5
+        coordinates[2::5, 2] *= 1e3
+        molecules.append(Molecule(symbols=list(rng.choice(["C", "H", "O", "N", "Cl"], n_atoms)), coordinates=coordinates))
+    return molecules
+
+
+def orca_reference(molecule: Molecule, kwdict: dict) -> str:
+    """The text of the per-atom ORCA writer (before write_many)"""
+    input_text = kwdict["input_text"]
+    if len(molecule.symbols) == 1 and "OPT" in input_text:
+        input_text = input_text.replace("OPT", "")
+    s = input_text + ("" if input_text.endswith("\n") else "\n") + "* xyz {} {}\n".format(kwdict["charge"], kwdict["mult"])
+    for symbol, coords in zip(molecule.symbols, molecule.coordinates):
+        s += "{}\t{:.4f}\t{:.4f}\t{:.4f}\n".format(symbol, *coords)
+    return s + "*"
+
+
+def mopac_reference(molecule: Molecule, kwdict: dict) -> str:
+    """The text of the per-atom MOPAC writer (before write_many)"""
+    s = "".join(" " + word for word in kwdict["top_kwds"]) + "\ntitle\n\n"
+    for symbol, coords in zip(molecule.symbols, molecule.coordinates):
+        s += symbol
+        for c in coords:
+            s += " " + str(round(c, 4)) + " 1"
+        s += "\n"
+    return s + "\n" + "".join(" " + word for word in kwdict["bottom_kwds"])
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("writer,kwdict,reference", [(OrcaIn, ORCA_KWDICT, orca_reference), (MopacIn, MOPAC_KWDICT, mopac_reference)])
+def test_write_many_is_byte_identical(tmp_path, writer, kwdict, reference):
+    molecules = make_molecules()
+    many_paths = writer.write_many(molecules, dict(kwdict), str(tmp_path / "many"), naming=lambda i, mol: "mol_{}".format(i), n_workers=4)
+    assert [os.path.basename(path) for path in many_paths] == ["mol_{}.{}".format(i, writer.extension) for i in range(len(molecules))]
+    os.mkdir(str(tmp_path / "single"))
+    for molecule, many_path in zip(molecules, many_paths):
+        path = str(tmp_path / "single" / os.path.basename(many_path))
+        writer(path).write_file(molecule, dict(kwdict))
+        text = read_bytes(path)
+        assert read_bytes(many_path) == text
+        assert text == reference(molecule, kwdict).encode()
+
+
+def test_write_many_checks_kwdict_once(tmp_path):
+    with pytest.raises(ValueError):
+        OrcaIn.write_many(make_molecules(2), {"input_text": "B3LYP"}, str(tmp_path))
+    assert os.listdir(str(tmp_path)) == []
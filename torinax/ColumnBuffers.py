@@ -0,0 +1,140 @@
+from __future__ import annotations
+from array import array
+from typing import Dict, Optional
+import numpy as np
+from .lazy import LazyModule
+
+# pandas is imported when the columns are converted to a table (not in worker processes that only parse)
+pd = LazyModule("pandas")
+
+
+class _FloatBuffer:
+
+    def __init__(self):
+        self.values = array("d")
+
+    def append(self, value):
+        self.values.append(np.nan if value is None else float(value))
+
+    def to_array(self):
+        return np.array(self.values, dtype=np.float64)
+
+
+class _BoolBuffer:
+
+    def __init__(self):
+        # 1 for True, 0 for False and -1 for missing values
+        self.values = array("b")
+
+    def append(self, value):
+        self.values.append(-1 if value is None else int(bool(value)))
+
+    def to_array(self):
+        codes = np.array(self.values, dtype=np.int8)
+        return pd.arrays.BooleanArray(codes == 1, codes < 0)
+
+
+class _IntBuffer:
+
+    def __init__(self):
+        self.values = array("q")
+        self.mask = array("b")
+
+    def append(self, value):
+        self.values.append(0 if value is None else int(value))
+        self.mask.append(value is None)
+
+    def to_array(self):
+        return pd.arrays.IntegerArray(np.array(self.values, dtype=np.int64), np.array(self.mask, dtype=bool))
+
+
+class _CategoryBuffer:
+
+    def __init__(self):
+        self.categories = {}
+        self.codes = array("i")
+
+    def append(self, value):
+        if value is None:
+            self.codes.append(-1)
+        else:
+            self.codes.append(self.categories.setdefault(value, len(self.categories)))
+
+    def to_array(self):
+        return pd.Categorical.from_codes(np.array(self.codes, dtype=np.int32), categories=list(self.categories))
+
+
+class _ObjectBuffer:
+
+    def __init__(self, dtype: Optional[str]=None):
+        self.dtype = dtype
+        self.values = []
+
+    def append(self, value):
+        self.values.append(value)
+
+    def to_array(self):
+        if self.dtype is None:
+            # untyped column, dtype is inferred from the values
+            return pd.Series(self.values).array
+        return pd.array(self.values, dtype=self.dtype)
+
+
+_BUFFERS = {
+    "float64": _FloatBuffer,
+    "boolean": _BoolBuffer,
+    "Int64": _IntBuffer,
+    "category": _CategoryBuffer,
+    "string": lambda: _ObjectBuffer("string"),
+    "object": lambda: _ObjectBuffer("object")
+}
+
+
+class ColumnBuffers:
+
+    """Typed column buffers for building a table row by row, without keeping the rows.
+    Values of columns in the schema are stored in compact typed arrays, other columns are kept as lists of objects (dtype inferred at the end).
+    ARGS:
+        - schema (Dict[str, str]): column names and pandas dtypes ("float64", "boolean", "Int64", "category", "string" or "object"). default=None
+        - all_columns (bool): make all columns of the schema up front (in schema order), so tables built in chunks have the same columns
+                              even if some chunks have no values of a column. default=False (columns are made as they appear in the rows)"""
+
+    def __init__(self, schema: Optional[Dict[str, str]]=None, all_columns: bool=False):
+        self.schema = dict(schema) if schema is not None else {}
+        for name, dtype in self.schema.items():
+            if not dtype in _BUFFERS:
+                raise ValueError("Unsupported dtype {} for column {}. supported dtypes are {}".format(dtype, name, ", ".join(_BUFFERS)))
+        self.buffers = {}
+        self.n_rows = 0
+        if all_columns:
+            for name in self.schema:
+                self._add_column(name)
+
+    def _add_column(self, name: str):
+        dtype = self.schema.get(name)
+        buffer = _BUFFERS[dtype]() if dtype is not None else _ObjectBuffer()
+        # the rows before the column appeared have missing values
+        for _ in range(self.n_rows):
+            buffer.append(None)
+        self.buffers[name] = buffer
+
+    def append(self, row: dict):
+        """Method to add a row (dictionary with column names and values)"""
+        for name in row:
+            if not name in self.buffers:
+                self._add_column(name)
+        for name, buffer in self.buffers.items():
+            try:
+                buffer.append(row.get(name))
+            except (TypeError, ValueError):
+                raise ValueError("Value {} of column {} doesn't match the dtype {}".format(repr(row.get(name)), name, self.schema.get(name)))
+        self.n_rows += 1
+
+    def __len__(self):
+        return self.n_rows
+
+    def to_frame(self) -> pd.DataFrame:
+        """Method to make a dataframe from the buffers. Columns are in the order they first appeared in the rows"""
+        if self.n_rows == 0:
+            return pd.DataFrame()
+        return pd.DataFrame({name: buffer.to_array() for name, buffer in self.buffers.items()})
@@ -1,52 +1,321 @@
 import os
-import pandas as pd
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple, Union
+from .ParseCache import ParseCache
+from .TableWriter import make_table_writer
+from .ColumnBuffers import ColumnBuffers
+from .Recorder import get_recorder, recording
+from .io.registry import registered_parsers, sniff_parser
+from time import perf_counter, time
+
+
+def _run_task(task):
+    """Runs a single (function, args, kwargs) task. Defined on module level so it can be sent to worker processes"""
+    f, args, kwargs = task
+    return f(*args, **kwargs)
+
+
+def _read_file_data(file_parser, dir: str, fname: str, args: tuple, kwargs: dict, specie_path: Optional[str]=None) -> dict:
+    """Reads the scalar data of a single file in the directory. If specie_path is given, also saves the specie of the file (in the same pass over the file,
+    if read_scalar_data has no arguments)"""
+    f = file_parser(os.path.join(dir, fname))
+    if specie_path is None:
+        d = f.read_scalar_data(*args, **kwargs)
+    elif len(kwargs) > 0:
+        # the scalar data section takes no arguments, data read with arguments (e.g. tail_first) is read by read_scalar_data
+        d = f.read_scalar_data(**kwargs)
+        f.read_specie().save_to_file(specie_path)
+    else:
+        sections = f.read_all(["scalar_data", "specie"])
+        sections["specie"].save_to_file(specie_path)
+        d = sections["scalar_data"]
+    d.update({"dir": dir, "name": os.path.splitext(fname)[0]})
+    return d
+
+
+def _timed_read_file_data(file_parser, dir: str, fname: str, args: tuple, kwargs: dict, specie_path: Optional[str]=None) -> Tuple[dict, List[dict]]:
+    """Reads the data of a single file (see _read_file_data) with instrumentation. Returns the data and the records of the file
+    (the records are sent back to the parent process in parallel runs)"""
+    path = os.path.join(dir, fname)
+    with recording() as recorder:
+        start = time()
+        t = perf_counter()
+        d = _read_file_data(file_parser, dir, fname, args, kwargs, specie_path)
+        recorder.record("parse_file", file_parser.__name__, perf_counter() - t, start, path=path, bytes=os.path.getsize(path))
+    return d, recorder.records
+
+
+def _read_mixed_file_data(parsers: tuple, dir: str, fname: str, args: tuple, kwargs: dict, specie_path: Optional[str]=None,
+                            timed: bool=False) -> Optional[tuple]:
+    """Reads the data of a single file of a mixed directory (see _read_file_data), with the parser that matches its first bytes.
+    The file is sniffed here, so files are sniffed in the worker processes. Returns the parser and the data (with the records if timed),
+    None if the file matches no parser"""
+    file_parser = sniff_parser(os.path.join(dir, fname), parsers)
+    if file_parser is None:
+        return None
+    read = _timed_read_file_data if timed else _read_file_data
+    return file_parser, read(file_parser, dir, fname, args, kwargs, specie_path)
+
+
+def _save_file_specie(file_parser, path: str, specie_path: str, args: tuple, kwargs: dict):
+    """Saves the specie of a single file in the directory. file_parser can be a tuple of candidate parsers (of a mixed directory),
+    the file is then saved with the parser that matches its first bytes (files that match no parser are skipped)"""
+    if isinstance(file_parser, tuple):
+        file_parser = sniff_parser(path, file_parser)
+        if file_parser is None:
+            return
+    f = file_parser(path)
+    f.save_specie(specie_path, *args, **kwargs)
+
 
 class DirParser:
-    """General purpose class to handel files in directory"""
+    """General purpose class to handel files in directory.
+    ARGS:
+        - file_type (Union[FileParser, List[FileParser]]): the file parser class of the files in the directory. for directories with files of several
+                                                           programs, a list of parser classes or None (the registered parsers, see torinax.io.registry).
+                                                           each file is then parsed by the parser that matches its first bytes, files that match no parser
+                                                           are skipped, and the data has a program column. default=None"""
 
-    def __init__(self, file_type):
-        self.file_parser = file_type
+    cache_fname = ".torinax_cache.sqlite"
 
-    def apply_function_to_directory(self, f: callable, path, *args, **kwargs):
-        """Method to apply a function (f(path, fname, *args, **kwargs)) on the directory"""
-        if not os.path.isdir(path):
-            raise ValueError("{} is not a directory. Must provide a dicrectory".format(path))
-        outs = []
-        for dir, subdir, fnames in os.walk(path):
-            for fname in fnames:
-                if fname.endswith(self.file_parser.extension):
-                    outs.append(f(self.file_parser, os.path.join(dir, subdir), fname, *args, **kwargs))
-        return outs
+    def __init__(self, file_type=None):
+        if file_type is None or isinstance(file_type, (list, tuple)):
+            # parsers of mixed directories (files are dispatched by content)
+            self.parsers = list(file_type) if file_type is not None else registered_parsers()
+            self.file_parser = None
+        else:
+            self.parsers = None
+            self.file_parser = file_type
 
-    def read_data(self, path, *args, **kwargs):
-        """Method to read all files in the directory"""
+    def _open_cache(self, path, cache: Union[bool, str]) -> Optional[ParseCache]:
+        """Method to open the parse cache of a directory. cache is either a bool (use the default cache file in the directory) or a path to a cache file"""
+        if not cache:
+            return None
+        db_path = cache if isinstance(cache, str) else os.path.join(path, self.cache_fname)
+        return ParseCache(db_path, self.file_parser if self.parsers is None else self.parsers)
+
+    @staticmethod
+    def _make_species_dir(path) -> str:
+        """Method to make the 'molecule_files' directory for species files in the path"""
+        mol_dir = os.path.join(path, 'molecule_files')
+        if not os.path.isdir(mol_dir):
+            os.mkdir(mol_dir)
+        return mol_dir
+
+    def prune_cache(self, path, cache: Union[bool, str]=True) -> int:
+        """Method to remove cache entries of deleted files or older parser versions. Returns the number of removed entries"""
+        parse_cache = self._open_cache(path, cache)
+        n = parse_cache.prune()
+        parse_cache.close()
+        return n
+
+    @property
+    def schema(self) -> dict:
+        """Typed schema of the data table: the schema of the file parser (of all parsers, with the program column, for mixed directories)
+        and the file location columns"""
+        if self.parsers is None:
+            return dict(getattr(self.file_parser, "schema", {}), dir="category", name="string")
+        schema = {}
+        for parser in self.parsers:
+            for key, dtype in getattr(parser, "schema", {}).items():
+                # values of the same key with different types are kept as objects
+                schema[key] = dtype if schema.get(key, dtype) == dtype else "object"
+        return dict(schema, program="category", dir="category", name="string")
+
+    @staticmethod
+    def program_name(file_parser) -> str:
+        """Method to get the name of the program of a file parser (its class name if it doesn't define a program)"""
+        return file_parser.program if file_parser.program is not None else file_parser.__name__
+
+    def _list_files(self, path) -> List[Tuple[str, str, Union[type, tuple]]]:
+        """Method to list (dir, fname, file parser) of all files of the parser in the directory tree, in os.walk order.
+        For mixed directories, files are listed by extension only, with a tuple of the parsers of their extension. The parser of every file
+        is then found by its first bytes where it is read (see torinax.io.registry.sniff_parser), so files are not opened while listing"""
         if not os.path.isdir(path):
             raise ValueError("{} is not a directory. Must provide a dicrectory".format(path))
-        data = []
+        files = []
         for dir, subdirs, fnames in os.walk(path):
             for fname in fnames:
-                if fname.endswith(self.file_parser.extension):
-                    f = self.file_parser(os.path.join(dir, fname))
-                    d = f.read_scalar_data(*args, **kwargs)
+                if self.parsers is None:
+                    if fname.endswith(self.file_parser.extension):
+                        files.append((dir, fname, self.file_parser))
+                    continue
+                candidates = tuple(parser for parser in self.parsers if fname.endswith(parser.extension))
+                if len(candidates) > 0:
+                    files.append((dir, fname, candidates))
+        return files
+
+    def _sniff_files(self, files: List[Tuple[str, str, Union[type, tuple]]]) -> List[Tuple[str, str, type]]:
+        """Method to find the parsers of listed files of a mixed directory (see _list_files). Files that match no parser are dropped"""
+        sniffed = []
+        for dir, fname, parser in files:
+            if isinstance(parser, tuple):
+                parser = sniff_parser(os.path.join(dir, fname), parser)
+            if parser is not None:
+                sniffed.append((dir, fname, parser))
+        return sniffed
+
+    @staticmethod
+    def _imap(tasks: list, n_workers: int=1, chunksize: Optional[int]=None, executor: Optional[Executor]=None) -> Iterator:
+        """Method to run a list of (function, args, kwargs) tasks, serially or on a pool of worker processes.
+        ARGS:
+            - tasks (list): list of (function, args, kwargs) tuples. functions must be picklable for parallel runs
+            - n_workers (int): number of worker processes. default=1 (runs in the current process)
+            - chunksize (int): number of tasks sent to a worker at once. default=None (tasks are split to ~4 chunks per worker)
+            - executor (Executor): an existing executor to run the tasks with (n_workers is then only used to size the chunks). default=None
+        RETURNS:
+            (Iterator) task results, in the order of the tasks, as they are done"""
+        if executor is None and n_workers <= 1:
+            for task in tasks:
+                yield _run_task(task)
+            return
+        if chunksize is None:
+            chunksize = max(1, len(tasks) // (4 * max(n_workers, 1)))
+        if executor is not None:
+            yield from executor.map(_run_task, tasks, chunksize=chunksize)
+            return
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            yield from pool.map(_run_task, tasks, chunksize=chunksize)
+
+    @classmethod
+    def _map(cls, tasks: list, n_workers: int=1, chunksize: Optional[int]=None, executor: Optional[Executor]=None) -> list:
+        """Method to run a list of tasks (see _imap). Returns the list of task results, in the order of the tasks"""
+        return list(cls._imap(tasks, n_workers, chunksize, executor))
+
+    def apply_function_to_directory(self, f: callable, path, *args, n_workers: int=1, chunksize: Optional[int]=None, executor: Optional[Executor]=None, **kwargs):
+        """Method to apply a function (f(file_parser, dir, fname, *args, **kwargs)) on the directory.
+        For parallel runs (n_workers > 1 or executor) f must be picklable (defined on module level)"""
+        tasks = [(f, (parser, dir, fname) + args, kwargs) for dir, fname, parser in self._sniff_files(self._list_files(path))]
+        return self._map(tasks, n_workers, chunksize, executor)
+
+    def iter_data(self, path, *args, n_workers: int=1, chunksize: Optional[int]=None, executor: Optional[Executor]=None, cache: Union[bool, str]=False,
+                    species_ext: Optional[str]=None, **kwargs) -> Iterator[dict]:
+        """Method to read all files in the directory, one row at a time (see read_data for arguments).
+        RETURNS:
+            (Iterator[dict]) the data of the files, one dictionary per file (in os.walk order), as the files are read"""
+        files = self._list_files(path)
+        if species_ext is not None:
+            if len(args) > 0:
+                raise ValueError("Positional arguments for read_scalar_data are not supported when reading species")
+            mol_dir = self._make_species_dir(path)
+            specie_paths = [os.path.join(mol_dir, os.path.splitext(fname)[0] + "." + species_ext) for _, fname, _ in files]
+        else:
+            specie_paths = [None for _ in files]
+        parse_cache = self._open_cache(path, cache)
+        method = ParseCache.method_key("read_scalar_data", args, kwargs)
+        cached = {}
+        missing = []
+        for i, (dir, fname, parser) in enumerate(files):
+            if parse_cache is not None:
+                fpath = os.path.join(dir, fname)
+                file_key = ParseCache.file_key(fpath)
+                # files of mixed directories are not sniffed yet, the entry is of one of the parsers of their extension
+                for parser in (parser if isinstance(parser, tuple) else (parser,)):
+                    d = parse_cache.get(fpath, method, file_key, parser)
+                    if d is not None:
+                        break
+                # cached files are re-read if their specie file is missing
+                if d is not None and (specie_paths[i] is None or os.path.isfile(specie_paths[i])):
                     d.update({"dir": dir, "name": os.path.splitext(fname)[0]})
-                    data.append(d)
-        self.df = pd.DataFrame(data=data)
+                    if self.parsers is not None:
+                        d["program"] = self.program_name(parser)
+                    cached[i] = d
+                    continue
+                missing.append((i, file_key))
+            else:
+                missing.append((i, None))
+        recorder = get_recorder()
+        if self.parsers is None:
+            read = _read_file_data if recorder is None else _timed_read_file_data
+            tasks = [(read, (files[i][2], *files[i][:2], args, kwargs, specie_paths[i]), {}) for i, _ in missing]
+        else:
+            # files are sniffed by the workers
+            tasks = [(_read_mixed_file_data, (files[i][2], *files[i][:2], args, kwargs, specie_paths[i], recorder is not None), {}) for i, _ in missing]
+        results = self._imap(tasks, n_workers, chunksize, executor)
+        missing = iter(missing)
+        try:
+            for i in range(len(files)):
+                if i in cached:
+                    yield cached.pop(i)
+                    continue
+                _, file_key = next(missing)
+                d = next(results)
+                parser = files[i][2]
+                if self.parsers is not None:
+                    if d is None:
+                        # the file matches no parser
+                        continue
+                    parser, d = d
+                if recorder is not None:
+                    d, records = d
+                    recorder.extend(records)
+                if parse_cache is not None:
+                    values = {k: v for k, v in d.items() if k not in ("dir", "name")}
+                    parse_cache.put(os.path.join(*files[i][:2]), method, values, file_key, commit=False, file_parser=parser)
+                if self.parsers is not None:
+                    d["program"] = self.program_name(parser)
+                yield d
+        finally:
+            # files read before a failure stay in the cache
+            if parse_cache is not None:
+                parse_cache.commit()
+                parse_cache.close()
+
+    def read_data(self, path, *args, n_workers: int=1, chunksize: Optional[int]=None, executor: Optional[Executor]=None, cache: Union[bool, str]=False,
+                    species_ext: Optional[str]=None, **kwargs):
+        """Method to read all files in the directory.
+        ARGS:
+            - path (str): path to the directory
+            - n_workers (int): number of worker processes for parsing files. default=1
+            - chunksize (int): number of files sent to a worker at once. default=None (automatic)
+            - executor (Executor): an existing executor to parse files with. default=None
+            - cache (Union[bool, str]): use a persistent parse cache, only new or changed files are parsed. if True, the cache file is
+                                        saved in the directory, a string is used as the path of the cache file. default=False
+            - species_ext (str): if given, also saves the species of the files (like save_species) with this extension.
+                                 the scalar data and the specie of each file are read in a single pass. default=None
+            - args, kwargs: passed to the read_scalar_data method of the file parser
+        RETURNS:
+            (pd.DataFrame) dataframe with the data of all files, one row per file (in os.walk order)"""
+        # rows are collected to typed columns (see the schema of the file parser)
+        columns = ColumnBuffers(self.schema)
+        for d in self.iter_data(path, *args, n_workers=n_workers, chunksize=chunksize, executor=executor, cache=cache, species_ext=species_ext, **kwargs):
+            columns.append(d)
+        self.df = columns.to_frame()
         return self.df
 
-    def save_species(self, path, ext, *args, **kwargs):
+    def export_data(self, path, out_path: str, *args, fmt: Optional[str]=None, chunk_rows: int=10000, n_workers: int=1, chunksize: Optional[int]=None,
+                        executor: Optional[Executor]=None, cache: Union[bool, str]=False, species_ext: Optional[str]=None, **kwargs) -> int:
+        """Method to read all files in the directory and stream the data to a table file, without keeping all rows in memory.
+        Rows are written in chunks as the files are read, so a run that stops midway leaves the rows written so far in the output.
+        ARGS:
+            - path (str): path to the directory
+            - out_path (str): path of the output. a file for csv and arrow (IPC stream), a directory of part files for parquet
+            - fmt (str): output format ("csv", "arrow" or "parquet"). default=None (by the extension of out_path, csv if it has none)
+            - chunk_rows (int): number of rows written at once. default=10000
+            - n_workers, chunksize, executor, cache, species_ext, args, kwargs: see read_data
+        RETURNS:
+            (int) number of written rows"""
+        # every chunk has all columns of the schema, also columns without values in the chunk (e.g. of programs that are not in it)
+        columns = ColumnBuffers(self.schema, all_columns=True)
+        with make_table_writer(out_path, fmt) as writer:
+            for d in self.iter_data(path, *args, n_workers=n_workers, chunksize=chunksize, executor=executor, cache=cache, species_ext=species_ext, **kwargs):
+                columns.append(d)
+                if len(columns) >= chunk_rows:
+                    writer.write(columns.to_frame())
+                    columns = ColumnBuffers(self.schema, all_columns=True)
+            writer.write(columns.to_frame())
+            return writer.n_rows
+
+    def save_species(self, path, ext, *args, n_workers: int=1, chunksize: Optional[int]=None, executor: Optional[Executor]=None, **kwargs):
         """Save all species in files in \'molecule_files\' directory in the path. Using the save_species method in the file parser"""
-        if not os.path.isdir(path):
-            raise ValueError("{} is not a directory. Must provide a dicrectory".format(path))
-        # making directory for molecules
-        mol_dir = os.path.join(path, 'molecule_files')
-        if not os.path.isdir(mol_dir):
-            os.mkdir(mol_dir)
-        for dir, subdir, fnames in os.walk(path):
-            for fname in fnames:
-                if fname.endswith(self.file_parser.extension):
-                    f = self.file_parser(os.path.join(dir, fname))
-                    mol = f.save_specie(os.path.join(mol_dir, os.path.splitext(fname)[0] + "." + ext), *args, **kwargs)
+        files = self._list_files(path)
+        mol_dir = self._make_species_dir(path)
+        tasks = []
+        for dir, fname, parser in files:
+            specie_path = os.path.join(mol_dir, os.path.splitext(fname)[0] + "." + ext)
+            tasks.append((_save_file_specie, (parser, os.path.join(dir, fname), specie_path, args, kwargs), {}))
+        self._map(tasks, n_workers, chunksize, executor)
 
     def to_csv(self, path):
         """Write data to csv file"""
-        self.df.to_csv(path, index=False)
\ No newline at end of file
+        self.df.to_csv(path, index=False)
@@ -0,0 +1,126 @@
+import os
+import json
+import sqlite3
+import inspect
+import hashlib
+from typing import List, Optional, Tuple, Union
+from .io import TriggerEngine
+
+# modules the parsing of all parsers depends on, their source is part of every parser fingerprint
+_ENGINE_MODULES = (TriggerEngine,)
+
+
+def _package_version() -> str:
+    """Method to get the installed version of torinax ('unknown' if it runs from a source tree)"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return "unknown"
+    try:
+        return version("torinax")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+class ParseCache:
+    """Persistent on-disk (SQLite) cache for data read from files by a file parser.
+    Entries are keyed on the file path and the read method (with its arguments) and are valid only if the size and modification time of the file
+    and the fingerprint of the parser (class, version attribute and source code) did not change since they were written.
+    ARGS:
+        - db_path (str): path to the cache database file
+        - file_parser (Union[FileParser, List[FileParser]]): the file parser class used to read the files, or a list of classes for directories with
+                                                             files of several programs (the first is the default parser of get and put)"""
+
+    def __init__(self, db_path: str, file_parser: Union[type, List[type]]):
+        self.db_path = db_path
+        parsers = list(file_parser) if isinstance(file_parser, (list, tuple)) else [file_parser]
+        self._parsers = {parser: ("{}.{}".format(parser.__module__, parser.__qualname__), self.parser_fingerprint(parser)) for parser in parsers}
+        self.parser, self.fingerprint = self._parsers[parsers[0]]
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS parse_cache ("
+                           "path TEXT NOT NULL, "
+                           "parser TEXT NOT NULL, "
+                           "method TEXT NOT NULL, "
+                           "size INTEGER NOT NULL, "
+                           "mtime_ns INTEGER NOT NULL, "
+                           "fingerprint TEXT NOT NULL, "
+                           "data TEXT NOT NULL, "
+                           "PRIMARY KEY (path, parser, method))")
+        self._conn.commit()
+
+    @staticmethod
+    def parser_fingerprint(file_parser) -> str:
+        """Method to make a string identifying a file parser. Contains the class name, its version attribute (if defined) and a hash of the
+        source code of the modules of the class and its bases, of the trigger engine and of the torinax version, so any change in the parser
+        code invalidates the cache entries."""
+        h = hashlib.sha1(_package_version().encode())
+        for module in _ENGINE_MODULES:
+            h.update(inspect.getsource(module).encode())
+        for cls in file_parser.__mro__:
+            if cls.__module__ in ("builtins", "abc"):
+                continue
+            try:
+                h.update(inspect.getsource(inspect.getmodule(cls)).encode())
+            except (OSError, TypeError):
+                h.update(cls.__qualname__.encode())
+        return "{}.{}:{}:{}".format(file_parser.__module__, file_parser.__qualname__, getattr(file_parser, "version", 0), h.hexdigest())
+
+    @staticmethod
+    def method_key(method: str, args: tuple=(), kwargs: Optional[dict]=None) -> str:
+        """Method to make a key for a read method called with given arguments"""
+        return method + json.dumps([list(args), kwargs or {}], sort_keys=True, default=str)
+
+    @staticmethod
+    def file_key(path: str) -> Tuple[int, int]:
+        """Method to get the identity (size, modification time in ns) of a file"""
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def get(self, path: str, method: str, file_key: Optional[Tuple[int, int]]=None, file_parser=None) -> Optional[dict]:
+        """Method to get cached data of a file. Returns None if there is no valid entry.
+        ARGS:
+            - path (str): path to the file
+            - method (str): read method key (see method_key)
+            - file_key (Tuple[int, int]): the (size, mtime) identity of the file. default=None (reads it from the file)
+            - file_parser (FileParser): the parser of the file (one of the cache's parsers). default=None (the first parser)"""
+        size, mtime_ns = file_key if file_key is not None else self.file_key(path)
+        parser, fingerprint = self._parsers[file_parser] if file_parser is not None else (self.parser, self.fingerprint)
+        row = self._conn.execute("SELECT data FROM parse_cache WHERE path=? AND parser=? AND method=? AND size=? AND mtime_ns=? AND fingerprint=?",
+                                 (os.path.abspath(path), parser, method, size, mtime_ns, fingerprint)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def put(self, path: str, method: str, data: dict, file_key: Optional[Tuple[int, int]]=None, commit: bool=True, file_parser=None):
+        """Method to write data of a file to the cache.
+        ARGS:
+            - path (str): path to the file
+            - method (str): read method key (see method_key)
+            - data (dict): the read data. must be JSON serializable
+            - file_key (Tuple[int, int]): the (size, mtime) identity of the file when it was read. default=None (reads it from the file)
+            - commit (bool): commit the entry to the database. default=True
+            - file_parser (FileParser): the parser of the file (one of the cache's parsers). default=None (the first parser)"""
+        size, mtime_ns = file_key if file_key is not None else self.file_key(path)
+        parser, fingerprint = self._parsers[file_parser] if file_parser is not None else (self.parser, self.fingerprint)
+        self._conn.execute("INSERT OR REPLACE INTO parse_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (os.path.abspath(path), parser, method, size, mtime_ns, fingerprint, json.dumps(data)))
+        if commit:
+            self._conn.commit()
+
+    def commit(self):
+        self._conn.commit()
+
+    def prune(self) -> int:
+        """Method to remove entries of deleted files and entries written by other versions of the parsers. Returns the number of removed entries"""
+        n = 0
+        for parser, fingerprint in self._parsers.values():
+            n += self._conn.execute("DELETE FROM parse_cache WHERE parser=? AND fingerprint!=?", (parser, fingerprint)).rowcount
+        paths = [row[0] for row in self._conn.execute("SELECT DISTINCT path FROM parse_cache")]
+        for path in paths:
+            if not os.path.isfile(path):
+                n += self._conn.execute("DELETE FROM parse_cache WHERE path=?", (path,)).rowcount
+        self._conn.commit()
+        return n
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+import json
+import threading
+from contextlib import contextmanager, nullcontext
+from time import perf_counter, time
+from typing import Iterator, List, Optional
+from .lazy import LazyModule
+
+# pandas is only needed for the tables of the records
+pd = LazyModule("pandas")
+
+
+class Recorder:
+
+    """Collects timing records of parsers, computations and clients. Records are dictionaries with a kind (parse_file, section, computation...),
+    a name, a duration in seconds, the start time (UNIX timestamp) and extra fields (bytes, phase, job_id...).
+    Instrumentation is off unless a recorder is set (see set_recorder and recording).
+    ARGS:
+        - jsonl_path (str): if given, every record is also appended to this JSON lines file as it is recorded. default=None
+        - keep (bool): keep the records in memory (for summary). default=True"""
+
+    def __init__(self, jsonl_path: Optional[str]=None, keep: bool=True):
+        self.records = []
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._file = open(jsonl_path, "a") if jsonl_path is not None else None
+
+    def record(self, kind: str, name: str, duration: float, start: Optional[float]=None, **fields):
+        """Method to add a record.
+        ARGS:
+            - kind (str): kind of the record
+            - name (str): name of the recorded object (parser, section, computation...)
+            - duration (float): duration in seconds
+            - start (float): start time (UNIX timestamp). default=None (now - duration)
+            - fields: extra fields of the record"""
+        rec = {"kind": kind, "name": name, "duration": duration, "start": start if start is not None else time() - duration}
+        rec.update(fields)
+        self.extend([rec])
+
+    def extend(self, records: List[dict]):
+        """Method to add records (for example records collected in a worker process)"""
+        with self._lock:
+            if self.keep:
+                self.records += records
+            if self._file is not None:
+                for rec in records:
+                    self._file.write(json.dumps(rec, default=str) + "\n")
+                self._file.flush()
+
+    @contextmanager
+    def timer(self, kind: str, name: str, **fields):
+        """Method to record the duration of a with block"""
+        start = time()
+        t = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, perf_counter() - t, start, **fields)
+
+    def to_jsonl(self, path: str):
+        """Method to write the records to a JSON lines file"""
+        with open(path, "w") as f:
+            for rec in self.records:
+                f.write(json.dumps(rec, default=str) + "\n")
+
+    def to_frame(self) -> pd.DataFrame:
+        """Method to get the records as a dataframe, one row per record"""
+        return pd.DataFrame(self.records)
+
+    def summary(self) -> pd.DataFrame:
+        """Method to summarize the records by kind and name (and phase, if recorded).
+        RETURNS:
+            (pd.DataFrame) count, total, mean and max duration (seconds), and total bytes and throughput (MB/s) where bytes are recorded.
+                           sorted by total duration"""
+        df = self.to_frame()
+        if len(df) == 0:
+            return pd.DataFrame(columns=["kind", "name", "count", "total", "mean", "max"])
+        keys = ["kind", "name"] + (["phase"] if "phase" in df.columns else [])
+        df[keys] = df[keys].fillna("")
+        summary = df.groupby(keys)["duration"].agg(["count", "sum", "mean", "max"]).rename(columns={"sum": "total"})
+        if "bytes" in df.columns:
+            summary["bytes"] = df.groupby(keys)["bytes"].sum(min_count=1)
+            summary["MB/s"] = summary["bytes"] / summary["total"] / 1e6
+        return summary.reset_index().sort_values("total", ascending=False, ignore_index=True)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_recorder = None
+
+
+def get_recorder() -> Optional[Recorder]:
+    """Method to get the current recorder. None if instrumentation is off"""
+    return _recorder
+
+
+def set_recorder(recorder: Optional[Recorder]) -> Optional[Recorder]:
+    """Method to set the current recorder (None turns instrumentation off). Returns the previous recorder"""
+    global _recorder
+    previous = _recorder
+    _recorder = recorder
+    return previous
+
+
+@contextmanager
+def recording(recorder: Optional[Recorder]=None) -> Iterator[Recorder]:
+    """Method to record everything in a with block.
+    ARGS:
+        - recorder (Recorder): the recorder. default=None (a new recorder)
+    RETURNS:
+        (Recorder) the recorder"""
+    recorder = recorder if recorder is not None else Recorder()
+    previous = set_recorder(recorder)
+    try:
+        yield recorder
+    finally:
+        set_recorder(previous)
+
+
+def timer(kind: str, name: str, **fields):
+    """Method to record the duration of a with block with the current recorder (does nothing if instrumentation is off)"""
+    if _recorder is None:
+        return nullcontext()
+    return _recorder.timer(kind, name, **fields)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import os
+from abc import ABC, abstractclassmethod
+from typing import Optional
+from .lazy import LazyModule, module_available
+
+# pandas and pyarrow are imported when the first chunk is written
+pd = LazyModule("pandas")
+pa = LazyModule("pyarrow")
+pq = LazyModule("pyarrow.parquet")
+
+
+class TableWriter (ABC):
+
+    """Abstract writer of a table in chunks. Every written chunk is saved to the output immediately, so a run that stops midway leaves
+    the rows written so far in a readable file.
+    ARGS:
+        - path (str): path of the output"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.n_rows = 0
+
+    @abstractclassmethod
+    def _write(self, df: pd.DataFrame):
+        """Method to save a chunk of rows to the output"""
+        pass
+
+    def write(self, df: pd.DataFrame):
+        """Method to write a chunk of rows to the output"""
+        if len(df) == 0:
+            return
+        self._write(df)
+        self.n_rows += len(df)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CsvTableWriter (TableWriter):
+
+    """Writes a table to a CSV file, chunks are appended to the file. The columns are set by the first chunk"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.columns = None
+        self._file = open(path, "w", newline="")
+
+    def _write(self, df: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            df.to_csv(self._file, index=False)
+        else:
+            extra = [c for c in df.columns if not c in self.columns]
+            if len(extra) > 0:
+                raise ValueError("Columns {} are not in the header of {}".format(extra, self.path))
+            df.reindex(columns=self.columns).to_csv(self._file, index=False, header=False)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ArrowTableWriter (TableWriter):
+
+    """Writes a table to an Arrow IPC stream file. The schema is set by the first chunk (or given), chunks are written as record batches.
+    ARGS:
+        - path (str): path of the output file
+        - schema (pa.Schema): schema of the table. default=None (inferred from the first chunk)"""
+
+    def __init__(self, path: str, schema=None):
+        if not module_available("pyarrow"):
+            raise ModuleNotFoundError("pyarrow is required for writing Arrow files")
+        super().__init__(path)
+        self.schema = schema
+        self._sink = pa.OSFile(path, "wb")
+        self._writer = None
+
+    def _write(self, df: pd.DataFrame):
+        if self.schema is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            # the index width of dictionary (categorical) columns depends on the number of categories in the chunk, using a fixed width
+            self.schema = pa.schema([pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type)) if pa.types.is_dictionary(f.type) else f
+                                     for f in schema])
+        extra = [c for c in df.columns if not c in self.schema.names]
+        if len(extra) > 0:
+            raise ValueError("Columns {} are not in the table schema of {}".format(extra, self.path))
+        try:
+            table = pa.Table.from_pandas(df.reindex(columns=self.schema.names), schema=self.schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as err:
+            raise ValueError("Chunk doesn't match the table schema of {} ({}). Please supply a schema".format(self.path, err))
+        if self._writer is None:
+            self._writer = pa.ipc.new_stream(self._sink, self.schema)
+        self._writer.write_table(table)
+        self._sink.flush()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._sink.close()
+
+
+class ParquetTableWriter (TableWriter):
+
+    """Writes a table to a directory of Parquet files, one complete file per chunk (readable as one dataset with pd.read_parquet(path)).
+    ARGS:
+        - path (str): path of the output directory
+        - schema (pa.Schema): schema of the table. default=None (inferred for every chunk)"""
+
+    def __init__(self, path: str, schema=None):
+        if not module_available("pyarrow"):
+            raise ModuleNotFoundError("pyarrow is required for writing Parquet files")
+        super().__init__(path)
+        self.schema = schema
+        self.n_parts = 0
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _write(self, df: pd.DataFrame):
+        if self.schema is not None:
+            table = pa.Table.from_pandas(df.reindex(columns=self.schema.names), schema=self.schema, preserve_index=False)
+        else:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        name = "part-{:05d}.parquet".format(self.n_parts)
+        # the part is written under a hidden temporary name (ignored by dataset readers), so only complete parts are in the dataset
+        tmp = os.path.join(self.path, "." + name + ".tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, os.path.join(self.path, name))
+        self.n_parts += 1
+
+
+def make_table_writer(path: str, fmt: Optional[str]=None, schema=None) -> TableWriter:
+    """Method to make a table writer for a path.
+    ARGS:
+        - path (str): path of the output
+        - fmt (str): output format ("csv", "arrow" or "parquet"). default=None (by the extension of the path, csv if it has none)
+        - schema (pa.Schema): schema of the table for Arrow and Parquet outputs. default=None
+    RETURNS:
+        (TableWriter) the writer"""
+    if fmt is None:
+        ext = os.path.splitext(path)[-1].lower()
+        fmt = {".arrow": "arrow", ".arrows": "arrow", ".ipc": "arrow", ".parquet": "parquet"}.get(ext, "csv")
+    if fmt == "csv":
+        return CsvTableWriter(path)
+    if fmt == "arrow":
+        return ArrowTableWriter(path, schema)
+    if fmt == "parquet":
+        return ParquetTableWriter(path, schema)
+    raise ValueError("Unknown table format {}. supported formats are csv, arrow and parquet".format(fmt))
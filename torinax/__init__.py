@@ -1 +1,4 @@
-from . import base, utils, io, clients
\ No newline at end of file
+from .lazy import lazy_package
+
+# sub-packages are imported on first use, so workers that import a single parser don't pay for the others
+lazy_package(__name__, {"base": ".base", "utils": ".utils", "io": ".io", "clients": ".clients"})
@@ -1,10 +1,56 @@
-from dataclasses import dataclass
 from typing import Optional
 import numpy as np
 
-@dataclass
+
 class Atom:
 
-    symbol: str = ""
-    coordinates: Optional[np.ndarray] = None
-    parent_specie = None
+    """Representation of an atom. An atom of a specie is a lightweight view on the atom arrays of the specie (symbols and coordinates),
+    so setting its symbol or coordinates changes the specie. Atoms created on their own hold their own data.
+    ARGS:
+        - symbol (str): atomic symbol. default=\"\"
+        - coordinates (np.ndarray): cartesian coordinates of the atom. default=None"""
+
+    __slots__ = ("_symbol", "_coordinates", "parent_specie", "index")
+
+    def __init__(self, symbol: str="", coordinates: Optional[np.ndarray]=None):
+        self._symbol = symbol
+        self._coordinates = coordinates
+        self.parent_specie = None
+        self.index = None
+
+    @classmethod
+    def view(cls, specie, index: int):
+        """Method to make an atom that views the index-th atom of a specie"""
+        atom = cls.__new__(cls)
+        atom.parent_specie = specie
+        atom.index = index
+        return atom
+
+    @property
+    def symbol(self) -> str:
+        if self.parent_specie is None:
+            return self._symbol
+        return self.parent_specie.symbols[self.index]
+
+    @symbol.setter
+    def symbol(self, value: str):
+        if self.parent_specie is None:
+            self._symbol = value
+        else:
+            self.parent_specie.symbols[self.index] = value
+
+    @property
+    def coordinates(self) -> Optional[np.ndarray]:
+        if self.parent_specie is None:
+            return self._coordinates
+        return self.parent_specie.coordinates[self.index]
+
+    @coordinates.setter
+    def coordinates(self, value: np.ndarray):
+        if self.parent_specie is None:
+            self._coordinates = value
+        else:
+            self.parent_specie.coordinates[self.index] = value
+
+    def __repr__(self):
+        return "Atom(symbol={!r}, coordinates={!r})".format(self.symbol, self.coordinates)
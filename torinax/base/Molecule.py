@@ -5,31 +5,63 @@ from .Bond import Bond
 from typing import List, Optional
 import numpy as np
 
+
+class BondList (list):
+
+    """List of the bonds of a molecule. Counts its changes (version), so the adjacency lists of the molecule are rebuilt after any change"""
+
+    def __init__(self, bonds=()):
+        super().__init__(bonds)
+        self.version = 0
+
+
+def _counted(method):
+    """Method to make a list method that increases the version of the bond list"""
+    def counted(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+    counted.__name__ = method.__name__
+    return counted
+
+for _name in ["append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse", "__setitem__", "__delitem__", "__iadd__", "__imul__"]:
+    setattr(BondList, _name, _counted(getattr(list, _name)))
+
+
 class Molecule (Specie):
     """Representation of a molecule.
     ARGS:
-        - atoms (List[Atom]): list of atoms in the structure
-        - lattice (Lattice): Lattice structure"""
+        - atoms (List[Atom]): list of atoms in the molecule
+        - bonds (List[Bond]): list of bonds in the molecule
+        - symbols (List[str]): atomic symbols (instead of atoms). default=None
+        - coordinates (np.ndarray): (N, 3) array of cartesian coordinates (instead of atoms). default=None"""
 
-    def __init__(self, atoms: Optional[List[Atom]]=None, bonds: Optional[List[Bond]]=None):
-        if bonds is None:
-            self.bonds = []
-        else:
-            self.bonds = bonds
-        if atoms is None:
+    def __init__(self, atoms: Optional[List[Atom]]=None, bonds: Optional[List[Bond]]=None, symbols: Optional[List[str]]=None, coordinates: Optional[np.ndarray]=None):
+        self.bonds = bonds if bonds is not None else []
+        if atoms is None and symbols is None and coordinates is None:
             atoms = []
         for bond in self.bonds:
             bond.parent_specie = self
-        super().__init__(atoms)
+        super().__init__(atoms, symbols, coordinates)
+
+    @property
+    def bonds(self) -> BondList:
+        return self._bonds
+
+    @bonds.setter
+    def bonds(self, bonds: List[Bond]):
+        self._bonds = BondList(bonds)
+        # adjacency lists of the atoms (neighbor indices, in bond order), built on first use. valid for the indexed version of the bonds list
+        self._adjacency = None
+        self._indexed_version = None
 
     
     def save_to_file(self, path):
         if path.endswith('.xyz'):
             with open(path, "w") as f:
-                f.write(str(len(self.atoms)) + "\r")
+                f.write(str(len(self.symbols)) + "\r")
                 f.write("GENERATED FROM PYTHON\r")
-                for atom in self.atoms:
-                    string = " ".join([atom.symbol] + [str(x) for x in atom.coordinates]) + "\r"
+                for symbol, coords in zip(self.symbols, self.coordinates):
+                    string = " ".join([symbol] + [str(x) for x in coords]) + "\r"
                     f.write(string)
         else:
             raise NotImplementedError("Currently there is support only for XYZ files")
@@ -37,17 +69,59 @@ class Molecule (Specie):
     
     def add_bond(self, bond: Bond):
         bond.parent_specie = self
+        valid = self._adjacency is not None and self._indexed_version == self.bonds.version
         self.bonds.append(bond)
+        if valid:
+            self._index_bond(bond)
+            self._indexed_version = self.bonds.version
+
+    def add_atoms(self, symbols: List[str], coordinates: np.ndarray):
+        super().add_atoms(symbols, coordinates)
+        if self._adjacency is not None:
+            self._adjacency += [[] for _ in range(len(self.symbols) - len(self._adjacency))]
+
+    def remove_atoms(self, indices: List[int]):
+        """Method to remove atoms and their bonds from the molecule. The other bonds are renumbered"""
+        indices = sorted(set(indices))
+        super().remove_atoms(indices)
+        removed = set(indices)
+        # new index of every kept atom
+        shift = np.cumsum([i in removed for i in range(len(self.symbols) + len(indices))])
+        bonds = [bond for bond in self.bonds if not bond.first_atom_idx in removed and not bond.second_atom_idx in removed]
+        for bond in bonds:
+            bond.first_atom_idx -= int(shift[bond.first_atom_idx])
+            bond.second_atom_idx -= int(shift[bond.second_atom_idx])
+        self.bonds = bonds
+
+    def _index_bond(self, bond: Bond):
+        """Method to add a bond to the adjacency lists"""
+        i, j = bond.first_atom_idx, bond.second_atom_idx
+        n = max(i, j) + 1
+        if n > len(self._adjacency):
+            self._adjacency += [[] for _ in range(n - len(self._adjacency))]
+        self._adjacency[i].append(j)
+        if not i == j:
+            self._adjacency[j].append(i)
+
+    def _get_adjacency(self) -> List[List[int]]:
+        """Method to get the adjacency lists of the atoms. The lists are built once and updated by add_bond and join,
+        they are rebuilt after any other change of the bonds list (bonds changed in place, e.g. bond.first_atom_idx = 2, are not tracked)"""
+        if self._adjacency is None or not self._indexed_version == self.bonds.version:
+            self._adjacency = [[] for _ in range(len(self.symbols))]
+            for bond in self.bonds:
+                self._index_bond(bond)
+            self._indexed_version = self.bonds.version
+        return self._adjacency
 
     def centralize_coordinates(self):
         """Method to make the center of the molecule at (0, 0, 0)"""
-        center = np.mean([a.coordinates for a in self.atoms], axis=0)
+        center = np.mean(self.coordinates, axis=0)
         self.move_by_vector(np.negative(center))
 
 
     def move_by_vector(self, vector: np.ndarray):
-        for atom in self.atoms:
-            atom.coordinates = atom.coordinates + vector
+        # a new array, so coordinates arrays passed to the constructor are not changed
+        self.coordinates = self.coordinates + vector
 
     
     def get_neighbors(self, atom_idx: int):
@@ -56,20 +130,47 @@ class Molecule (Specie):
             - atom_idx (int): atom index in molecule
         RETURNS
             (List[int]) list of neighbor indicis"""
-        neighbors = []
-        for bond in self.bonds:
-            if atom_idx == bond.first_atom_idx:
-                neighbors.append(bond.second_atom_idx)
-            elif atom_idx == bond.second_atom_idx:
-                neighbors.append(bond.first_atom_idx)
-        return neighbors
+        adjacency = self._get_adjacency()
+        if atom_idx < 0 or atom_idx >= len(adjacency):
+            return []
+        return list(adjacency[atom_idx])
+
+    def get_degree(self, atom_idx: int) -> int:
+        """Method to get the number of bonds of an atom.
+        ARGS:
+            - atom_idx (int): atom index in molecule
+        RETURNS
+            (int) number of neighbors of the atom"""
+        return len(self.get_neighbors(atom_idx))
+
+    def get_fragments(self) -> List[List[int]]:
+        """Method to get the fragments (connected components) of the molecule.
+        RETURNS
+            (List[List[int]]) list of fragments, each is a sorted list of atom indices. fragments are ordered by their first atom"""
+        adjacency = self._get_adjacency()
+        fragment_of = [-1 for _ in adjacency]
+        fragments = []
+        for root in range(len(adjacency)):
+            if fragment_of[root] >= 0:
+                continue
+            fragment_of[root] = len(fragments)
+            fragment = [root]
+            stack = [root]
+            while len(stack) > 0:
+                for neighbor in adjacency[stack.pop()]:
+                    if fragment_of[neighbor] < 0:
+                        fragment_of[neighbor] = len(fragments)
+                        fragment.append(neighbor)
+                        stack.append(neighbor)
+            fragments.append(sorted(fragment))
+        return fragments
 
     
     def join(self, molecule):
         """Method to join two molecules"""
-        for atom in molecule.atoms:
-            self.atoms.append(atom)
+        offset = len(self.symbols)
+        self.add_atoms(molecule.symbols, molecule.coordinates)
         for bond in molecule.bonds:
-            self.add_bond(Bond(bond.first_atom_idx + len(self.atoms) - len(molecule.atoms),
-                                bond.second_atom_idx + len(self.atoms) - len(molecule.atoms),
+            self.add_bond(Bond(bond.first_atom_idx + offset,
+                                bond.second_atom_idx + offset,
                                 bond.bond_order))
\ No newline at end of file
@@ -1,16 +1,107 @@
 from abc import ABC, abstractclassmethod
 from .Atom import Atom
-from typing import List, Optional
-from copy import copy
+from typing import Iterable, List, Optional
+import numpy as np
+
+
+class AtomsView:
+
+    """List-like view of the atoms of a specie. Atoms are made on access, as views on the arrays of the specie"""
+
+    def __init__(self, specie):
+        self.specie = specie
+
+    def __len__(self):
+        return len(self.specie.symbols)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [Atom.view(self.specie, i) for i in range(len(self))[idx]]
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError("atom index out of range")
+        return Atom.view(self.specie, idx)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Atom.view(self.specie, i)
+
+    def __delitem__(self, idx):
+        indices = range(len(self))[idx] if isinstance(idx, slice) else [range(len(self))[idx]]
+        self.specie.remove_atoms(indices)
+
+    def append(self, atom: Atom):
+        """Method to add an atom (its data is copied) to the specie"""
+        self.specie.add_atoms([atom.symbol], [_atom_coordinates(atom)])
+
+    def remove(self, atom: Atom):
+        """Method to remove an atom of the specie (got from its atoms)"""
+        if not atom.parent_specie is self.specie:
+            raise ValueError("Atom is not in the specie")
+        self.specie.remove_atoms([atom.index])
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def _atom_coordinates(atom: Atom) -> np.ndarray:
+    """Gets the coordinates of an atom, NaN if the atom has no coordinates"""
+    return atom.coordinates if atom.coordinates is not None else np.full(3, np.nan)
+
+
+def _coordinates_array(coordinates) -> np.ndarray:
+    """Makes an (N, 3) float array from coordinates, without copying if they are already a float array"""
+    return np.asarray(coordinates, dtype=float).reshape(-1, 3)
 
 
 class Specie (ABC):
-    
-    def __init__(self, atoms: Optional[List[Atom]]=None):
+
+    """Abstract specie (molecule, structure...). The atoms are stored as a list of symbols and an (N, 3) array of cartesian coordinates.
+    ARGS:
+        - atoms (List[Atom]): list of atoms, their data is copied into the specie arrays. default=None
+        - symbols (List[str]): atomic symbols (instead of atoms). default=None
+        - coordinates (np.ndarray): (N, 3) array of cartesian coordinates (instead of atoms). a float array is used as is (not copied). default=None"""
+
+    def __init__(self, atoms: Optional[List[Atom]]=None, symbols: Optional[Iterable[str]]=None, coordinates: Optional[np.ndarray]=None):
         self.properties = {}
-        self.atoms = [copy(atom) for atom in atoms] # copying list to prevent overriding problems
-        for atom in self.atoms:
-            atom.parent_specie = self
+        if atoms is not None and (symbols is not None or coordinates is not None):
+            raise ValueError("Specie can be made either from atoms or from symbols and coordinates, not both")
+        if atoms is not None:
+            # atoms data is copied to prevent overriding problems
+            symbols = [atom.symbol for atom in atoms]
+            coordinates = [_atom_coordinates(atom) for atom in atoms]
+        self.symbols = list(symbols) if symbols is not None else []
+        self.coordinates = _coordinates_array(coordinates if coordinates is not None else [])
+        if not len(self.symbols) == len(self.coordinates):
+            raise ValueError("Got {} symbols and {} coordinates".format(len(self.symbols), len(self.coordinates)))
+
+    @property
+    def atoms(self) -> AtomsView:
+        return AtomsView(self)
+
+    def add_atoms(self, symbols: Iterable[str], coordinates: np.ndarray):
+        """Method to add atoms to the specie.
+        ARGS:
+            - symbols (List[str]): atomic symbols of the new atoms
+            - coordinates (np.ndarray): (N, 3) array of cartesian coordinates of the new atoms"""
+        symbols = list(symbols)
+        coordinates = _coordinates_array(coordinates)
+        if not len(symbols) == len(coordinates):
+            raise ValueError("Got {} symbols and {} coordinates".format(len(symbols), len(coordinates)))
+        self.symbols += symbols
+        self.coordinates = np.concatenate([self.coordinates, coordinates])
+
+    def remove_atoms(self, indices: Iterable[int]):
+        """Method to remove atoms from the specie. Atoms got from the specie before are not valid after the removal.
+        ARGS:
+            - indices (List[int]): indices of the atoms to remove"""
+        indices = sorted(set(indices))
+        if any(i < 0 or i >= len(self.symbols) for i in indices):
+            raise IndexError("atom index out of range")
+        removed = set(indices)
+        self.symbols = [symbol for i, symbol in enumerate(self.symbols) if not i in removed]
+        self.coordinates = np.delete(self.coordinates, indices, axis=0)
 
     @abstractclassmethod
     def save_to_file(self):
@@ -19,7 +110,4 @@ class Specie (ABC):
 
     def get_atom_types(self) -> List[str]:
         """Method to get the atom types in the specie, returns a list with atomic symbols"""
-        res = set()
-        for atom in self.atoms:
-            res.add(atom.symbol)
-        return list(res)
\ No newline at end of file
+        return list(set(self.symbols))
@@ -2,18 +2,21 @@ from dataclasses import dataclass
 from .Specie import Specie
 from .Atom import Atom
 from .Lattice import Lattice
-from typing import List
+from typing import List, Optional
+import numpy as np
 
 class Structure (Specie):
     """Representation of structure in 3D lattice.
     ARGS:
         - atoms (List[Atom]): list of atoms in the structure
-        - lattice (Lattice): Lattice structure"""
+        - lattice (Lattice): Lattice structure
+        - symbols (List[str]): atomic symbols (instead of atoms). default=None
+        - coordinates (np.ndarray): (N, 3) array of cartesian coordinates (instead of atoms). default=None"""
 
     
-    def __init__(self, atoms: List[Atom], lattice: Lattice):
+    def __init__(self, atoms: Optional[List[Atom]]=None, lattice: Optional[Lattice]=None, symbols: Optional[List[str]]=None, coordinates: Optional[np.ndarray]=None):
         self.lattice = lattice
-        super().__init__(atoms)
+        super().__init__(atoms, symbols, coordinates)
 
     
     def save_to_file(self, path: str):
@@ -0,0 +1,2 @@
+from .generators import orca_output, mopac_output, qe_output, write_tree
+from .suite import run_benchmarks, save_results, load_history, compare_results, last_run, check_import_times, check_memory_bound, IMPORT_BUDGETS
\ No newline at end of file
@@ -0,0 +1,182 @@
+import os
+import random
+from typing import List, Optional
+
+_ORCA_ORBITALS = {"C": ["s", "pz", "px", "py"], "N": ["s", "pz", "px", "py"], "O": ["s", "pz", "px", "py"], "H": ["s"]}
+
+
+def _symbols(n_atoms: int, elements: List[str]) -> List[str]:
+    return [elements[i % len(elements)] for i in range(n_atoms)]
+
+
+def orca_output(n_atoms: int=20, n_steps: int=10, n_mos: Optional[int]=None, n_freqs: Optional[int]=None, n_scf_iterations: int=12,
+                unrestricted: bool=False, seed: int=0) -> str:
+    """Method to make the text of a synthetic ORCA output file (geometry optimization with frequencies and Loewdin populations).
+    ARGS:
+        - n_atoms (int): number of atoms. default=20
+        - n_steps (int): number of optimization steps. default=10
+        - n_mos (int): number of molecular orbitals. default=None (4 per atom)
+        - n_freqs (int): number of vibrational frequencies. default=None (3N - 6)
+        - n_scf_iterations (int): number of SCF iterations printed in every step. default=12
+        - unrestricted (bool): print Loewdin populations for both spins. default=False
+        - seed (int): random seed. default=0
+    RETURNS:
+        (str) the text of the file"""
+    rng = random.Random(seed)
+    symbols = _symbols(n_atoms, ["C", "O", "H", "N", "H", "H"])
+    n_mos = n_mos if n_mos is not None else 4 * n_atoms
+    n_freqs = n_freqs if n_freqs is not None else max(3 * n_atoms - 6, 1)
+    n_occupied = n_mos // 2
+    L = ["                                 *****************",
+         "                                 * O   R   C   A *",
+         "                                 *****************", ""]
+    for step in range(n_steps):
+        L += ["---------------------------------", "CARTESIAN COORDINATES (ANGSTROEM)", "---------------------------------"]
+        for i, symbol in enumerate(symbols):
+            L.append("  %-2s  %12.6f %12.6f %12.6f" % (symbol, 1.1 * i + 0.01 * step, -0.5 * i + rng.random(), 0.25 * i - 0.01 * step))
+        L += ["", "----------------------------", "CARTESIAN COORDINATES (A.U.)", "----------------------------",
+              "  NO LB      ZA    FRAG     MASS         X           Y           Z"]
+        for i, symbol in enumerate(symbols):
+            L.append("  %2d %-2s    6.0000    0    12.011  %10.6f  %10.6f  %10.6f" % (i, symbol, 2.1 * i, -0.9 * i, 0.5 * i))
+        L += ["", "--------------", "SCF ITERATIONS", "--------------",
+              "ITER       Energy         Delta-E        Max-DP      RMS-DP      [F,P]     Damp"]
+        for it in range(n_scf_iterations):
+            L.append("  %2d   -113.%010d  %.12f  0.00123456  0.00012345  0.0123456  0.7000" % (it, rng.randrange(10 ** 10), rng.random() * 1e-3))
+        L += ["", " N(Total)           :       %10.6f e" % n_occupied, ""]
+        L += ["ORBITAL ENERGIES", "----------------", "", "  NO   OCC          E(Eh)            E(eV) "]
+        for i in range(n_mos):
+            energy = -20.0 + 20.5 * i / n_mos
+            L.append("  %3d   %6.4f   %12.6f    %12.4f " % (i, 1.0 if i < n_occupied else 0.0, energy, energy * 27.2114))
+        L += ["", "FINAL SINGLE POINT ENERGY      -113.%06d" % (123456 + step), ""]
+    L += ["------------------------------------------", "LOEWDIN REDUCED ORBITAL POPULATIONS PER MO",
+          "-------------------------------------------", "THRESHOLD FOR PRINTING IS 0.1%"]
+    for spin in (["SPIN UP", "SPIN DOWN"] if unrestricted else [None]):
+        if spin is not None:
+            L += ["", " " * 20 + spin]
+        for start in range(0, n_mos, 6):
+            idx = list(range(start, min(start + 6, n_mos)))
+            L.append("                  " + "".join("%10d" % i for i in idx))
+            L.append("                  " + "".join("%10.5f" % (-20.0 + 20.5 * i / n_mos) for i in idx))
+            L.append("                  " + "".join("%10.5f" % (1.0 if i < n_occupied else 0.0) for i in idx))
+            L.append("                  " + "  --------" * len(idx))
+            for a, symbol in enumerate(symbols):
+                for orbital in _ORCA_ORBITALS[symbol]:
+                    if rng.random() < 0.5:
+                        continue
+                    L.append(" %d %-2s %-4s      " % (a, symbol, orbital) + "".join("%10.1f" % (rng.random() * 100) for _ in idx))
+            L.append("")
+    L += ["", "*" * 30, ""]
+    L += ["-----------------------", "VIBRATIONAL FREQUENCIES", "-----------------------", ""]
+    for i in range(6):
+        L.append("  %3d:         0.00 cm**-1" % i)
+    for i in range(n_freqs):
+        L.append("  %3d:      %7.2f cm**-1" % (i + 6, 100.0 + 3000.0 * i / n_freqs))
+    L += ["", "Final Gibbs free energy         ...   -113.10000000 Eh", ""]
+    L += ["Timings for individual modules:", "", "Sum of individual times         ...        5.123 sec (=   0.085 min)", "",
+          "                             ****ORCA TERMINATED NORMALLY****", "TOTAL RUN TIME: 0 days 0 hours 0 minutes 5 seconds 123 msec", ""]
+    return "\n".join(L)
+
+
+def mopac_output(n_atoms: int=20, n_steps: int=10, n_freqs: Optional[int]=None, n_states: int=10, seed: int=0) -> str:
+    """Method to make the text of a synthetic MOPAC output file (geometry optimization with excited states and vibrations).
+    ARGS:
+        - n_atoms (int): number of atoms. default=20
+        - n_steps (int): number of printed geometries. default=10
+        - n_freqs (int): number of vibrations. default=None (3N - 6)
+        - n_states (int): number of excited states. default=10
+        - seed (int): random seed. default=0
+    RETURNS:
+        (str) the text of the file"""
+    rng = random.Random(seed)
+    symbols = _symbols(n_atoms, ["C", "O", "H"])
+    n_freqs = n_freqs if n_freqs is not None else max(3 * n_atoms - 6, 1)
+    L = [" ***********", "  MOPAC2016 (c) James J. P. Stewart", ""]
+    for step in range(n_steps):
+        L += ["                             CARTESIAN COORDINATES", "", "   NO.       ATOM               X         Y         Z", ""]
+        for i, symbol in enumerate(symbols):
+            L.append("     %d       %s   %12.4f%10.4f%10.4f" % (i + 1, symbol, 1.1 * i + 0.01 * step, -0.3 * i + rng.random(), 0.7 * i))
+        L += ["", "", "          Empirical Formula: C2 O2 H1  =     %d atoms" % n_atoms, ""]
+        L += [" CYCLE:%4d TIME:   0.016 TIME LEFT:  2.00D  GRAD.:  %8.3f HEAT: -100.%06d" % (step + 1, rng.random() * 10, rng.randrange(10 ** 6))]
+    L += ["", "  STATE       ENERGY (EV)        Q.N.  SPIN   SYMMETRY              POLARIZATION"]
+    for i in range(n_states):
+        L.append("  %2d    1      %6.4f     1  %s  1A" % (i + 1, 1.5 + 0.3 * i, "SINGLET" if i % 2 == 0 else "TRIPLET"))
+    L += ["", "          ELECTRONIC ENERGY       =      -4321.12345 EV", "", "          HERBERTS TEST WAS SATISFIED IN BFGS", ""]
+    L += ["          TOTAL ENERGY            =       -500.12345 EV",
+          "          IONIZATION POTENTIAL    =         9.51234 EV",
+          "          HOMO LUMO ENERGIES (EV) =         -9.512  1.234", ""]
+    L += ["           DESCRIPTION OF VIBRATIONS", ""]
+    for v in range(n_freqs):
+        L += ["   VIBRATION    %d" % (v + 1), "   FREQUENCY        %7.2f" % (100.0 + 3000.0 * v / n_freqs), "   T-DIPOLE          0.1",
+              "   TRAVEL            0.05", "   RED. MASS         1.5", "   EFFECTIVE MASS    %5.2f" % (1.0 + rng.random()),
+              "   FORCE CONSTANT    %5.2f" % (2.0 + rng.random()), ""]
+    L += ["           FORCE CONSTANT IN CARTESIAN COORDINATES (Millidynes/A)", ""]
+    L += ["          TOTAL JOB TIME:             0.50 SECONDS", "", "          * JOB ENDED NORMALLY *", ""]
+    return "\n".join(L)
+
+
+def qe_output(n_atoms: int=8, n_steps: int=10, n_scf_iterations: int=12, seed: int=0) -> str:
+    """Method to make the text of a synthetic Quantum Espresso (pw.x) output file (relaxation).
+    ARGS:
+        - n_atoms (int): number of atoms. default=8
+        - n_steps (int): number of relaxation steps. default=10
+        - n_scf_iterations (int): number of SCF iterations printed in every step. default=12
+        - seed (int): random seed. default=0
+    RETURNS:
+        (str) the text of the file"""
+    rng = random.Random(seed)
+    L = ["     Program PWSCF v.6.4.1 starts on 10Jan2021 at 10:00:00", "",
+         "     celldm(1)=  10.200000  celldm(2)=   0.000000  celldm(3)=   0.000000", "",
+         "     crystal axes: (cart. coord. in units of alat)",
+         "               a(1) = (  -0.500000   0.000000   0.500000 )  ",
+         "               a(2) = (   0.000000   0.500000   0.500000 )  ",
+         "               a(3) = (  -0.500000   0.500000   0.000000 )  ", "",
+         "     Cartesian axes", "",
+         "     site n.     atom                  positions (alat units)"]
+    for i in range(n_atoms):
+        L.append("        %2d           Si  tau(  %2d) = (   %.7f   %.7f   %.7f  )" % (i + 1, i + 1, 0.1 * i, 0.05 * i, 0.02 * i))
+    L.append("")
+    for step in range(n_steps):
+        for it in range(n_scf_iterations):
+            L += ["     iteration #%3d     ecut=    30.00 Ry     beta= 0.70" % (it + 1),
+                  "     total cpu time spent up to now is        %.1f secs" % (0.1 * it), "",
+                  "     total energy              =     -15.%08d Ry" % rng.randrange(10 ** 8),
+                  "     estimated scf accuracy    <       %.8f Ry" % (rng.random() * 1e-3), ""]
+        L += ["!    total energy              =     -15.8%07d Ry" % step, ""]
+        if step == n_steps - 1:
+            L += ["Begin final coordinates", ""]
+        L.append("ATOMIC_POSITIONS (crystal)")
+        for i in range(n_atoms):
+            L.append("Si            %.10f        %.10f        %.10f" % (rng.random(), rng.random(), rng.random()))
+        L += ["End final coordinates" if step == n_steps - 1 else "", ""]
+    L += ["     JOB DONE.", ""]
+    return "\n".join(L)
+
+
+_GENERATORS = {"orca": (orca_output, "out"), "mopac": (mopac_output, "out"), "qe": (qe_output, "out")}
+
+
+def write_tree(root: str, program: str, n_files: int, n_dirs: int=1, **kwargs) -> List[str]:
+    """Method to write a directory tree of synthetic output files.
+    ARGS:
+        - root (str): root directory of the tree, made if it doesn't exist
+        - program (str): program of the files (orca, mopac or qe)
+        - n_files (int): number of files
+        - n_dirs (int): number of sub-directories the files are spread over. default=1 (all files in the root)
+        - kwargs: size arguments of the file generator (see orca_output, mopac_output and qe_output)
+    RETURNS:
+        (List[str]) paths of the files"""
+    if not program in _GENERATORS:
+        raise ValueError("Unknown program {}. supported programs are {}".format(program, ", ".join(_GENERATORS)))
+    generator, ext = _GENERATORS[program]
+    # the files have the same content, the text is made once
+    text = generator(**kwargs)
+    paths = []
+    for i in range(n_files):
+        dir = root if n_dirs <= 1 else os.path.join(root, "dir{}".format(i % n_dirs))
+        if not os.path.isdir(dir):
+            os.makedirs(dir)
+        path = os.path.join(dir, "{}_{}.{}".format(program, i, ext))
+        with open(path, "w") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
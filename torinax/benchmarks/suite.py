@@ -0,0 +1,270 @@
+import io
+import os
+import sys
+import json
+import shutil
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from subprocess import run
+from time import perf_counter, time
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from ..base.Molecule import Molecule
+from ..io.OrcaIn import OrcaIn
+from ..io.OrcaOut import OrcaOut
+from ..io.MopacIn import MopacIn
+from ..io.MopacOut import MopacOut
+from ..io.QeOut import QeOut
+from ..DirParser import DirParser
+from .generators import orca_output, mopac_output, qe_output, write_tree
+
+# sizes of the generated files and trees
+SIZES = {
+    "small": {"orca": {"n_atoms": 10, "n_steps": 5}, "mopac": {"n_atoms": 10, "n_steps": 5}, "qe": {"n_atoms": 4, "n_steps": 5},
+              "n_files": 50, "n_dirs": 5, "n_species": 200},
+    "medium": {"orca": {"n_atoms": 40, "n_steps": 30}, "mopac": {"n_atoms": 40, "n_steps": 30}, "qe": {"n_atoms": 16, "n_steps": 30},
+               "n_files": 200, "n_dirs": 10, "n_species": 2000},
+    "large": {"orca": {"n_atoms": 150, "n_steps": 100}, "mopac": {"n_atoms": 150, "n_steps": 100}, "qe": {"n_atoms": 64, "n_steps": 100},
+              "n_files": 500, "n_dirs": 20, "n_species": 10000}
+}
+
+# parsers stream files in chunks, so their peak memory is bounded by a number of chunks whatever the file size (see check_memory_bound)
+MEMORY_CHUNK_SIZE = 1 << 16
+MEMORY_BOUND_CHUNKS = 16
+
+# import time budgets (seconds) of modules that worker processes import. the package and the parsers must not import pandas, pyarrow, dask
+# or the pymatgen / openbabel / rdkit bridges (see torinax.lazy)
+IMPORT_BUDGETS = {"torinax": 0.1, "torinax.io": 0.1, "torinax.clients": 0.15, "torinax.io.OrcaOut": 0.3, "torinax.io.MopacOut": 0.3,
+                  "torinax.io.QeOut": 0.3, "torinax.DirParser": 0.4}
+
+
+def _measure(f: Callable, repeats: int) -> Dict[str, float]:
+    """Method to measure the best run time of a function (over repeats) and its peak memory (in a separate traced run)"""
+    seconds = []
+    for _ in range(repeats):
+        t = perf_counter()
+        f()
+        seconds.append(perf_counter() - t)
+    # tracing slows the run down, so memory is measured on its own
+    tracemalloc.start()
+    try:
+        f()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(seconds), "peak_memory_mb": peak / 1e6}
+
+
+def _quiet(f: Callable) -> Callable:
+    """Makes a function that runs f without printing"""
+    def quiet():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return f()
+    return quiet
+
+
+def _molecules(n_species: int, n_atoms: int) -> List[Molecule]:
+    rng = np.random.default_rng(0)
+    symbols = [["C", "O", "H"][i % 3] for i in range(n_atoms)]
+    return [Molecule(symbols=symbols, coordinates=rng.random((n_atoms, 3)) * 10) for _ in range(n_species)]
+
+
+def _make_benchmarks(size: str, work_dir: str) -> List[dict]:
+    """Method to generate the files of the benchmarks and make the list of benchmarks (name, function, bytes and files)"""
+    sizes = SIZES[size]
+    benchmarks = []
+    parsers = {"orca": (OrcaOut, orca_output, ["read_scalar_data", "read_specie", "read_loewdin_reduced_orbital_populations"]),
+               "mopac": (MopacOut, mopac_output, ["read_scalar_data", "read_specie", "read_frequency_dict"]),
+               "qe": (QeOut, qe_output, ["read_scalar_data", "read_specie"])}
+    for program, (parser, generator, methods) in parsers.items():
+        path = os.path.join(work_dir, "{}.out".format(program))
+        with open(path, "w") as f:
+            f.write(generator(**sizes[program]))
+        nbytes = os.path.getsize(path)
+        for method in methods:
+            f = _quiet(lambda parser=parser, method=method, path=path: getattr(parser(path), method)())
+            benchmarks.append({"benchmark": "{}.{}".format(parser.__name__, method), "function": f, "bytes": nbytes, "files": 1})
+        # parsing a directory tree of files
+        root = os.path.join(work_dir, program)
+        paths = write_tree(root, program, sizes["n_files"], sizes["n_dirs"], **sizes[program])
+        f = _quiet(lambda parser=parser, root=root: DirParser(parser).read_data(root))
+        benchmarks.append({"benchmark": "DirParser.read_data[{}]".format(program), "function": f,
+                           "bytes": sum(os.path.getsize(p) for p in paths), "files": len(paths)})
+    # writing input files
+    molecules = _molecules(sizes["n_species"], sizes["orca"]["n_atoms"])
+    writers = {OrcaIn: {"input_text": "! B3LYP def2-SVP OPT", "charge": 0, "mult": 1}, MopacIn: {"top_kwds": ["PM7", "1SCF"], "bottom_kwds": None}}
+    for writer, kwdict in writers.items():
+        out_dir = os.path.join(work_dir, "{}_inputs".format(writer.__name__))
+        f = _quiet(lambda writer=writer, kwdict=kwdict, out_dir=out_dir: writer.write_many(molecules, kwdict, out_dir))
+        benchmarks.append({"benchmark": "{}.write_many".format(writer.__name__), "function": f, "bytes": None, "files": len(molecules)})
+    return benchmarks
+
+
+def run_benchmarks(size: str="small", repeats: int=3, only: Optional[str]=None, work_dir: Optional[str]=None) -> List[dict]:
+    """Method to run the parser and input writer benchmarks on synthetic files.
+    ARGS:
+        - size (str): size of the files and trees (small, medium or large). default='small'
+        - repeats (int): number of timed runs of every benchmark (the best run is reported). default=3
+        - only (str): run only benchmarks with this text in their name. default=None (all benchmarks)
+        - work_dir (str): directory for the generated files. default=None (a temporary directory, removed at the end)
+    RETURNS:
+        (List[dict]) results, one per benchmark: benchmark, seconds, MB/s, files/s and peak_memory_mb"""
+    if not size in SIZES:
+        raise ValueError("Unknown benchmark size {}. supported sizes are {}".format(size, ", ".join(SIZES)))
+    tmp_dir = tempfile.mkdtemp(prefix="torinax_benchmarks_") if work_dir is None else None
+    try:
+        benchmarks = _make_benchmarks(size, work_dir or tmp_dir)
+        results = []
+        for bench in benchmarks:
+            if only is not None and not only in bench["benchmark"]:
+                continue
+            res = {"benchmark": bench["benchmark"]}
+            res.update(_measure(bench["function"], repeats))
+            res["MB/s"] = bench["bytes"] / res["seconds"] / 1e6 if bench["bytes"] is not None else None
+            res["files/s"] = bench["files"] / res["seconds"]
+            results.append(res)
+        return results
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _peak_memory(f: Callable) -> int:
+    """Method to measure the peak traced memory (bytes) of a function run"""
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def check_memory_bound(n_steps: int=100, scale: int=10, chunk_size: int=MEMORY_CHUNK_SIZE, bound_chunks: int=MEMORY_BOUND_CHUNKS,
+                        work_dir: Optional[str]=None) -> List[dict]:
+    """Method to check that the peak memory of parsing is bounded by the chunk size of the parsers and doesn't grow with the file size.
+    Every parser method is measured on generated files of two sizes (n_steps and scale * n_steps optimization steps), reading the files forward
+    in chunks (the tail-first reads map the file to memory instead).
+    ARGS:
+        - n_steps (int): number of optimization steps of the small files. default=100
+        - scale (int): size ratio of the large and small files. default=10
+        - chunk_size (int): chunk size of the parsers (characters). default=MEMORY_CHUNK_SIZE
+        - bound_chunks (int): allowed peak memory, in chunks. default=MEMORY_BOUND_CHUNKS
+        - work_dir (str): directory for the generated files. default=None (a temporary directory, removed at the end)
+    RETURNS:
+        (List[dict]) results, one per method and file size: benchmark, bytes, peak_memory_mb, bound_mb and within_bound"""
+    parsers = {"orca": (OrcaOut, orca_output, {"n_atoms": 20}), "mopac": (MopacOut, mopac_output, {"n_atoms": 20}),
+               "qe": (QeOut, qe_output, {"n_atoms": 8})}
+    # methods and their arguments for streamed reads, for every program
+    methods = {"orca": {"read_scalar_data": {}, "read_specie": {"tail_first": False}},
+               "mopac": {"read_scalar_data": {}, "read_specie": {}},
+               "qe": {"read_scalar_data": {"tail_first": False}, "read_specie": {"tail_first": False}}}
+    bound = bound_chunks * chunk_size
+    tmp_dir = tempfile.mkdtemp(prefix="torinax_memory_") if work_dir is None else None
+    results = []
+    try:
+        for program, (parser, generator, kwargs) in parsers.items():
+            # a parser of the program with the given chunk size
+            chunked = type(parser.__name__, (parser,), {"chunk_size": chunk_size})
+            for steps in (n_steps, scale * n_steps):
+                path = os.path.join(work_dir or tmp_dir, "{}_{}.out".format(program, steps))
+                with open(path, "w") as f:
+                    f.write(generator(n_steps=steps, **kwargs))
+                for method, method_kwargs in methods[program].items():
+                    peak = _peak_memory(_quiet(lambda method=method, method_kwargs=method_kwargs, path=path:
+                                                    getattr(chunked(path), method)(**method_kwargs)))
+                    results.append({"benchmark": "{}.{}".format(parser.__name__, method), "bytes": os.path.getsize(path),
+                                    "peak_memory_mb": peak / 1e6, "bound_mb": bound / 1e6, "within_bound": peak <= bound})
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results
+
+
+def measure_import_time(module: str, repeats: int=5) -> float:
+    """Method to measure the import time of a module in a fresh interpreter (the best of repeats runs, in seconds)"""
+    code = "from time import perf_counter; t = perf_counter(); import {}; print(perf_counter() - t)".format(module)
+    # the interpreter imports this source tree of torinax
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get("PYTHONPATH", "")]))
+    seconds = []
+    for _ in range(repeats):
+        out = run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+        if not out.returncode == 0:
+            raise RuntimeError("Failed importing {}: {}".format(module, out.stderr.strip()))
+        seconds.append(float(out.stdout))
+    return min(seconds)
+
+
+def check_import_times(budgets: Optional[Dict[str, float]]=None, repeats: int=5) -> List[dict]:
+    """Method to measure the import times of modules and check them against their budgets.
+    ARGS:
+        - budgets (Dict[str, float]): modules and their import time budgets (seconds). default=None (IMPORT_BUDGETS)
+        - repeats (int): number of imports of every module (the best is reported). default=5
+    RETURNS:
+        (List[dict]) results, one per module: module, seconds, budget and within_budget"""
+    budgets = budgets if budgets is not None else IMPORT_BUDGETS
+    results = []
+    for module, budget in budgets.items():
+        seconds = measure_import_time(module, repeats)
+        results.append({"module": module, "seconds": seconds, "budget": budget, "within_budget": seconds <= budget})
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    """Method to get the commit of the torinax source tree (None if it is not a git repository)"""
+    out = run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def save_results(results: List[dict], history_path: str, size: str, label: Optional[str]=None) -> dict:
+    """Method to append the results of a run to a history file (JSON lines, one run per line).
+    ARGS:
+        - results (List[dict]): benchmark results (see run_benchmarks)
+        - history_path (str): path of the history file
+        - size (str): size of the benchmarks
+        - label (str): label of the run. default=None
+    RETURNS:
+        (dict) the saved run"""
+    entry = {"time": time(), "label": label, "commit": _git_commit(), "python": platform.python_version(), "machine": platform.node(),
+             "size": size, "results": results}
+    with open(history_path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def load_history(history_path: str) -> List[dict]:
+    """Method to read the runs in a history file (oldest first). Returns an empty list if the file doesn't exist"""
+    if not os.path.isfile(history_path):
+        return []
+    with open(history_path, "r") as f:
+        return [json.loads(line) for line in f if len(line.strip()) > 0]
+
+
+def compare_results(results: List[dict], previous: List[dict], tolerance: float=0.2, memory_tolerance: float=0.2) -> List[dict]:
+    """Method to find regressions of benchmark results compared to results of a previous run.
+    ARGS:
+        - results (List[dict]): benchmark results
+        - previous (List[dict]): results of the previous run
+        - tolerance (float): allowed relative slowdown. default=0.2
+        - memory_tolerance (float): allowed relative growth of the peak memory. default=0.2
+    RETURNS:
+        (List[dict]) regressions: benchmark, metric (seconds or peak_memory_mb), previous and current values and the ratio"""
+    previous = {res["benchmark"]: res for res in previous}
+    regressions = []
+    for res in results:
+        prev = previous.get(res["benchmark"])
+        if prev is None:
+            continue
+        for metric, tol in (("seconds", tolerance), ("peak_memory_mb", memory_tolerance)):
+            if prev.get(metric) and res[metric] > prev[metric] * (1 + tol):
+                regressions.append({"benchmark": res["benchmark"], "metric": metric, "previous": prev[metric], "current": res[metric],
+                                    "ratio": res[metric] / prev[metric]})
+    return regressions
+
+
+def last_run(history: List[dict], size: str) -> Optional[dict]:
+    """Method to get the last run of a size in a history (None if there is no such run)"""
+    runs = [entry for entry in history if entry["size"] == size]
+    return runs[-1] if len(runs) > 0 else None
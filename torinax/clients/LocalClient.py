@@ -0,0 +1,121 @@
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from subprocess import Popen, TimeoutExpired, DEVNULL
+from time import monotonic, time
+from typing import Dict, List, Optional
+from ..Recorder import get_recorder
+
+
+def _available_cpus() -> int:
+    """Method to get the number of cpus the process can run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class LocalClient:
+
+    """Method to run command line tasks from python on the local machine, with the interface of SlurmClient (submit and wait).
+    Commands run on a bounded pool of processes, as many at a time as fit the available cpus. wait collects the results of all commands
+    submitted to the client, so one client must not be used by computations running at the same time (run_computations runs computations
+    that share a client one after the other).
+    ARGS:
+        - cpus_per_task (int): number of cpus per task. default=1
+        - n_workers (int): maximal number of commands running at the same time. default=None (available cpus // cpus_per_task)
+        - timeout (float): maximal number of seconds for a command, longer commands are killed. default=None (no limit)
+        - job_name (str): job name to be displayed"""
+
+    def __init__(self, cpus_per_task: int=1, n_workers: Optional[int]=None, timeout: Optional[float]=None, job_name: str="local_job"):
+        self.cpus_per_task = cpus_per_task
+        self.n_workers = n_workers if n_workers is not None else max(1, _available_cpus() // cpus_per_task)
+        self.timeout = timeout
+        self.job_name = job_name
+        self._executor = None
+        self._n_submitted = 0
+        # futures of the commands of every submission that wasn't waited for yet
+        self._jobs = {}
+        # submission times of the jobs (for instrumentation)
+        self._submit_times = {}
+        # results of the commands of the last waited submissions
+        self.command_results = []
+
+    def _run(self, cmd: str) -> dict:
+        """Method to run a command and get its result (command, exit_code, duration and state)"""
+        start = monotonic()
+        # the command runs in its own session, so its whole process group can be killed on timeout
+        proc = Popen(cmd, shell=True, stdout=DEVNULL, stderr=DEVNULL, start_new_session=True)
+        try:
+            code = proc.wait(timeout=self.timeout)
+            state = "COMPLETED" if code == 0 else "FAILED"
+        except TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            code = proc.wait()
+            state = "TIMEOUT"
+        return {"command": cmd, "exit_code": code, "duration": monotonic() - start, "state": state}
+
+    def submit(self, cmds: List[str]) -> List[str]:
+        """Method to submit list of command line tasks to client. The commands start running right away.
+        ARGS:
+            - cmds (List[str]): command lines
+        RETURNS:
+            (List[str]) ID of the submission (as a list, like SlurmClient)"""
+        if len(cmds) == 0:
+            return []
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.n_workers, thread_name_prefix=self.job_name)
+        self._n_submitted += 1
+        job_id = str(self._n_submitted)
+        self._jobs[job_id] = [self._executor.submit(self._run, cmd) for cmd in cmds]
+        self._submit_times[job_id] = time()
+        return [job_id]
+
+    def wait(self, timeout: Optional[float]=None) -> Dict[str, str]:
+        """Method to wait until all client's commands are finished.
+        ARGS:
+            - timeout (float): maximal number of seconds to wait. unfinished commands keep running and stay tracked, so wait can be called again. default=None
+        RETURNS:
+            (Dict[str, str]) states of the commands (job_task IDs, as SLURM array tasks). COMPLETED, FAILED, TIMEOUT or RUNNING (if wait timed out)"""
+        print("waiting for jobs {} to finish".format(", ".join(self._jobs)))
+        futures = [future for job in self._jobs.values() for future in job]
+        _, not_done = wait_futures(futures, timeout=timeout)
+        if len(not_done) > 0:
+            print("WARNING: timeout reached, {} commands did not finish".format(len(not_done)))
+        states = {}
+        results = []
+        for job_id, job in self._jobs.items():
+            for i, future in enumerate(job):
+                task_id = "{}_{}".format(job_id, i + 1)
+                if future.done():
+                    result = future.result()
+                    states[task_id] = result["state"]
+                    results.append(result)
+                else:
+                    states[task_id] = "RUNNING"
+        if len(not_done) == 0:
+            recorder = get_recorder()
+            if recorder is not None:
+                # submit-to-finish latency of every job
+                for job_id, job in self._jobs.items():
+                    submitted = self._submit_times[job_id]
+                    failed = sum(1 for future in job if not future.result()["exit_code"] == 0)
+                    recorder.record("local_job", self.job_name, time() - submitted, submitted, job_id=job_id, n_tasks=len(job), failed_tasks=failed)
+            self._jobs = {}
+            self._submit_times = {}
+            self.command_results = results
+            failed = sum(1 for res in results if not res["exit_code"] == 0)
+            if failed > 0:
+                print("WARNING: {} of {} commands failed, see command_results".format(failed, len(results)))
+        return states
+
+    def read_command_results(self) -> List[dict]:
+        """Method to read the results of the commands that are not waited for yet (can be used while commands are running).
+        RETURNS:
+            (List[dict]) command, exit_code, duration (seconds) and state of every finished command, in submission order"""
+        return [future.result() for job in self._jobs.values() for future in job if future.done()]
+
+    def close(self):
+        """Method to shut down the process pool (waits for running commands)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -1,10 +1,16 @@
-from typing import List
-from time import sleep
+import os
+import re
+import shlex
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+from time import sleep, monotonic, time
 from subprocess import run
+from ..Recorder import get_recorder
 
 _slurm_script = \
 """#!/bin/bash
-#SBATCH --array=1-$n_tasks$
+#SBATCH --array=$array$
 #SBATCH --mem=$memory_per_task$
 #SBATCH -n $cpus_per_task$
 #SBATCH -N 1
@@ -15,11 +21,41 @@ _slurm_script = \
 # #SBATCH --error=%a.out
 
 args_file=$args_file$
-# get the i-th line of the param file
-run_command=$(sed -n "$SLURM_ARRAY_TASK_ID"p "$args_file")
+status_file=$status_dir$/"$SLURM_ARRAY_TASK_ID".txt
+n_commands=$n_commands$
+commands_per_task=$commands_per_task$
+n_parallel=$n_parallel$
+
+# lines of the param file run by the task
+first=$(( (SLURM_ARRAY_TASK_ID - 1) * commands_per_task + 1 ))
+last=$(( SLURM_ARRAY_TASK_ID * commands_per_task ))
+if (( last > n_commands )); then last=$n_commands; fi
+mapfile -t run_commands < <(sed -n "$first,$last"p "$args_file")
+rm -f "$status_file"
+
+# runs the i-th command of the task, records its line, exit code and duration (ms)
+# (in its own shell, so quotes and redirections of the command line are kept)
+run_line() {
+    local run_command=${run_commands[$1]}
+    local start=$(date +%s%N)
+    bash -c "$run_command"
+    local code=$?
+    echo "$(( first + $1 )) $code $(( ($(date +%s%N) - start) / 1000000 ))" >> "$status_file"
+}
 
 # running
-$run_command"""
+for (( i = 0; i < ${#run_commands[@]}; i++ )); do
+    if (( n_parallel > 1 )); then
+        run_line $i &
+        while (( $(jobs -rp | wc -l) >= n_parallel )); do wait -n; done
+    else
+        run_line $i
+    fi
+done
+wait
+# the task fails if any of its commands failed
+awk '$2 != 0 { failed = 1 } END { exit failed }' "$status_file"
+"""
 
 class SlurmClient:
 
@@ -27,52 +63,253 @@ class SlurmClient:
     ARGS:
         - cpus_per_task (int): number of cpus per task. default=1
         - memory_per_task (str): memory per task string. default='2GB'
-        - job_name (str): job name to be displayed """
+        - job_name (str): job name to be displayed
+        - max_array_size (int): maximal number of tasks in one array job, larger command lists are split to several array jobs.
+                                default=None (MaxArraySize - 1 of the cluster, from scontrol)
+        - max_concurrent (int): maximal number of tasks of an array job running at the same time (%N throttle). default=None (no limit)
+        - staging_dir (str): directory for the submission files. every submission makes its own sub-directory.
+                             must be visible to the compute nodes. default=None (current directory)
+        - keep_staging (bool): keep the submission files after the jobs are done. default=False
+        - commands_per_task (int): number of commands run by every array task (one after the other). default=1
+        - target_task_duration (float): wanted duration of an array task in seconds. if given, commands_per_task is chosen by the duration of
+                                        a command (command_duration, or the mean duration measured in the last finished submission). default=None
+        - command_duration (float): estimated duration of a command in seconds, used with target_task_duration until a duration is measured. default=None
+        - parallel_commands (bool): run the commands of an array task in parallel, cpus_per_task at a time. default=False
+        - sbatch_cmd (str): command for submitting jobs. default='sbatch'
+        - squeue_cmd (str): command for querying the queue. default='squeue'
+        - sacct_cmd (str): command for querying final job states. default='sacct'
+        - scontrol_cmd (str): command for querying the cluster configuration. default='scontrol' """
 
-    def __init__(self, cpus_per_task: int=1, memory_per_task: str="2GB", job_name: str="slurm_job"):
+    # MaxArraySize of a default SLURM configuration
+    default_max_array_size = 1001
+
+    def __init__(self, cpus_per_task: int=1, memory_per_task: str="2GB", job_name: str="slurm_job", max_array_size: Optional[int]=None,
+                    max_concurrent: Optional[int]=None, staging_dir: Optional[str]=None, keep_staging: bool=False, commands_per_task: int=1,
+                    target_task_duration: Optional[float]=None, command_duration: Optional[float]=None, parallel_commands: bool=False,
+                    sbatch_cmd: str="sbatch", squeue_cmd: str="squeue", sacct_cmd: str="sacct", scontrol_cmd: str="scontrol"):
         self.cpus_per_task = cpus_per_task
         self.memory_per_task = memory_per_task
         self.job_name = job_name
+        self.max_array_size = max_array_size
+        self.max_concurrent = max_concurrent
+        self.staging_dir = staging_dir
+        self.keep_staging = keep_staging
+        self.commands_per_task = commands_per_task
+        self.target_task_duration = target_task_duration
+        self.command_duration = command_duration
+        self.parallel_commands = parallel_commands
+        self.sbatch_cmd = sbatch_cmd
+        self.squeue_cmd = squeue_cmd
+        self.sacct_cmd = sacct_cmd
+        self.scontrol_cmd = scontrol_cmd
         self._job_ids = []
+        # submission times of the jobs (for instrumentation)
+        self._submit_times = {}
+        # submissions that were not collected yet, with their staging directory, commands and array jobs
+        self._submissions = []
+        # results of the commands of the last collected submissions (see read_command_results)
+        self.command_results = []
+
+    def _array_size(self) -> int:
+        """Method to get the maximal number of tasks in one array job. Array task IDs start at 1, so it is one less than MaxArraySize"""
+        if self.max_array_size is None:
+            out = run("{} show config".format(self.scontrol_cmd), shell=True, capture_output=True, text=True)
+            match = re.search(r"MaxArraySize\s*=\s*(\d+)", out.stdout)
+            self.max_array_size = (int(match.group(1)) if match else self.default_max_array_size) - 1
+        return self.max_array_size
 
-    def submit(self, cmds: List[str]):
-        """Method to submit list of command line tasks to client"""
-        # making temp submit file
-        with open("slurm_submit.src", "w") as submit_f:
-            # making temp arguments file
-            with open("slurm_args.txt", "w") as args_f:
-                # making string
-                script = _slurm_script.replace("$n_tasks$", str(len(cmds)))
-                script = script.replace("$cpus_per_task$", str(self.cpus_per_task))
-                script = script.replace("$memory_per_task$", str(self.memory_per_task))
-                script = script.replace("$job_name$", str(self.job_name))
-                script = script.replace("$args_file$", str("slurm_args.txt"))
-                # writing string to file
-                submit_f.write(script)
-                # writing lines to argument file
-                args_f.write("\n".join(cmds))
-        # submitting file
-        out = run("sbatch slurm_submit.src", shell=True, capture_output=True, text=True)
-        # capturing job ID
-        jid = out.stdout.split(" ")[-1].strip()
-        if len(jid) > 0:
+    def _get_commands_per_task(self) -> int:
+        """Method to get the number of commands per array task"""
+        if self.target_task_duration is None or not self.command_duration:
+            return self.commands_per_task
+        return max(1, int(self.target_task_duration // self.command_duration))
+
+    def _make_script(self, n_commands: int, commands_per_task: int, args_file: str, status_dir: str) -> str:
+        """Method to make the submission script of an array job"""
+        n_tasks = -(-n_commands // commands_per_task)
+        array = "1-{}".format(n_tasks)
+        if self.max_concurrent is not None:
+            array += "%{}".format(self.max_concurrent)
+        script = _slurm_script.replace("$array$", array)
+        script = script.replace("$cpus_per_task$", str(self.cpus_per_task))
+        script = script.replace("$memory_per_task$", str(self.memory_per_task))
+        script = script.replace("$job_name$", str(self.job_name))
+        script = script.replace("$args_file$", shlex.quote(args_file))
+        script = script.replace("$status_dir$", shlex.quote(status_dir))
+        script = script.replace("$n_commands$", str(n_commands))
+        script = script.replace("$commands_per_task$", str(commands_per_task))
+        script = script.replace("$n_parallel$", str(self.cpus_per_task if self.parallel_commands else 1))
+        return script
+
+    def submit(self, cmds: List[str]) -> List[str]:
+        """Method to submit list of command line tasks to client. Every array task runs commands_per_task commands, lists that need more tasks
+        than the maximal array size are split to several array jobs. The submission files are written to a new staging directory,
+        so several submissions can run at the same time.
+        ARGS:
+            - cmds (List[str]): command lines
+        RETURNS:
+            (List[str]) IDs of the submitted array jobs"""
+        if len(cmds) == 0:
+            return []
+        staging_dir = tempfile.mkdtemp(prefix="slurm_{}_".format(self.job_name), dir=self.staging_dir or os.getcwd())
+        commands_per_task = self._get_commands_per_task()
+        shard_size = self._array_size() * commands_per_task
+        submission = {"staging_dir": staging_dir, "cmds": list(cmds), "shards": []}
+        self._submissions.append(submission)
+        job_ids = []
+        for k, start in enumerate(range(0, len(cmds), shard_size)):
+            shard = cmds[start:start + shard_size]
+            args_file = os.path.join(staging_dir, "slurm_args_{}.txt".format(k))
+            submit_file = os.path.join(staging_dir, "slurm_submit_{}.src".format(k))
+            status_dir = os.path.join(staging_dir, "slurm_status_{}".format(k))
+            os.mkdir(status_dir)
+            submission["shards"].append((start, status_dir))
+            # writing lines to argument file
+            with open(args_file, "w") as args_f:
+                args_f.write("\n".join(shard))
+            with open(submit_file, "w") as submit_f:
+                submit_f.write(self._make_script(len(shard), commands_per_task, args_file, status_dir))
+            # submitting file
+            out = run("{} {}".format(self.sbatch_cmd, shlex.quote(submit_file)), shell=True, capture_output=True, text=True)
+            # capturing job ID
+            jid = out.stdout.split(" ")[-1].strip()
+            if len(jid) == 0:
+                raise RuntimeError("Failed to submit {} (tasks {}-{}): {}".format(submit_file, start + 1, start + len(shard), out.stderr.strip()))
+            job_ids.append(jid)
             self._job_ids.append(jid)
+            self._submit_times[jid] = time()
+        return job_ids
 
-    def wait(self, update_time: int=1):
-        """Method to wait until all client's jobs are finished.
+    @staticmethod
+    def _parse_states(text: str) -> Dict[str, str]:
+        """Method to parse 'task_id|state' lines to a dictionary. Only the first word of a state is kept ('CANCELLED by 123' -> 'CANCELLED')"""
+        states = {}
+        for line in text.splitlines():
+            if not "|" in line:
+                continue
+            task_id, state = line.split("|", 1)
+            state = state.split()
+            states[task_id.strip()] = state[0] if len(state) > 0 else "UNKNOWN"
+        return states
+
+    def _queue_states(self, job_ids: List[str]) -> Optional[Dict[str, str]]:
+        """Method to get the states of all tasks of the jobs that are in the queue, with one squeue call. Returns None if the query failed"""
+        out = run("{} --noheader --array --format='%i|%T' --jobs={}".format(self.squeue_cmd, ",".join(job_ids)), shell=True, capture_output=True, text=True)
+        if not out.returncode == 0:
+            # squeue fails if none of the jobs is known any more
+            if "Invalid job id" in out.stderr:
+                return {}
+            return None
+        return self._parse_states(out.stdout)
+
+    def _final_states(self, job_ids: List[str]) -> Dict[str, str]:
+        """Method to get the final states of all tasks of finished jobs, with one sacct call. Returns an empty dictionary if the query failed"""
+        out = run("{} --noheader --parsable2 --allocations --format=JobID,State --jobs={}".format(self.sacct_cmd, ",".join(job_ids)),
+                    shell=True, capture_output=True, text=True)
+        if not out.returncode == 0:
+            return {}
+        return self._parse_states(out.stdout)
+
+    def wait(self, update_time: float=1, max_update_time: float=60, backoff: float=2, timeout: Optional[float]=None) -> Dict[str, str]:
+        """Method to wait until all client's jobs are finished. All jobs are checked with one squeue call, the time between checkups grows while
+        nothing changes in the queue (and goes back to update_time on every change).
         ARGS:
-            - update_time (int): number of seconds to wait between checkups. default=1"""
+            - update_time (float): number of seconds to wait between checkups. default=1
+            - max_update_time (float): maximal number of seconds between checkups. default=60
+            - backoff (float): factor of the time between checkups while nothing changes. default=2
+            - timeout (float): maximal number of seconds to wait. unfinished jobs stay tracked, so wait can be called again. default=None
+        RETURNS:
+            (Dict[str, str]) states of the tasks (job_task IDs for array tasks). final states (from sacct) for finished jobs and
+                             last queue states for jobs that didn't finish before the timeout. UNKNOWN if a final state isn't available"""
         print("waiting for jobs {} to finish".format(", ".join(self._job_ids)))
-        while True:
+        states = {}
+        queue = {}
+        interval = update_time
+        start = monotonic()
+        while len(self._job_ids) > 0:
+            if timeout is not None:
+                remaining = timeout - (monotonic() - start)
+                if remaining <= 0:
+                    print("WARNING: timeout reached, jobs {} did not finish".format(", ".join(self._job_ids)))
+                    break
+                interval = min(interval, remaining)
             # sleeps between each checkup
-            sleep(update_time)
-            # checks if all jobs are done
-            _job_ids = []
-            for job_id in self._job_ids:
-                out = run("squeue -j {}".format(job_id), shell=True, capture_output=True, text=True)
-                if len(out.stdout.split("\n")) > 2:
-                    _job_ids.append(job_id)
-            self._job_ids = _job_ids
-            # if all jobs are done, break
-            if len(self._job_ids) == 0:
-                return
\ No newline at end of file
+            sleep(interval)
+            new_queue = self._queue_states(self._job_ids)
+            if new_queue is None:
+                # failed query, trying again later
+                interval = min(interval * backoff, max_update_time)
+                continue
+            queued_jobs = {task_id.split("_")[0] for task_id in new_queue}
+            done = [job_id for job_id in self._job_ids if not job_id in queued_jobs]
+            states.update(new_queue)
+            if len(done) > 0:
+                final = self._final_states(done)
+                for job_id in done:
+                    job_states = {task_id: state for task_id, state in final.items() if task_id.split("_")[0] == job_id}
+                    if len(job_states) == 0:
+                        job_states = {task_id: "UNKNOWN" for task_id in states if task_id.split("_")[0] == job_id} or {job_id: "UNKNOWN"}
+                    states.update(job_states)
+                    self._record_job(job_id, job_states)
+                self._job_ids = [job_id for job_id in self._job_ids if job_id in queued_jobs]
+            # checkups are frequent while the queue changes
+            if len(done) > 0 or not new_queue == queue:
+                interval = update_time
+            else:
+                interval = min(interval * backoff, max_update_time)
+            queue = new_queue
+        if len(self._job_ids) == 0:
+            self._collect_submissions()
+        return states
+
+    def _record_job(self, job_id: str, job_states: Dict[str, str]):
+        """Method to record the submit-to-finish latency of a finished job (if instrumentation is on)"""
+        submitted = self._submit_times.pop(job_id, None)
+        recorder = get_recorder()
+        if recorder is None or submitted is None:
+            return
+        failed = sum(1 for state in job_states.values() if not state == "COMPLETED")
+        recorder.record("slurm_job", self.job_name, time() - submitted, submitted, job_id=job_id, n_tasks=len(job_states), failed_tasks=failed)
+
+    @staticmethod
+    def _read_submission(submission: dict) -> List[dict]:
+        """Method to read the results of the commands of a submission from the status files of its array tasks"""
+        results = [{"command": cmd, "exit_code": None, "duration": None} for cmd in submission["cmds"]]
+        for start, status_dir in submission["shards"]:
+            if not os.path.isdir(status_dir):
+                continue
+            for fname in os.listdir(status_dir):
+                with open(os.path.join(status_dir, fname), "r") as f:
+                    for line in f:
+                        line = line.split()
+                        if not len(line) == 3:
+                            continue
+                        idx = start + int(line[0]) - 1
+                        results[idx]["exit_code"] = int(line[1])
+                        results[idx]["duration"] = int(line[2]) / 1000
+        return results
+
+    def read_command_results(self) -> List[dict]:
+        """Method to read the results of the commands of the submissions that are not collected yet (can be used while jobs are running).
+        RETURNS:
+            (List[dict]) command, exit_code and duration (seconds) of every command, in submission order. None for commands that didn't finish"""
+        results = []
+        for submission in self._submissions:
+            results += self._read_submission(submission)
+        return results
+
+    def _collect_submissions(self):
+        """Method to collect the command results of finished submissions (to command_results), update the measured command duration
+        and remove the staging directories"""
+        self.command_results = self.read_command_results()
+        durations = [res["duration"] for res in self.command_results if res["duration"] is not None]
+        if len(durations) > 0:
+            self.command_duration = sum(durations) / len(durations)
+        failed = sum(1 for res in self.command_results if res["exit_code"] is not None and not res["exit_code"] == 0)
+        if failed > 0:
+            print("WARNING: {} of {} commands failed, see command_results".format(failed, len(self.command_results)))
+        # the submission files are not needed once all jobs are done
+        if not self.keep_staging:
+            for submission in self._submissions:
+                shutil.rmtree(submission["staging_dir"], ignore_errors=True)
+        self._submissions = []
@@ -1 +1,2 @@
-from .SlurmClient import SlurmClient
\ No newline at end of file
+from .SlurmClient import SlurmClient
+from .LocalClient import LocalClient
\ No newline at end of file
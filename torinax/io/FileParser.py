@@ -1,11 +1,32 @@
 from abc import ABC, abstractclassmethod
 from ..base.Specie import Specie
+from .TriggerEngine import Section, TriggerEngine
+from ..Recorder import get_recorder
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import mmap
 import os
 
+def _write_text(path: str, text: str):
+    """Writes a text file in one buffered write"""
+    with open(path, "w") as f:
+        f.write(text)
+
+
 class FileParser (ABC):
 
     """Abstract file parser"""
 
+    encoding = None
+    chunk_size = 1 << 20
+    # pandas dtypes of the read_scalar_data values, by key (float64, boolean, Int64, category, string or object)
+    schema = {}
+    # name of the program of the files (the program column of tables of directories with files of several programs)
+    program = None
+    # bytes (or tuple of bytes) found in the first sniff_size bytes of every file of the parser, None if the files can't be identified by content
+    signature = None
+    sniff_size = 4096
+
     def __init__(self, path):
         if not hasattr(self, "extension"):
             raise NotImplementedError("Undefined extension for this file parser. Please define an extension and rerun.")
@@ -17,6 +38,14 @@ class FileParser (ABC):
         else:
             raise ValueError("Illegal file extension for supplied file.")
 
+    @classmethod
+    def sniff(cls, head: bytes) -> bool:
+        """Method to check if the first bytes of a file belong to a file of the parser. A cheap check made before parsing (see torinax.io.registry)"""
+        if cls.signature is None:
+            return False
+        signatures = (cls.signature,) if isinstance(cls.signature, bytes) else cls.signature
+        return any(signature in head[:cls.sniff_size] for signature in signatures)
+
     @abstractclassmethod
     def read_scalar_data(self):
         """Reads scalar data from file to a dictionary"""
@@ -32,6 +61,142 @@ class FileParser (ABC):
         """Method to write the file type, given keywords dictionary and a specie."""
         raise NotImplementedError("Write file method is not implemented for this structure")
 
+    @classmethod
+    def _input_text(cls, specie: Specie, kwdict: dict) -> str:
+        """Method to make the text of a file of the type for a specie (used by write_many)"""
+        raise NotImplementedError("Batch writing is not implemented for {} files".format(cls.__name__))
+
+    @classmethod
+    def write_many(cls, species: Iterable[Specie], kwdict: dict, out_dir: str, naming: Optional[Union[Callable[[int, Specie], str], List[str]]]=None,
+                    n_workers: int=8) -> List[str]:
+        """Method to write files of the type for many species with the same keywords dictionary. The files are the same as the files written by write_file.
+        The keywords dictionary is checked once, and the files are written on a pool of threads while the next texts are made.
+        ARGS:
+            - species (Iterable[Specie]): the species
+            - kwdict (dict): keywords dictionary (as in write_file)
+            - out_dir (str): directory for the files, made if it doesn't exist
+            - naming (Union[Callable[[int, Specie], str], List[str]]): names of the files (without extension), either a list or a function of
+                                                                         the index and the specie. default=None (the index of the specie)
+            - n_workers (int): number of writing threads. default=8
+        RETURNS:
+            (List[str]) paths of the written files"""
+        if hasattr(cls, "_check_kwdict"):
+            cls._check_kwdict(kwdict)
+        if not os.path.isdir(out_dir):
+            os.makedirs(out_dir)
+        paths = []
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            futures = []
+            for i, specie in enumerate(species):
+                if naming is None:
+                    name = str(i)
+                elif callable(naming):
+                    name = naming(i, specie)
+                else:
+                    name = naming[i]
+                path = os.path.join(out_dir, "{}.{}".format(name, cls.extension))
+                futures.append(pool.submit(_write_text, path, cls._input_text(specie, kwdict)))
+                paths.append(path)
+            for future in futures:
+                future.result()
+        return paths
+
+    def _section(self, name: str, **kwargs) -> Section:
+        """Method to get the declaration of a section of the file (the data returned by read_<name>).
+        Sections are declared by methods named _<name>_section, returning a Section with the triggers for reading the section data (see TriggerEngine)"""
+        method = getattr(self, "_{}_section".format(name), None)
+        if method is None:
+            raise ValueError("Unknown section {} for {} files".format(name, type(self).__name__))
+        return method(**kwargs)
+
+    def read_all(self, what: List[str], kwargs: Optional[Dict[str, dict]]=None) -> dict:
+        """Method to read several sections of the file in a single pass over the file.
+        ARGS:
+            - what (List[str]): names of the sections to read. the section X is the data returned by the read_X method (for example ["scalar_data", "specie"])
+            - kwargs (Dict[str, dict]): keyword arguments for the sections, by section name. default=None
+        RETURNS:
+            (dict) dictionary with section names (keys) and section data (values)"""
+        with open(self.path, "r", encoding=self.encoding) as f:
+            # the file is streamed in chunks, memory is bounded by the chunk size and the data kept by the sections
+            return self._extract(what, self._iter_chunks(f), kwargs)
+
+    def _iter_chunks(self, f) -> Iterable[str]:
+        """Method to iterate over chunks of about chunk_size characters of an open file, each chunk ends at the end of a line"""
+        while True:
+            chunk = f.read(self.chunk_size)
+            if len(chunk) == 0:
+                return
+            if not chunk.endswith("\n"):
+                chunk += f.readline()
+            yield chunk
+
+    def _extract(self, what: List[str], chunks: Iterable[str], kwargs: Optional[Dict[str, dict]]=None) -> dict:
+        """Method to read several sections from chunks of text (of the file) in a single pass"""
+        kwargs = kwargs if kwargs is not None else {}
+        engine = TriggerEngine({name: self._section(name, **kwargs.get(name, {})) for name in what})
+        recorder = get_recorder()
+        if recorder is None:
+            return engine.run(chunks)
+        # time spent in every section, the rest of the run is reading and scanning the text
+        timings = {}
+        with recorder.timer("read", type(self).__name__, sections=list(what)):
+            res = engine.run(chunks, timings)
+        for name, duration in timings.items():
+            recorder.record("section", "{}.{}".format(type(self).__name__, name), duration)
+        return res
+
+    def _last_block(self, header: str, ends: Tuple[str]=("\n\n",)) -> Optional[Tuple[int, str]]:
+        """Method to get the text of the last block in the file that starts with a header, without reading the whole file.
+        The memory mapped file is scanned backwards for the header and the block ends at the first occurrence of one of the end strings after it.
+        ARGS:
+            - header (str): text in the first line of the block
+            - ends (Tuple[str]): strings that end the block (included in the block). default=("\n\n",) (the block ends with an empty line)
+        RETURNS:
+            (Tuple[int, str]) the offset of the block in the file and the text of the block, None if the header is not found"""
+        encoding = self.encoding or "utf8"
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                idx = mm.rfind(header.encode(encoding))
+                if idx < 0:
+                    return None
+                start = mm.rfind(b"\n", 0, idx) + 1
+                end = len(mm)
+                for s in ends:
+                    # looking for the end string with both line endings
+                    for e in {s.encode(encoding), s.replace("\n", "\r\n").encode(encoding)}:
+                        i = mm.find(e, idx)
+                        if i >= 0:
+                            end = min(end, i + len(e))
+                text = mm[start:end].decode(encoding)
+        return start, text.replace("\r\n", "\n")
+
+    def _last_line(self, marker: str, condition: Optional[Callable[[str], bool]]=None) -> Optional[str]:
+        """Method to get the last line in the file that contains a marker (and satisfies a condition), scanning the memory mapped file backwards.
+        ARGS:
+            - marker (str): text in the line
+            - condition (Callable[[str], bool]): extra condition on the line. default=None
+        RETURNS:
+            (str) the line, None if no such line is found"""
+        encoding = self.encoding or "utf8"
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = len(mm)
+                while True:
+                    idx = mm.rfind(marker.encode(encoding), 0, end)
+                    if idx < 0:
+                        return None
+                    start = mm.rfind(b"\n", 0, idx) + 1
+                    stop = mm.find(b"\n", idx)
+                    stop = len(mm) if stop < 0 else stop + 1
+                    line = mm[start:stop].decode(encoding).replace("\r\n", "\n")
+                    if condition is None or condition(line):
+                        return line
+                    end = start
+
     def save_specie(self, specie_path):
         """Method to save a specie data to standard format (xyz, cif...)"""
         # reading molecule
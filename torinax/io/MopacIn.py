@@ -1,12 +1,8 @@
 from .FileParser import FileParser
-from ..utils.openbabel import obmol_to_mol_dict, ob_read_file_to_mol_dict
 from ..base.Molecule import Molecule
-import openbabel as ob
-import subprocess
-import os
-from typing import List
+import numpy as np
 
-class MopacIn:
+class MopacIn (FileParser):
     
     """A file parser for MOPAC standard input files"""
     extension = "mop"
@@ -28,38 +24,37 @@ class MopacIn:
         """Method to read specie list (atom_symbols key), cartesian coordinates (atom_coords key) and bond information (bondmap key) to a dictionary"""
         raise NotImplementedError("read_specie is not implemented feature for MOPAC input files")
 
-    def _check_kwdict(self, kwdict: dict):
+    @staticmethod
+    def _check_kwdict(kwdict: dict):
         if not "top_kwds" in kwdict.keys():
             raise ValueError("Keywords dictionary must contain top_kwds entry for top keywords, value is a list of strings")
         if not "bottom_kwds" in kwdict.keys():
             raise ValueError("Keywords dictionary must contain bottom_kwds entry for bottom keywords, value is a list of strings")
 
+    @staticmethod
+    def _mol_to_input_text(molecule: Molecule) -> str:
+        # rounding all coordinates at once (same rounding as round on array values)
+        x, y, z = np.round(molecule.coordinates, 4).T.tolist() if len(molecule.symbols) > 0 else ([], [], [])
+        return "".join(map("{} {!r} 1 {!r} 1 {!r} 1\n".format, molecule.symbols, x, y, z))
+
+    @classmethod
+    def _input_text(cls, molecule: Molecule, kwdict: dict) -> str:
+        s = []
+        # writing top part
+        if not kwdict['top_kwds'] is None:
+            s.append("".join(" " + word for word in kwdict['top_kwds']) + "\n")
+            s.append("title\n")
+            s.append("\n")
+        # writing coords and atoms
+        s.append(cls._mol_to_input_text(molecule))
+        # writing bottom part
+        if not kwdict['bottom_kwds'] is None:
+            s.append("\n")
+            s.append("".join(" " + word for word in kwdict['bottom_kwds']))
+        return "".join(s)
+
     def write_file(self, molecule: Molecule, kwdict: dict):
         """internal write method. takes molecule dict (atom_symbols, atom_coords, bondmap) and kwdict (top_kwds, bottom_kwds)"""
         self._check_kwdict(kwdict)
         with open(self.path, "w") as f:
-            # writing top part
-            if not kwdict['top_kwds'] is None:
-                top_string = ""
-                for word in kwdict['top_kwds']:
-                    top_string += " " + word
-                top_string += "\n"
-                f.write(top_string)
-                f.write("title\n")
-                f.write("\n")
-
-            # writing coords and atoms
-            for atom in molecule.atoms:
-                s = atom.symbol
-                for c in atom.coordinates:
-                    s += " " + str(round(c, 4)) + " 1"
-                s += "\n"
-                f.write(s)
-
-            # writing bottom part
-            if not kwdict['bottom_kwds'] is None:
-                bottom_string = ""
-                for word in kwdict['bottom_kwds']:
-                    bottom_string += " " + word
-                f.write("\n")
-                f.write(bottom_string)
+            f.write(self._input_text(molecule, kwdict))
@@ -1,13 +1,99 @@
 from .FileParser import FileParser
-from ..base.Atom import Atom
 from ..base.Molecule import Molecule
 from ..base.Specie import Specie
-import re
+from .TriggerEngine import Block, CONSUME, Section, Trigger, set_flag, set_value
 import numpy as np
 
+
+def _read_word(key: str, index: int, first_words: str):
+    """Makes an action that sets state[key] to the index-th word in the line (as float), for lines whose first two words joined are first_words"""
+    def action(state, line):
+        wordsvec = line.split()
+        if len(wordsvec) > 1 and wordsvec[0] + wordsvec[1] == first_words:
+            try:
+                state[key] = float(wordsvec[index])
+            except IndexError:
+                pass
+            return CONSUME
+    return action
+
+def _start_excited_states(state, line):
+    if line == "  STATE       ENERGY (EV)        Q.N.  SPIN   SYMMETRY              POLARIZATION\n":
+        state["ESandETBlock"] = True
+        return CONSUME
+
+def _read_excited_state(state, line):
+    wordsvec = line.split()
+    if len(wordsvec) == 0:
+        return CONSUME
+    if len(wordsvec) == 6 or len(wordsvec) == 9:
+        if wordsvec[4] == "SINGLET":
+            state["singlet_energy"] = float(wordsvec[2])
+            return CONSUME
+        elif wordsvec[4] == "TRIPLET":
+            state["triplet_energy"] = float(wordsvec[2])
+            return CONSUME
+    if not state["singlet_energy"] is None and not state["triplet_energy"] is None:
+        state["ESandETBlock"] = False
+        return CONSUME
+
+def _start_coordinates(state, line):
+    if "".join(line.split()) == "CARTESIANCOORDINATES":
+        state["CoordsBlock"] = True
+        state["atom_coords"] = []
+        state["atom_symbols"] = []
+        return CONSUME
+
+def _read_coordinates_line(state, line):
+    wordsvec = line.split()
+    if len(wordsvec) == 0:
+        return CONSUME
+    if not len(wordsvec) == 5:
+        state["CoordsBlock"] = False
+    elif not wordsvec[0] == "NO.":
+        state["atom_symbols"].append(wordsvec[1])
+        state["atom_coords"].append([float(x) for x in wordsvec[2:]])
+    return CONSUME
+
+def _make_molecule(state) -> Molecule:
+    return Molecule(symbols=state["atom_symbols"], coordinates=np.array(state["atom_coords"]))
+
+def _start_vibrations(state, line):
+    state["frequencies"] = []
+    state["effective_masses"] = []
+    state["force_constants"] = []
+
+def _read_vibrations_line(state, line):
+    wordsvec = line.split()
+    if len(wordsvec) == 0:
+        return CONSUME
+    if wordsvec[0] == "FREQUENCY":
+        state["frequencies"].append(float(wordsvec[1]))
+    elif wordsvec[0] + wordsvec[1] == "EFFECTIVEMASS":
+        try:
+            state["effective_masses"].append(float(wordsvec[2]))
+        except:
+            pass
+    elif wordsvec[0] + wordsvec[1] == "FORCECONSTANT":
+        state["force_constants"].append(float(wordsvec[2]))
+    return CONSUME
+
+
 class MopacOut (FileParser):
     """A file parser for MOPAC standard output files"""
     extension = "out"
+    program = "mopac"
+    signature = b"MOPAC"
+    schema = {
+        "singlet_energy": "float64",
+        "triplet_energy": "float64",
+        "homo_lumo_gap": "float64",
+        "ionization_energy": "float64",
+        "total_energy": "float64",
+        "runtime": "float64",
+        "finished_normally": "boolean",
+        "converged": "boolean"
+    }
 
     def read_scalar_data(self):
         """Method to read basic properties from MOPAC output.
@@ -25,6 +111,9 @@ class MopacOut (FileParser):
                         "finished_normally": (bool) if computation was finished successfully,
                         "converged": (bool) if the computation converged
                     }"""
+        return self.read_all(["scalar_data"])["scalar_data"]
+
+    def _scalar_data_section(self) -> Section:
         outdict = {
                     "singlet_energy": None,
                     "triplet_energy": None,
@@ -35,87 +124,31 @@ class MopacOut (FileParser):
                     "finished_normally": False, 
                     "converged": False
                   }
-
-        with open(self.path, "r") as f:
-            ESandETBlock = False
-            OxyStateBlock = False
-
-            for line in f.readlines():
-                wordsvec = re.split(r" |\t|\n", line)
-                wordsvec = list(filter(lambda a: a != '', wordsvec))
-                if len(wordsvec) == 0:
-                    continue
-
-                if line == "  STATE       ENERGY (EV)        Q.N.  SPIN   SYMMETRY              POLARIZATION\n":
-                    ESandETBlock = True
-                    continue
-                if ESandETBlock and (len(wordsvec) == 6 or len(wordsvec) == 9):
-                    if wordsvec[4] == "SINGLET":
-                        outdict["singlet_energy"] = float(wordsvec[2])
-                        continue
-                    elif wordsvec[4] == "TRIPLET":
-                        outdict["triplet_energy"] = float(wordsvec[2])
-                        continue
-
-                if not outdict["singlet_energy"] == None and not outdict["triplet_energy"] == None and ESandETBlock:
-                    ESandETBlock = False
-                    continue
-                
-                if "HERBERTS TEST WAS SATISFIED IN BFGS" in line:
-                    outdict["converged"] = True
-                if "* JOB ENDED NORMALLY *" in line:
-                    outdict["finished_normally"] = True
-                if "TOTAL JOB TIME" in line:
-                    outdict["runtime"] = float(wordsvec[-2])
-
-                try:
-                    if wordsvec[0] + wordsvec[1] == "IONIZATIONPOTENTIAL":
-                        outdict["ionization_energy"] = float(wordsvec[3])
-                        continue
-                    elif wordsvec[0] + wordsvec[1] == "HOMOLUMO":
-                        outdict["homo_lumo_gap"] = float(wordsvec[-1])
-                        continue
-                    elif wordsvec[0] + wordsvec[1] == "TOTALENERGY":
-                        outdict["total_energy"] = float(wordsvec[3])
-                        continue
-                except IndexError:
-                    continue
-        return outdict
+        rules = [
+            Trigger("STATE       ENERGY (EV)", _start_excited_states),
+            Trigger(None, _read_excited_state, when="ESandETBlock"),
+            Trigger("HERBERTS TEST WAS SATISFIED IN BFGS", set_flag("converged")),
+            Trigger("* JOB ENDED NORMALLY *", set_flag("finished_normally")),
+            Trigger("TOTAL JOB TIME", set_value("runtime", -2)),
+            Trigger("IONIZATION", _read_word("ionization_energy", 3, "IONIZATIONPOTENTIAL")),
+            Trigger("HOMO", _read_word("homo_lumo_gap", -1, "HOMOLUMO")),
+            Trigger("TOTAL", _read_word("total_energy", 3, "TOTALENERGY")),
+        ]
+        state = dict(outdict, ESandETBlock=False)
+        return Section(rules, state, lambda state: {k: state[k] for k in outdict})
 
 
     def read_specie(self):
         """Method to read specie list (atom_symbols key), cartesian coordinates (atom_coords key) and bond information (bondmap key) to a dictionary"""
-        outdict = {
-                    "atom_symbols": None,
-                    "atom_coords": None,
-                    "bondmap": None
-                  }
+        return self.read_all(["specie"])["specie"]
 
-        with open(self.path, "r") as f:
-            CoordsBlock = False
-            for line in f.readlines():
-                wordsvec = re.split(r" |\t|\n", line)
-                wordsvec = list(filter(lambda a: a != '', wordsvec))
-                if len(wordsvec) == 0:
-                    continue
-
-                if "".join(wordsvec) == "CARTESIANCOORDINATES":
-                    CoordsBlock = True
-                    outdict["atom_coords"] = []
-                    outdict["atom_symbols"] = []
-                    continue
-
-                if CoordsBlock and not len(wordsvec) == 5:
-                    CoordsBlock = False
-                    continue
-
-                if CoordsBlock and not wordsvec[0] == "NO.":
-                    outdict["atom_symbols"].append(wordsvec[1])
-                    outdict["atom_coords"].append([float(x) for x in wordsvec[2:]])
-                    continue
-        # creating Molecule object
-        atoms = [Atom(s, np.array(c)) for s, c in zip(outdict["atom_symbols"], outdict["atom_coords"])]
-        return Molecule(atoms)
+    def _specie_section(self) -> Section:
+        rules = [
+            Trigger("COORDINATES", _start_coordinates),
+            Trigger(None, _read_coordinates_line, when="CoordsBlock"),
+        ]
+        state = {"atom_symbols": None, "atom_coords": None, "bondmap": None, "CoordsBlock": False}
+        return Section(rules, state, _make_molecule)
 
     def read_frequency_dict(self):
         """Method to read frequency data from mopac output file.
@@ -126,42 +159,17 @@ class MopacOut (FileParser):
                 - frequencies (List[float]): list of vibrational frequencies
                 - effective_masses (List[float]): list of vibration effective mass
                 - force_constants (List[float]): force constant for the vibration"""
-        outdict = {
-                    "frequencies": None,
-                    "effective_masses": None,
-                    "force_constants": None
-                  }
-
-        with open(self.path, "r") as f:
-            VibBlock = False
-            for line in f.readlines():
-                wordsvec = re.split(r" |\t|\n", line)
-                wordsvec = list(filter(lambda a: a != '', wordsvec))
-                if len(wordsvec) == 0:
-                    continue
-                if "DESCRIPTION OF VIBRATIONS" in line:
-                    VibBlock = True
-                    outdict["frequencies"] = []
-                    outdict["effective_masses"] = []
-                    outdict["force_constants"] = []
-                    continue
-
-                if VibBlock and "FORCE CONSTANT IN CARTESIAN COORDINATES (Millidynes/A)" in line:
-                    VibBlock = False
-                    continue
-
-                if VibBlock:
-                    if wordsvec[0] == "FREQUENCY":
-                        outdict["frequencies"].append(float(wordsvec[1]))
-                    elif wordsvec[0] + wordsvec[1] == "EFFECTIVEMASS":
-                        try:
-                            outdict["effective_masses"].append(float(wordsvec[2]))
-                        except:
-                            continue
-                    elif wordsvec[0] + wordsvec[1] == "FORCECONSTANT":
-                        outdict["force_constants"].append(float(wordsvec[2]))
-                
-            return outdict
+        return self.read_all(["frequency_dict"])["frequency_dict"]
+
+    def _frequency_dict_section(self) -> Section:
+        rules = [
+            Block("VibBlock", "DESCRIPTION OF VIBRATIONS",
+                    on_start=_start_vibrations,
+                    on_line=_read_vibrations_line,
+                    end=lambda state, line: "FORCE CONSTANT IN CARTESIAN COORDINATES (Millidynes/A)" in line)
+        ]
+        state = {"frequencies": None, "effective_masses": None, "force_constants": None}
+        return Section(rules, state, lambda state: {k: state[k] for k in ["frequencies", "effective_masses", "force_constants"]})
 
     def write_file(self, specie: Specie, kwdict: dict):
         return super().write_file()
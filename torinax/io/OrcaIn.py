@@ -39,25 +39,29 @@ class OrcaIn (FileParser):
     
     @staticmethod
     def _mol_to_input_text(molecule: Molecule) -> str:
-        s = ""
-        for atom in molecule.atoms:
-            s += "{}\t{:.4f}\t{:.4f}\t{:.4f}\n".format(atom.symbol, *atom.coordinates)
-        return s
+        # formatting all atoms with one map over the symbols and coordinate columns
+        x, y, z = molecule.coordinates.T.tolist() if len(molecule.symbols) > 0 else ([], [], [])
+        return "".join(map("{}\t{:.4f}\t{:.4f}\t{:.4f}\n".format, molecule.symbols, x, y, z))
 
+    @classmethod
+    def _input_text(cls, specie: Molecule, kwdict: dict) -> str:
+        input_text = kwdict["input_text"]
+        if len(specie.atoms) == 1 and "OPT" in input_text:
+            print("WARNING: input has optimization of one atom - this is not supported in ORCA 5")
+            print("Falling back to single point SCF")
+            input_text = input_text.replace("OPT", "")
+        s = [input_text]
+        if not input_text.endswith("\n"):
+            s.append("\n")
+        # writing molecule
+        s.append("* xyz {} {}\n".format(kwdict["charge"], kwdict["mult"]))
+        s.append(cls._mol_to_input_text(specie))
+        s.append("*")
+        return "".join(s)
 
     def write_file(self, specie: Molecule, kwdict: dict):
         """Method to write the file type, given keywords dictionary and a specie."""
         self._check_kwdict(kwdict)
-        if len(specie.atoms) == 1 and "OPT" in kwdict["input_text"]:
-            print("WARNING: input has optimization of one atom - this is not supported in ORCA 5")
-            print("Falling back to single point SCF")
-            kwdict["input_text"] = kwdict["input_text"].replace("OPT", "")
+        # the text is made as in write_many (single atom optimizations fall back to single point, without changing kwdict)
         with open(self.path, "w") as f:
-            # writing input text
-            f.write(kwdict["input_text"])
-            if not kwdict["input_text"].endswith("\n"):
-                f.write("\n")
-            # writing molecule
-            f.write("* xyz {} {}\n".format(kwdict["charge"], kwdict["mult"]))
-            f.write(self._mol_to_input_text(specie))
-            f.write("*")
\ No newline at end of file
+            f.write(self._input_text(specie, kwdict))
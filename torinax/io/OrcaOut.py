@@ -1,14 +1,135 @@
 from .FileParser import FileParser
 from ..base.Molecule import Molecule
-from ..base.Atom import Atom
-import pandas as pd
+from .TriggerEngine import Block, CONSUME, STOP, Section, Trigger, set_flag, set_value
+from ..lazy import LazyModule
 import numpy as np
 from typing import List
 
+# pandas is only needed for the orbital population tables
+pd = LazyModule("pandas")
+
+
+def _read_n_electrons(state, line):
+    state["n_electrons"] = int(np.floor(float(line.split()[-2])))
+
+def _read_mo_energy(state, line):
+    occ = float(line.split()[1])
+    energy = float(line.split()[-1])
+    if occ == 1:
+        state["homo_ev"] = energy
+    else:
+        state["lumo_ev"] = energy
+        state["MoEnergyBlock"] = False
+
+def _start_frequencies(state, line):
+    state["FreqCalc"] = True
+    return CONSUME
+
+def _start_molecule(state, line):
+    state['atom_symbols'] = []
+    state['atom_coords'] = []
+
+def _read_molecule_line(state, line):
+    if "--------" in line:
+        return CONSUME
+    if len(line) < 2:
+        state["MoleculeBlock"] = False
+        return CONSUME
+    v = line.split()
+    state['atom_symbols'].append(v[0])
+    state['atom_coords'].append([float(x) for x in v[-3:]])
+
+def _make_molecule(state) -> Molecule:
+    return Molecule(symbols=state["atom_symbols"], coordinates=np.array(state["atom_coords"]))
+
+def _reset_loewdin(state, line):
+    if not state["n_rows"] == 0:
+        state["blocks"] = []
+        state["n_rows"] = 0
+        state["current"] = None
+
+def _read_loewdin_line(state, line):
+    counter = state["line_no"]
+    splitted = line.split()
+    offset = counter - state["title_line_no"]
+    if len(splitted) == 6 and offset > 3:
+        state["title_line_no"] = counter
+        # a block is kept when the next block starts
+        if state["current"] is not None:
+            state["blocks"].append(state["current"])
+            state["n_rows"] += len(state["current"]["mo"])
+        state["current"] = {"mo": [int(s) for s in splitted], "energy [Ha]": None, "occupation": None, "orbitals": {}}
+        return CONSUME
+    current = state["current"]
+    if offset == 1 and current is not None:
+        current["energy [Ha]"] = splitted
+    if offset == 2 and current is not None:
+        current["occupation"] = splitted
+    if offset == 3:
+        state["TableBlock"] = True
+        return CONSUME
+    if len(splitted) == 0:
+        state["TableBlock"] = False
+        return CONSUME
+    if state["TableBlock"]:
+        # values are kept as strings, only the values of focus orbitals are converted (at the end)
+        if current is not None and (state["focus_orbitals"] is None or "_".join(splitted[1:3]) in state["focus_orbitals"]):
+            current["orbitals"]["_".join(splitted[:3])] = splitted[3:]
+        return CONSUME
+    if "****************" in line:
+        state["LoewdinBlock"] = False
+
+def _make_loewdin_table(state, as_arrays: bool=False):
+    """Makes the (MO x column) table of the read Loewdin blocks. All values are converted to floats at once and put in one preallocated array"""
+    blocks = state["blocks"]
+    columns = {}
+    for block in blocks:
+        for name in ("energy [Ha]", "occupation"):
+            if block[name] is not None:
+                columns.setdefault(name, len(columns))
+        for name in block["orbitals"]:
+            columns.setdefault(name, len(columns))
+    index = np.array([mo for block in blocks for mo in block["mo"]], dtype=int)
+    values = np.zeros((len(index), len(columns)))
+    strings = []
+    rows = []
+    cols = []
+    start = 0
+    for block in blocks:
+        n = len(block["mo"])
+        cells = [(name, block[name]) for name in ("energy [Ha]", "occupation") if block[name] is not None] + list(block["orbitals"].items())
+        for name, vals in cells:
+            if not len(vals) == n:
+                raise ValueError("Got {} values for {} in a block of {} MOs".format(len(vals), name, n))
+            strings += vals
+            rows += range(start, start + n)
+            cols += [columns[name]] * n
+        start += n
+    values[rows, cols] = np.array(strings, dtype=float)
+    if as_arrays:
+        return {"index": index, "columns": list(columns), "values": values}
+    if len(blocks) == 0:
+        return pd.DataFrame()
+    return pd.DataFrame(values, index=index, columns=list(columns))
+
+
 class OrcaOut (FileParser):
 
     """A file parser for ORCA standard output files"""
     extension = "out"
+    program = "orca"
+    signature = b"O   R   C   A"
+    schema = {
+        "runtime": "float64",
+        "final_energy": "float64",
+        "finished_normally": "boolean",
+        "n_electrons": "Int64",
+        "homo_ev": "float64",
+        "lumo_ev": "float64",
+        "has_imaginary_freq": "boolean",
+        "gibbs_free_energy": "float64"
+    }
+    encoding = "utf8"
 
     def read_scalar_data(self):
         """Method to read basic properties from ORCA output.
@@ -25,6 +146,9 @@ class OrcaOut (FileParser):
                         "has_imaginary_freq": (bool) if the molecule has imaginary frequencies (if no frequency calculation done, returns NONE)
                         "gibbs_free_energy": (float) value of gibbs free energy of the molecule (if no frequency calculation done, returns NONE)
                     }"""
+        return self.read_all(["scalar_data"])["scalar_data"]
+
+    def _scalar_data_section(self) -> Section:
         outdict = {
             "runtime": None,
             "final_energy": None,
@@ -35,123 +159,88 @@ class OrcaOut (FileParser):
             "has_imaginary_freq": None,
             "gibbs_free_energy": None
         }
-        MoEnergyBlock = False
-        FreqCalc = False
-        HasImFreq = False
-        with open(self.path, "r", encoding="utf8") as f:
-            for line in f.readlines():
-                if "FINAL SINGLE POINT ENERGY" in line:
-                    if "Wavefunction not fully converged!" in line:
-                        print("WARNING: SCF didn't fully converge in {}".format(self.path))
-                    outdict['final_energy'] = float(line.split()[4])
-                if "Sum of individual times" in line:
-                    outdict['runtime'] = float(line.split()[5])
-                if "****ORCA TERMINATED NORMALLY****" in line:
-                    outdict["finished_normally"] = True
-                if "N(Total)" in line:
-                    outdict["n_electrons"] = int(np.floor(float(line.split()[-2])))
-                if  "NO   OCC          E(Eh)            E(eV)" in line:
-                    MoEnergyBlock = True
-                    continue
-                if MoEnergyBlock:
-                    occ = float(line.split()[1])
-                    energy = float(line.split()[-1])
-                    if occ == 1:
-                        outdict["homo_ev"] = energy
-                    else:
-                        outdict["lumo_ev"] = energy
-                        MoEnergyBlock = False
-                if "frequencies" in line.lower():
-                    FreqCalc = True
-                    continue
-                if FreqCalc and "***imaginary mode***" in line:
-                    outdict["has_imaginary_freq"] = True
-                if "Final Gibbs free energy" in line:
-                    outdict["gibbs_free_energy"] = float(line.split()[-2])
+
+        def read_final_energy(state, line):
+            if "Wavefunction not fully converged!" in line:
+                print("WARNING: SCF didn't fully converge in {}".format(self.path))
+            state['final_energy'] = float(line.split()[4])
+
+        def make_outdict(state):
+            res = {k: state[k] for k in outdict}
             # after scanning the file, if frequency calc and not found imaginary freq => no imaginary freq in calc
-            if FreqCalc and outdict["has_imaginary_freq"] is None:
-                outdict["has_imaginary_freq"] = False
-        return outdict
+            if state["FreqCalc"] and res["has_imaginary_freq"] is None:
+                res["has_imaginary_freq"] = False
+            return res
 
-    def read_specie(self):
-        outdict = {
-            "atom_symbols": None,
-            "atom_coords": None,
-            "bondmap": None
-        }
+        rules = [
+            Trigger("FINAL SINGLE POINT ENERGY", read_final_energy),
+            Trigger("Sum of individual times", set_value("runtime", 5)),
+            Trigger("****ORCA TERMINATED NORMALLY****", set_flag("finished_normally")),
+            Trigger("N(Total)", _read_n_electrons),
+            Block("MoEnergyBlock", "NO   OCC          E(Eh)            E(eV)", on_line=_read_mo_energy),
+            Trigger("frequencies", _start_frequencies, ignore_case=True),
+            Trigger("***imaginary mode***", set_flag("has_imaginary_freq"), when="FreqCalc"),
+            Trigger("Final Gibbs free energy", set_value("gibbs_free_energy", -2)),
+        ]
+        return Section(rules, dict(outdict, FreqCalc=False), make_outdict)
+
+    def read_final_energy(self):
+        """Method to read the final single point energy (Hartree) by scanning the file backwards. Returns None if the file has no energy"""
+        line = self._last_line("FINAL SINGLE POINT ENERGY")
+        if line is None:
+            return None
+        if "Wavefunction not fully converged!" in line:
+            print("WARNING: SCF didn't fully converge in {}".format(self.path))
+        return float(line.split()[4])
 
-        with open(self.path, "r", encoding="utf8") as f:
-            MoleculeBlock = False
-            for line in f.readlines():
-                if "CARTESIAN COORDINATES (ANGSTROEM)" in line:
-                    MoleculeBlock = True
-                    outdict['atom_symbols'] = []
-                    outdict['atom_coords'] = []
-                    continue
-                if "--------" in line:
-                    continue
-                if len(line) < 2:
-                    MoleculeBlock = False
-                if MoleculeBlock:
-                    v = line.split()
-                    outdict['atom_symbols'].append(v[0])
-                    outdict['atom_coords'].append([float(x) for x in v[-3:]])
-        # creating Molecule object
-        atoms = [Atom(s, np.array(c)) for s, c in zip(outdict["atom_symbols"], outdict["atom_coords"])]
-        return Molecule(atoms)
-
-    def read_loewdin_reduced_orbital_populations(self, focus_orbitals=None, spin=None):
+    def read_specie(self, tail_first: bool=True):
+        """Method to read the (last) geometry in the file.
+        ARGS:
+            - tail_first (bool): find the last coordinates block by scanning the file backwards and parse only this block. default=True"""
+        if tail_first:
+            block = self._last_block("CARTESIAN COORDINATES (ANGSTROEM)")
+            if block is not None:
+                return self._extract(["specie"], [block[1]])["specie"]
+        return self.read_all(["specie"])["specie"]
+
+    def _specie_section(self) -> Section:
+        rules = [
+            Block("MoleculeBlock", "CARTESIAN COORDINATES (ANGSTROEM)", on_start=_start_molecule, on_line=_read_molecule_line)
+        ]
+        state = {"atom_symbols": None, "atom_coords": None, "bondmap": None}
+        return Section(rules, state, _make_molecule)
+
+    def read_loewdin_reduced_orbital_populations(self, focus_orbitals=None, spin=None, as_arrays: bool=False):
         """Method to read Loewdin reduced orbital populations per MO output from ORCA (got with NormalPrint option).
         ARGS:
             - focus_orbitals (List[str]): list of orbitals to focus on (for example O_px for px orbitals on oxygen atoms in the molecule). default None
             - spin (str): spin to make loewdin analysis for ("UP" or "DOWN") in case of unrestricted calculation. default None
+            - as_arrays (bool): return the table as arrays instead of a dataframe. default=False
         RETURNS:
-            (pd.DataFrame) dataframe with all loewdin orbital populations for all desired orbitals (all orbitals if focus_orbitals=None)"""
-        with open(self.path, "r", encoding="utf8") as f:
-            LoewdinBlock = False
-            title_line_no = 0
-            res = pd.DataFrame()
-            current = pd.DataFrame()
-            TableBlock = False
-            for counter, line in enumerate(f.readlines()):
-                splitted = line.strip().split()
-                if "LOEWDIN REDUCED ORBITAL POPULATIONS PER MO" in line:
-                    LoewdinBlock = True
-                    continue
-                if not spin is None:
-                    opposite_spin_text = "SPIN UP" if spin.lower() == 'down' else "SPIN DOWN"
-                    spin_text = "SPIN " + spin.upper()
-                    # stops parsing if read correct data (spin option is first)
-                    if opposite_spin_text in line and not len(res) == 0:
-                        break
-                    # re-reads data if read false data (spin option is second)
-                    elif spin_text in line and not len(res) == 0:
-                        res = pd.DataFrame()
-                        current = pd.DataFrame()
-                if LoewdinBlock and len(splitted) == 6 and counter - title_line_no > 3:
-                    title_line_no = counter
-                    res = pd.concat([res, current])
-                    current = pd.DataFrame(index=[int(s) for s in splitted])
-                    continue
-                if LoewdinBlock and counter - title_line_no == 1:
-                    current["energy [Ha]"] = [float(s) for s in splitted]
-                if LoewdinBlock and counter - title_line_no == 2:
-                    current["occupation"] = [float(s) for s in splitted]
-                if LoewdinBlock and counter - title_line_no == 3 :
-                    TableBlock = True
-                    continue
-                if len(splitted) == 0:
-                    TableBlock = False
-                    continue
-                if TableBlock:
-                    if focus_orbitals is None:
-                        current["_".join(splitted[:3])] = [float(s) for s in splitted[3:]]
-                    elif "_".join(splitted[1:3]) in focus_orbitals:
-                        current["_".join(splitted[:3])] = [float(s) for s in splitted[3:]]
-                    continue
-                if "****************" in line:
-                    LoewdinBlock = False
-            return res.fillna(0)
+            (pd.DataFrame) dataframe with all loewdin orbital populations for all desired orbitals (all orbitals if focus_orbitals=None).
+            if as_arrays=True, a dictionary with the MO indices ("index", array), the column names ("columns", list) and the values ("values", MO x column array)"""
+        section = "loewdin_reduced_orbital_populations"
+        return self.read_all([section], {section: {"focus_orbitals": focus_orbitals, "spin": spin, "as_arrays": as_arrays}})[section]
+
+    def _loewdin_reduced_orbital_populations_section(self, focus_orbitals=None, spin=None, as_arrays: bool=False) -> Section:
+        rules = []
+        if not spin is None:
+            opposite_spin_text = "SPIN UP" if spin.lower() == 'down' else "SPIN DOWN"
+            spin_text = "SPIN " + spin.upper()
+            # stops parsing if read correct data (spin option is first)
+            rules.append(Trigger(opposite_spin_text, lambda state, line: STOP if not state["n_rows"] == 0 else None))
+            # re-reads data if read false data (spin option is second)
+            rules.append(Trigger(spin_text, _reset_loewdin))
+        rules.append(Block("LoewdinBlock", "LOEWDIN REDUCED ORBITAL POPULATIONS PER MO", on_line=_read_loewdin_line))
+        state = {
+            "focus_orbitals": set(focus_orbitals) if focus_orbitals is not None else None,
+            "title_line_no": 0,
+            "blocks": [],
+            "n_rows": 0,
+            "current": None,
+            "TableBlock": False
+        }
+        return Section(rules, state, lambda state: _make_loewdin_table(state, as_arrays))
 
     def write_file(self, specie, kwdict):
         return super().write_file(specie, kwdict)
\ No newline at end of file
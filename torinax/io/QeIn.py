@@ -62,51 +62,64 @@ class QeIn (FileParser):
             raise ValueError('keywords_dict must contain an \'K_POINTS\' entry as a dict with \'type\' and \'vec\' keys')
         return Dict
 
-    def write_file(self, struct: Structure, keywords: dict):
-        '''method to generate input for QE calculation'''
+    @staticmethod
+    def _check_kwdict(keywords: dict):
+        if not 'ATOMIC_SPECIES' in keywords.keys():
+            raise ValueError('keywords_dict must contain an \'ATOMIC_SPECIES\' entry as a dict with species (keys) and potentials (values)')
+        if not 'K_POINTS' in keywords.keys():
+            raise ValueError('keywords_dict must contain an \'K_POINTS\' entry as a dict with \'type\' and \'vec\' keys')
+
+    @classmethod
+    def _input_text(cls, struct: Structure, keywords: dict) -> str:
         # converting to pymatgen structure - to fit with legacy code
         struct = structure_to_pmt_structure(struct)
         # TODO: add particular explanation on keywords_dict
-        keywords_dict = self._correct_keywords_dict(struct, keywords)
-        with open(self.path, "w") as f:
-            for key in ['CONTROL', 'SYSTEM', 'ELECTRONS', 'IONS', 'CELL']:
-                f.write("&" + key + "\n")
-                for k, v in keywords_dict[key].items():
-                    if type(v) is str:
-                        s = "\t" + k + "=\'" + v + '\',\n'
-                    elif type(v) is bool:
-                        if v:
-                            s = "\t" + k + "=.TRUE,\n"
-                        else:
-                            s = "\t" + k + "=.FALSE,\n"
+        keywords_dict = cls._correct_keywords_dict(struct, keywords)
+        f = []
+        for key in ['CONTROL', 'SYSTEM', 'ELECTRONS', 'IONS', 'CELL']:
+            f.append("&" + key + "\n")
+            for k, v in keywords_dict[key].items():
+                if type(v) is str:
+                    s = "\t" + k + "=\'" + v + '\',\n'
+                elif type(v) is bool:
+                    if v:
+                        s = "\t" + k + "=.TRUE,\n"
                     else:
-                        s = "\t" + k + "=" + str(v) + ',\n'
-                    f.write(s)
-                f.write("/\n\n")
-            f.write("ATOMIC_SPECIES\n")
-            for key, value in keywords_dict["ATOMIC_SPECIES"].items():
-                mass = Element(re.findall(r'[A-Za-z]+', key)[0]).atomic_mass.real
-                f.write(key + " " + str(mass) + " " + value + "\n")
-            f.write("\nATOMIC_POSITIONS crystal\n")
-            strs = []
-            for site in struct.sites:
-                strs.append(site.specie.symbol + " " + str(round(site.a, 4)) + " " + str(round(site.b, 4)) + " " + str(round(site.c, 4)))
-            if 'ATOMIC_POSITIONS' in keywords_dict:
-                for idx, vec in enumerate(keywords_dict['ATOMIC_POSITIONS']):
-                    for v in vec:
-                        strs[idx] = strs[idx] + " " + str(int(v))
-            for string in strs:
-                f.write(string + "\n")
-            f.write(f"\nK_POINTS {keywords_dict['K_POINTS']['type']}\n")
-            s = ""
-            for v in keywords_dict['K_POINTS']['vec']:
-                s = s + str(v) + " "
-            f.write("\t" + s + "\n")
-            if not keywords_dict['CELL_PARAMETERS'] == []:
-                f.write("\nCELL_PARAMETERS {angstrom}")
-            for vec in keywords_dict['CELL_PARAMETERS']:
-                s = ""
+                        s = "\t" + k + "=.FALSE,\n"
+                else:
+                    s = "\t" + k + "=" + str(v) + ',\n'
+                f.append(s)
+            f.append("/\n\n")
+        f.append("ATOMIC_SPECIES\n")
+        for key, value in keywords_dict["ATOMIC_SPECIES"].items():
+            mass = Element(re.findall(r'[A-Za-z]+', key)[0]).atomic_mass.real
+            f.append(key + " " + str(mass) + " " + value + "\n")
+        f.append("\nATOMIC_POSITIONS crystal\n")
+        strs = []
+        for site in struct.sites:
+            strs.append(site.specie.symbol + " " + str(round(site.a, 4)) + " " + str(round(site.b, 4)) + " " + str(round(site.c, 4)))
+        if 'ATOMIC_POSITIONS' in keywords_dict:
+            for idx, vec in enumerate(keywords_dict['ATOMIC_POSITIONS']):
                 for v in vec:
-                    s = s + str(round(v, 4)) + " "
-                f.write("\n\t" + s)
+                    strs[idx] = strs[idx] + " " + str(int(v))
+        for string in strs:
+            f.append(string + "\n")
+        f.append(f"\nK_POINTS {keywords_dict['K_POINTS']['type']}\n")
+        s = ""
+        for v in keywords_dict['K_POINTS']['vec']:
+            s = s + str(v) + " "
+        f.append("\t" + s + "\n")
+        if not keywords_dict['CELL_PARAMETERS'] == []:
+            f.append("\nCELL_PARAMETERS {angstrom}")
+        for vec in keywords_dict['CELL_PARAMETERS']:
+            s = ""
+            for v in vec:
+                s = s + str(round(v, 4)) + " "
+            f.append("\n\t" + s)
+        return "".join(f)
 
+    def write_file(self, struct: Structure, keywords: dict):
+        '''method to generate input for QE calculation'''
+        text = self._input_text(struct, keywords)
+        with open(self.path, "w") as f:
+            f.write(text)
@@ -2,78 +2,126 @@ from .FileParser import FileParser
 import re
 from ..base.Structure import Structure
 from ..base.Lattice import Lattice
-from ..base.Atom import Atom
+from .TriggerEngine import Section, Trigger
 import numpy as np
 
+
+def _read_total_energy(state, line):
+    if 'total energy' in line:
+        state["res"]['total_energy'] = float(re.findall(r'[\d|.|,|-]+', line)[0])
+
+def _read_final_coords_line(state, line):
+    if len(line) > 1 and not 'End' in line:
+        state["symbols"].append(re.findall(r'[A-Za-z]+', line)[0])
+        state["coords"].append([float(c) for c in re.findall(r'[\d|.|,|-]+', line)[:3]])
+    else:
+        state["FinalCoordsBlock"] = False
+
+def _read_celldm(state, line):
+    state["param_a"] = float(re.findall(r'[\d|.|,|-]+', line)[1]) * 0.529177 # correction (for some reason the a parameter is scaled) TODO: FIND OUT WHY
+
+def _read_cell_params_line(state, line):
+    if len(line) > 1:
+        vec = np.array([float(c) * state["param_a"] for c in re.findall(r'[\d|.|,|-]+', line)[1:]])
+        state["cell_vectors"].append(vec)
+    else:
+        state["CellParamsBlock"] = False
+
+def _read_cartesian_line(state, line):
+    if len(line) > 1:
+        if not 'site' in line:
+            vec = [w for w in line.split() if not w == '']
+            state["symbols"].append(vec[1])
+            state["coords"].append([float(c) for c in vec[6:9]])
+    else:
+        if state["blank_line_counter"] > 0:
+            state["blank_line_counter"] -= 1
+        if state["blank_line_counter"] <= 0:
+            state["CartesianBlock"] = False
+
+def _start_cell_params(state, line):
+    state["CellParamsBlock"] = True
+    state["cell_vectors"] = []
+
+def _start_final_coords(state, line):
+    state["FinalCoordsBlock"] = True
+    state["symbols"] = []
+    state["coords"] = []
+
+def _start_cartesian(state, line):
+    state["CartesianBlock"] = True
+    state["symbols"] = []
+    state["coords"] = []
+    state["blank_line_counter"] = 1
+
+def _make_structure(state) -> Structure:
+    cell_vectors = state["cell_vectors"]
+    mat = np.array(cell_vectors)
+    # transforming all coordinates (rows) with the cell matrix at once
+    coords = np.array(state["coords"], dtype=float).reshape(-1, 3) @ mat.T
+    lat = Lattice(cell_vectors)
+    structure = Structure(lattice=lat, symbols=state["symbols"], coordinates=coords)
+    return structure
+
+
 class QeOut (FileParser):
 
     extension = "out"
+    program = "qe"
+    signature = b"Program PWSCF"
+    schema = {
+        "total_energy": "float64"
+    }
+
+    def read_scalar_data(self, tail_first: bool=True) -> dict:
+        """Reads scalar data from file to a dictionary.
+        ARGS:
+            - tail_first (bool): read only the last total energy line, found by scanning the file backwards. default=True"""
+        if tail_first:
+            line = self._last_line("total energy", lambda l: "!" in l)
+            return self._extract(["scalar_data"], [line] if line is not None else [])["scalar_data"]
+        return self.read_all(["scalar_data"])["scalar_data"]
+
+    def _scalar_data_section(self) -> Section:
+        # take the last "total energy line"
+        rules = [Trigger("!", _read_total_energy)]
+        return Section(rules, {"res": {}}, lambda state: state["res"])
+
+
+    def read_specie(self, tail_first: bool=True) -> Structure:
+        """Method to read the (last) Structure from the file.
+        ARGS:
+            - tail_first (bool): find the last lattice and atomic positions blocks by scanning the file backwards and parse only them. default=True"""
+        if tail_first:
+            positions = [self._last_block("ATOMIC_POSITIONS", ("\n\n", "End final coordinates")), self._last_block("Cartesian axes")]
+            positions = [b for b in positions if b is not None]
+            blocks = [self._last_block("celldm(1)", ("\n",)), self._last_block("crystal axes")]
+            if len(positions) > 0 and not None in blocks:
+                blocks.append(max(positions, key=lambda b: b[0]))
+                # blocks may end in the middle of a line, each block is passed as a separate chunk
+                chunks = [text if text.endswith("\n") else text + "\n" for _, text in sorted(blocks, key=lambda b: b[0])]
+                return self._extract(["specie"], chunks)["specie"]
+        return self.read_all(["specie"])["specie"]
 
-    def read_scalar_data(self) -> dict:
-        """Reads scalar data from file to a dictionary"""
-        res = {}
-        with open(self.path, "r") as f:
-            for line in f.readlines():
-                if "!" in line and 'total energy' in line:
-                    # take the last "total energy line"
-                    res['total_energy'] = float(re.findall(r'[\d|.|,|-]+', line)[0])
-        return res
-
-
-    def read_specie(self) -> Structure:
-        """Method to read Structure from the file"""
-        with open(self.path, "r") as f:
-            FinalCoordsBlock = False
-            CartesianBlock = False
-            CellParamsBlock = False
-            AtomPosBlock = False
-            CoordsAreCartesian = False
-            atoms = []
-            cell_vectors = []
-            for line in f.readlines():
-                if FinalCoordsBlock is True:
-                    if len(line) > 1 and not 'End' in line:
-                        specie = re.findall(r'[A-Za-z]+', line)[0]
-                        coords = np.array([float(c) for c in re.findall(r'[\d|.|,|-]+', line)[:3]])
-                        atoms.append(Atom(specie, coords))
-                    else:
-                        FinalCoordsBlock = False
-                if 'celldm(1)' in line:
-                    param_a = float(re.findall(r'[\d|.|,|-]+', line)[1]) * 0.529177 # correction (for some reason the a parameter is scaled) TODO: FIND OUT WHY
-                if CellParamsBlock is True:
-                    if len(line) > 1:
-                        vec = np.array([float(c) * param_a for c in re.findall(r'[\d|.|,|-]+', line)[1:]])
-                        cell_vectors.append(vec)
-                    else:
-                        CellParamsBlock = False
-                if CartesianBlock:
-                    if len(line) > 1:
-                        if not 'site' in line:
-                            vec = [w for w in line.split() if not w == '']
-                            atoms.append(Atom(vec[1], np.array([float(c) for c in vec[6:9]])))
-                    else:
-                        if blank_line_counter > 0:
-                            blank_line_counter -= 1
-                        if blank_line_counter <= 0:
-                            CartesianBlock = False
-                if "crystal axes" in line :
-                  CellParamsBlock = True
-                  cell_vectors = []
-                if 'ATOMIC_POSITIONS' in line:
-                    FinalCoordsBlock = True
-                    CoordsAreCartesian = False
-                    atoms = []
-                if "Cartesian axes" in line:
-                    CartesianBlock = True
-                    CoordsAreCartesian = True
-                    atoms = []
-                    blank_line_counter = 1
-            mat = np.array(cell_vectors)
-            for atom in atoms:
-                atom.coordinates = np.matmul(mat, np.transpose(atom.coordinates))
-            lat = Lattice(cell_vectors)
-            print(atoms)
-            return Structure(atoms, lat)
+    def _specie_section(self) -> Section:
+        rules = [
+            Trigger(None, _read_final_coords_line, when="FinalCoordsBlock"),
+            Trigger("celldm(1)", _read_celldm),
+            Trigger(None, _read_cell_params_line, when="CellParamsBlock"),
+            Trigger(None, _read_cartesian_line, when="CartesianBlock"),
+            Trigger("crystal axes", _start_cell_params),
+            Trigger("ATOMIC_POSITIONS", _start_final_coords),
+            Trigger("Cartesian axes", _start_cartesian),
+        ]
+        state = {
+            "FinalCoordsBlock": False,
+            "CartesianBlock": False,
+            "CellParamsBlock": False,
+            "symbols": [],
+            "coords": [],
+            "cell_vectors": []
+        }
+        return Section(rules, state, _make_structure)
 
 
     def write_file(self, specie: Structure, kwdict: dict):
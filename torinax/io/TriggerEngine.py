@@ -0,0 +1,289 @@
+import re
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+# values an action can return
+CONSUME = 1 # the line is done for the section, the next rules of the section are skipped
+STOP = 2 # the section is done, no more lines are needed for it
+
+
+class Trigger:
+
+    """Rule that runs an action on lines of a file.
+    ARGS:
+        - pattern (str): text to look for in the line (regular expression if regex=True). if None, the trigger runs on every line while state[when] is true
+        - action (Callable[[dict, str], Optional[int]]): function called with the section state and the line. may return CONSUME or STOP
+        - regex (bool): the pattern is a regular expression. literal patterns are much faster to look for. default=False
+        - ignore_case (bool): look for the (literal) pattern ignoring case. default=False
+        - when (str): name of a state key, the trigger runs only while the value of the key is true. default=None"""
+
+    __slots__ = ("pattern", "action", "regex", "ignore_case", "when", "_search")
+
+    def __init__(self, pattern: Optional[str], action: Callable[[dict, str], Optional[int]], regex: bool=False, ignore_case: bool=False, when: Optional[str]=None):
+        if pattern is None and when is None:
+            raise ValueError("A trigger without a pattern must have a when key")
+        self.pattern = pattern.lower() if ignore_case else pattern
+        self.action = action
+        self.regex = regex
+        self.ignore_case = ignore_case
+        self.when = when
+        self._search = re.compile(pattern, re.MULTILINE).search if regex else None
+
+    def matches(self, line: str) -> bool:
+        """Method to check if the line contains the pattern of the trigger"""
+        if self.regex:
+            return self._search(line) is not None
+        if self.ignore_case:
+            return self.pattern in line.lower()
+        return self.pattern in line
+
+
+class Block:
+
+    """Block of lines that starts at a header line. The header line is consumed, the rest of the lines go to on_line until the block ends.
+    ARGS:
+        - name (str): state key that is true while the block is active
+        - start (str): text in the header line (regular expression if regex=True)
+        - on_line (Callable[[dict, str], Optional[int]]): called with the state and every line in the block. may end the block by setting state[name] to False
+        - on_start (Callable[[dict, str], Optional[int]]): called with the state and the header line. default=None
+        - end (Callable[[dict, str], bool]): returns True on the line that ends the block, this line is consumed. default=None
+        - regex (bool): the start pattern is a regular expression. default=False"""
+
+    def __init__(self, name: str, start: str, on_line: Callable[[dict, str], Optional[int]], on_start: Optional[Callable[[dict, str], Optional[int]]]=None,
+                    end: Optional[Callable[[dict, str], bool]]=None, regex: bool=False):
+        self.name = name
+        self.start = start
+        self.on_line = on_line
+        self.on_start = on_start
+        self.end = end
+        self.regex = regex
+
+    def _start_action(self, state: dict, line: str):
+        state[self.name] = True
+        if self.on_start is not None:
+            self.on_start(state, line)
+        return CONSUME
+
+    def _line_action(self, state: dict, line: str):
+        if self.end is not None and self.end(state, line):
+            state[self.name] = False
+            return CONSUME
+        return self.on_line(state, line)
+
+    def triggers(self) -> List[Trigger]:
+        """Method to get the triggers of the block. The header trigger comes first, so a new header restarts an active block"""
+        return [Trigger(self.start, self._start_action, regex=self.regex), Trigger(None, self._line_action, when=self.name)]
+
+
+class Section:
+
+    """Declaration of a section of a file: the rules for reading the section data from the lines.
+    ARGS:
+        - rules (List[Union[Trigger, Block]]): rules of the section. rules are applied in order on every line
+        - state (dict): initial state of the section. blocks are added to the state as inactive
+        - result (Callable[[dict], Any]): makes the section data from the state at the end. default=None (returns the state)"""
+
+    def __init__(self, rules: List[Union[Trigger, Block]], state: Optional[dict]=None, result: Optional[Callable[[dict], Any]]=None):
+        self.state = dict(state) if state is not None else {}
+        self.triggers = []
+        for rule in rules:
+            if isinstance(rule, Block):
+                self.state.setdefault(rule.name, False)
+                self.triggers += rule.triggers()
+            else:
+                self.triggers.append(rule)
+        self.result = result if result is not None else lambda state: state
+        # triggers without a pattern, the only ones that can run on lines that match no pattern
+        self.line_triggers = [t for t in self.triggers if t.pattern is None]
+        self.flags = list({t.when for t in self.line_triggers})
+
+    def wants_every_line(self) -> bool:
+        """Method to check if the section has an active trigger without a pattern (must see every line)"""
+        for flag in self.flags:
+            if self.state[flag]:
+                return True
+        return False
+
+    def feed(self, line: str, line_no: int, matched: bool=True) -> bool:
+        """Method to apply the rules of the section on a line. Returns True if the section is done.
+        ARGS:
+            - line (str): the line
+            - line_no (int): index of the line in the file
+            - matched (bool): the line may contain patterns of triggers. if False, only triggers without a pattern are applied. default=True"""
+        state = self.state
+        state["line_no"] = line_no
+        for trigger in (self.triggers if matched else self.line_triggers):
+            if trigger.when is not None and not state[trigger.when]:
+                continue
+            if trigger.pattern is not None and not trigger.matches(line):
+                continue
+            ret = trigger.action(state, line)
+            if ret == CONSUME:
+                break
+            if ret == STOP:
+                return True
+        return False
+
+
+class TriggerEngine:
+
+    """Engine to read several sections of a file in a single pass over its text.
+    The patterns of all the triggers of all the sections are collected to one matcher, that finds the lines matching any pattern in a whole chunk of text
+    at once (with str.find for literal patterns and one combined regular expression for the rest). Only these lines are passed to the sections,
+    except while a section has an active block (or another trigger without a pattern) and needs to see every line.
+    ARGS:
+        - sections (Dict[str, Section]): sections to read by name"""
+
+    def __init__(self, sections: Dict[str, Section]):
+        self.sections = sections
+        self._literals = set()
+        self._lower_literals = set()
+        regexes = []
+        for section in sections.values():
+            for trigger in section.triggers:
+                if trigger.pattern is None:
+                    continue
+                if trigger.regex:
+                    regexes.append("(?:{})".format(trigger.pattern))
+                elif trigger.ignore_case:
+                    self._lower_literals.add(trigger.pattern)
+                else:
+                    self._literals.add(trigger.pattern)
+        self._regex = re.compile("|".join(regexes), re.MULTILINE) if len(regexes) > 0 else None
+
+    @staticmethod
+    def _add_line_starts(text: str, pattern: str, starts: set):
+        """Method to add the start offsets of all lines in the text that contain a literal pattern"""
+        i = text.find(pattern)
+        while i >= 0:
+            starts.add(text.rfind("\n", 0, i) + 1)
+            # skipping to the next line
+            end = text.find("\n", i)
+            if end < 0:
+                break
+            i = text.find(pattern, end + 1)
+
+    def _candidates(self, chunk: str) -> List[int]:
+        """Method to get the sorted start offsets of the lines in the chunk that match any pattern"""
+        starts = set()
+        for pattern in self._literals:
+            self._add_line_starts(chunk, pattern, starts)
+        if len(self._lower_literals) > 0:
+            lowered = chunk.lower()
+            if len(lowered) == len(chunk):
+                for pattern in self._lower_literals:
+                    self._add_line_starts(lowered, pattern, starts)
+            else:
+                # lower case changed offsets (some non ASCII characters), checking line by line
+                pos = 0
+                for line in chunk.splitlines(keepends=True):
+                    if any(pattern in line.lower() for pattern in self._lower_literals):
+                        starts.add(pos)
+                    pos += len(line)
+        if self._regex is not None:
+            match = self._regex.search(chunk)
+            while match is not None:
+                starts.add(chunk.rfind("\n", 0, match.start()) + 1)
+                # the search goes on from the next line, so a match can't hide matches in the following lines
+                end = chunk.find("\n", match.start())
+                if end < 0:
+                    break
+                match = self._regex.search(chunk, end + 1)
+        return sorted(starts)
+
+    def _candidate_lines(self, chunk: str) -> List[int]:
+        """Method to get the sorted indices of the lines in the chunk that match any pattern"""
+        indices = []
+        idx = 0
+        pos = 0
+        for start in self._candidates(chunk):
+            idx += chunk.count("\n", pos, start)
+            pos = start
+            indices.append(idx)
+        return indices
+
+    @staticmethod
+    def _timed(name: str, f: Callable, timings: Dict[str, float]) -> Callable:
+        """Makes a function that adds the run time of f to timings[name]"""
+        def timed(*args):
+            t = perf_counter()
+            try:
+                return f(*args)
+            finally:
+                timings[name] += perf_counter() - t
+        return timed
+
+    def run(self, chunks: Iterable[str], timings: Optional[Dict[str, float]]=None) -> dict:
+        """Method to run the sections on text. Returns a dictionary with section names (keys) and section data (values).
+        ARGS:
+            - chunks (Iterable[str]): chunks of the text. each chunk must end at the end of a line
+            - timings (Dict[str, float]): if given, the time spent in every section (feeding lines and making the result) is added to it, by section name.
+                                          default=None"""
+        running = dict(self.sections)
+        res = {}
+        feeders = {name: section.feed for name, section in running.items()}
+        results = {name: section.result for name, section in running.items()}
+        if timings is not None:
+            for name in running:
+                timings.setdefault(name, 0)
+                feeders[name] = self._timed(name, feeders[name], timings)
+                results[name] = self._timed(name, results[name], timings)
+        # sections that must see every line
+        active = [name for name, section in running.items() if section.wants_every_line()]
+        line_no = 0
+        for chunk in chunks:
+            candidates = self._candidate_lines(chunk)
+            lines = chunk.split("\n")
+            # the text after the last new line is a line only at the end of the file
+            n_lines = len(lines) - 1 if lines[-1] == "" else len(lines)
+            i = 0
+            k = 0
+            while i < n_lines and len(running) > 0:
+                if k < len(candidates) and candidates[k] == i:
+                    matched = True
+                    k += 1
+                elif len(active) > 0:
+                    matched = False
+                elif k < len(candidates):
+                    # no section needs the lines until the next matching line
+                    i = candidates[k]
+                    matched = True
+                    k += 1
+                else:
+                    break
+                line = lines[i] + "\n" if i < len(lines) - 1 else lines[i]
+                for name in (list(running) if matched else list(active)):
+                    section = running[name]
+                    if feeders[name](line, line_no + i, matched):
+                        res[name] = results[name](section.state)
+                        running.pop(name)
+                        if name in active:
+                            active.remove(name)
+                        continue
+                    if section.wants_every_line():
+                        if not name in active:
+                            active.append(name)
+                    elif name in active:
+                        active.remove(name)
+                i += 1
+            # stops reading if all sections are done
+            if len(running) == 0:
+                break
+            line_no += len(lines) - 1
+        for name, section in running.items():
+            res[name] = results[name](section.state)
+        return res
+
+
+def set_value(key: str, index: int, dtype: type=float) -> Callable[[dict, str], None]:
+    """Makes an action that sets state[key] to the index-th word of the line, converted to dtype"""
+    def action(state, line):
+        state[key] = dtype(line.split()[index])
+    return action
+
+
+def set_flag(key: str, value: Any=True) -> Callable[[dict, str], None]:
+    """Makes an action that sets state[key] to a constant value"""
+    def action(state, line):
+        state[key] = value
+    return action
@@ -1,8 +1,6 @@
-from .OrcaIn import OrcaIn
-from .OrcaOut import OrcaOut
-from .FileParser import FileParser
-try:
-    from .LammpsIn import LammpsIn
-    from .QeIn import QeIn
-except ModuleNotFoundError:
-    pass
\ No newline at end of file
+from ..lazy import lazy_package
+
+# parsers are imported on first use (LammpsIn and QeIn require pymatgen)
+lazy_package(__name__, {"FileParser": ".FileParser", "AbinitIn": ".AbinitIn", "LammpsIn": ".LammpsIn", "MopacIn": ".MopacIn", "MopacOut": ".MopacOut",
+                        "OrcaIn": ".OrcaIn", "OrcaOut": ".OrcaOut", "QeIn": ".QeIn", "QeOut": ".QeOut",
+                        "register_parser": ".registry", "registered_parsers": ".registry", "sniff_parser": ".registry"})
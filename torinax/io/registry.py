@@ -0,0 +1,50 @@
+from importlib import import_module
+from typing import List, Optional, Sequence
+from .FileParser import FileParser
+
+# parsers of files that are identified by their content (see FileParser.sniff), in the order they are tried.
+# given as "module.Class" until first use, so the parsers are imported only when files are sniffed
+_PARSERS = ["torinax.io.OrcaOut.OrcaOut", "torinax.io.MopacOut.MopacOut", "torinax.io.QeOut.QeOut"]
+
+
+def register_parser(file_parser, first: bool=False):
+    """Method to add a file parser to the registry of parsers that are identified by content.
+    ARGS:
+        - file_parser (FileParser): the file parser class. must define a signature (or override sniff)
+        - first (bool): try the parser before the registered parsers (for parsers with more specific signatures). default=False"""
+    if file_parser.signature is None and file_parser.sniff.__func__ is FileParser.sniff.__func__:
+        raise ValueError("File parser {} has no signature, it can't be identified by content".format(file_parser.__name__))
+    if file_parser in registered_parsers():
+        return
+    if first:
+        _PARSERS.insert(0, file_parser)
+    else:
+        _PARSERS.append(file_parser)
+
+
+def registered_parsers() -> List[type]:
+    """Method to get the registered file parsers (in the order they are tried)"""
+    for i, parser in enumerate(_PARSERS):
+        if isinstance(parser, str):
+            module, name = parser.rsplit(".", 1)
+            _PARSERS[i] = getattr(import_module(module), name)
+    return list(_PARSERS)
+
+
+def sniff_parser(path: str, parsers: Optional[Sequence[type]]=None) -> Optional[type]:
+    """Method to find the parser of a file by its extension and its first bytes (only the first sniff_size bytes of the file are read).
+    ARGS:
+        - path (str): path to the file
+        - parsers (Sequence[FileParser]): the candidate parsers, in the order they are tried. default=None (the registered parsers)
+    RETURNS:
+        (FileParser) the first parser that matches the file, None if there is no such parser"""
+    parsers = parsers if parsers is not None else registered_parsers()
+    candidates = [parser for parser in parsers if path.endswith(parser.extension)]
+    if len(candidates) == 0:
+        return None
+    with open(path, "rb") as f:
+        head = f.read(max(parser.sniff_size for parser in candidates))
+    for parser in candidates:
+        if parser.sniff(head):
+            return parser
+    return None
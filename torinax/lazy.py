@@ -0,0 +1,73 @@
+import sys
+import types
+import importlib
+import importlib.util
+from typing import Dict
+
+
+class LazyModule (types.ModuleType):
+
+    """A module that is imported on first use (attribute access), for heavy dependencies that only some functions need.
+    ARGS:
+        - name (str): full name of the module"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+
+    def _load(self) -> types.ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+
+def module_available(name: str) -> bool:
+    """Method to check if a module can be imported, without importing it"""
+    return importlib.util.find_spec(name) is not None
+
+
+def _attribute(module: types.ModuleType, name: str):
+    """Method to get the lazy attribute of a package from its module: the object of the same name in the module, or the module itself
+    (for sub-packages, a module of the same name in a sub-package is not the attribute, e.g. utils.utils)"""
+    value = getattr(module, name, None)
+    return module if value is None or isinstance(value, types.ModuleType) else value
+
+
+class LazyPackage (types.ModuleType):
+
+    """Module type of packages with lazily imported attributes (see lazy_package)"""
+
+    def __getattr__(self, name: str):
+        attributes = self.__dict__.get("_lazy_attributes", {})
+        if not name in attributes:
+            raise AttributeError("module {!r} has no attribute {!r}".format(self.__name__, name))
+        value = _attribute(importlib.import_module(attributes[name], self.__name__), name)
+        # the attribute is set on the package, so the import runs only once
+        setattr(self, name, value)
+        return value
+
+    def __setattr__(self, name: str, value):
+        # importing a submodule sets it as an attribute of the package. for attributes defined in a module of the same name (OrcaOut.OrcaOut)
+        # the attribute is kept, as if it was imported with from .OrcaOut import OrcaOut
+        attributes = self.__dict__.get("_lazy_attributes", {})
+        if isinstance(value, types.ModuleType) and name in attributes:
+            value = _attribute(value, name)
+        super().__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()).union(self.__dict__.get("_lazy_attributes", {})))
+
+
+def lazy_package(name: str, attributes: Dict[str, str]):
+    """Method to make the attributes of a package lazy: each is imported from its module on first use, so importing the package doesn't import
+    the (possibly heavy or missing) dependencies of all its modules. Call it in the __init__ of the package.
+    ARGS:
+        - name (str): name of the package (__name__)
+        - attributes (Dict[str, str]): attribute names and the (relative) modules they are defined in. the attribute is the object of the same name
+                                       in the module, or the module itself if it has no such object (for sub-packages)"""
+    package = sys.modules[name]
+    package.__class__ = LazyPackage
+    package._lazy_attributes = dict(attributes)
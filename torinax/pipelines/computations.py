@@ -1,13 +1,21 @@
-from typing import Dict, List, Tuple, Optional
-from sqlalchemy import Column, String
-from sqlalchemy import create_engine
+from typing import Dict, List, Set, Tuple, Optional, Union
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from sqlalchemy import Column, String, Float, select, tuple_
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from abc import ABC, abstractclassmethod
-from torinax.clients import SlurmClient
-#from dask.distributed import Client
+from torinax.clients import SlurmClient, LocalClient
 from time import time
-import dask as da
 from . import SqlBase
+from .database import make_sqlite_engine
+from ..Recorder import timer
+from ..lazy import LazyModule
+
+# dask is only needed by DaskComputation
+da = LazyModule("dask")
 
 
 def model_lookup_by_table_name(table_name: str):
@@ -31,6 +39,20 @@ def comp_sql_model_creator(comp_name: str, results_attr: Dict[str, Column]):
     return type(comp_name, (SqlBase, ), attr_dict)
 
 
+class ComputationCheckpoint (SqlBase):
+
+    """Progress record of a computation in the pipeline database (status is running, done or incomplete if some entries failed,
+    times are UNIX timestamps)"""
+
+    __tablename__ = "computation_checkpoints"
+    __table_args__ = {'extend_existing': True}
+
+    tablename = Column(String, primary_key=True)
+    status = Column(String)
+    started = Column(Float)
+    finished = Column(Float)
+
+
 class Computation (ABC):
 
     """Abstract computation object"""
@@ -38,6 +60,17 @@ class Computation (ABC):
     tablename = "computation"
     name = "computation"
     __results_columns__ = {}
+    # names of the tables the computation reads and writes (its own table is always written), used to run independent
+    # computations at the same time. None if unknown (the computation runs after all previous computations and before all next ones)
+    reads = None
+    writes = None
+    # results are saved with batched core inserts (instead of adding ORM objects to the session), committed every batch_size rows.
+    # with upsert, rows with an existing primary key are updated
+    bulk_insert = False
+    batch_size = 10000
+    upsert = False
+    # set by run_computations when resuming a pipeline, computations should then run only for entries without results (see pending_entries)
+    resume = False
 
     def __init__(self):
         self.successful = False
@@ -59,25 +92,127 @@ class Computation (ABC):
         """Method to run before a computation is ran"""
         pass
 
+    def _insert_statement(self, table, db_session):
+        """Method to make the insert (or upsert) statement of a table"""
+        if not self.upsert:
+            return table.insert()
+        dialects = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+        dialect = db_session.get_bind().dialect.name
+        if not dialect in dialects:
+            raise ValueError("Upserts are supported only for {} databases, got {}".format(", ".join(dialects), dialect))
+        stmt = dialects[dialect](table)
+        keys = [c.name for c in table.primary_key.columns]
+        return stmt.on_conflict_do_update(index_elements=keys, set_={c.name: stmt.excluded[c.name] for c in table.columns if not c.name in keys})
+
+    def _insert_batch(self, db_session, batch: list):
+        """Method to insert a batch of results (dicts or ORM objects) and commit"""
+        # rows are grouped by table and columns, every group is inserted with one statement
+        groups = {}
+        for entry in batch:
+            if isinstance(entry, dict):
+                table, row = self.sql_model.__table__, entry
+                unknown = [key for key in row if not key in table.columns]
+                if len(unknown) > 0:
+                    raise ValueError("Unknown columns {} in entry of table {}".format(", ".join(unknown), table.name))
+            else:
+                state = inspect(entry)
+                if state.pending:
+                    # objects that were added to the session are inserted by the session (on commit)
+                    continue
+                if state.persistent or state.detached:
+                    # objects that are already in the database are updated by the session
+                    db_session.merge(entry)
+                    continue
+                table = state.mapper.local_table
+                row = {attr.columns[0].name: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+            groups.setdefault((table, tuple(row)), []).append(row)
+        for (table, _), rows in groups.items():
+            db_session.execute(self._insert_statement(table, db_session), rows)
+        db_session.commit()
+
+    def save_entries(self, db_session, entries):
+        """Method to save results to the database with batched inserts, a commit per batch.
+        ARGS:
+            - db_session: session of SQL database
+            - entries (Iterable[Union[dict, SqlBase]]): results, as dicts (rows of the computation table) or ORM objects"""
+        entries = iter(entries)
+        while True:
+            batch = list(islice(entries, self.batch_size))
+            if len(batch) == 0:
+                break
+            if self.resume and not self.upsert:
+                batch = self._unsaved_entries(db_session, batch)
+            self._insert_batch(db_session, batch)
+
+    def pending_entries(self, db_session, entries: list) -> List[int]:
+        """Method to get the entries that have no result row in the database yet (by primary key).
+        ARGS:
+            - db_session: session of SQL database
+            - entries (List[Union[dict, SqlBase]]): entries, as dicts (rows of the computation table) or ORM objects
+        RETURNS:
+            (List[int]) indices of the entries without a row"""
+        # primary keys of the entries, grouped by table
+        keys = {}
+        for i, entry in enumerate(entries):
+            if isinstance(entry, dict):
+                table = self.sql_model.__table__
+                key = tuple(entry.get(c.name) for c in table.primary_key.columns)
+            else:
+                mapper = inspect(entry).mapper
+                table = mapper.local_table
+                key = tuple(mapper.primary_key_from_instance(entry))
+            keys.setdefault(table, []).append((i, key))
+        pending = []
+        for table, table_keys in keys.items():
+            columns = list(table.primary_key.columns)
+            column = columns[0] if len(columns) == 1 else tuple_(*columns)
+            existing = set()
+            for start in range(0, len(table_keys), 500):
+                batch = [key if len(columns) > 1 else key[0] for _, key in table_keys[start:start + 500]]
+                rows = db_session.execute(select(*columns).where(column.in_(batch)))
+                existing.update(tuple(row) for row in rows)
+            pending += [i for i, key in table_keys if not key in existing]
+        return sorted(pending)
+
+    def _unsaved_entries(self, db_session, entries: list) -> list:
+        """Method to drop the entries whose rows were saved before a resumed pipeline stopped (so they are not inserted twice).
+        ORM objects loaded from the database are kept, the session updates them"""
+        pending = set(self.pending_entries(db_session, entries))
+        return [entry for i, entry in enumerate(entries) if i in pending or (not isinstance(entry, dict) and inspect(entry).persistent)]
+
     def _execute(self, db_session):
         """Internal method to execute a computation"""
-        # executing all commands
-        self.pre_execution(db_session)
-        entries = self.execute(db_session)
-        self.post_execution(db_session)
+        # executing all commands. execute can set successful to False if some of the entries failed
+        self.successful = True
+        with timer("computation", self.name, phase="pre_execution"):
+            self.pre_execution(db_session)
+        with timer("computation", self.name, phase="execute"):
+            entries = self.execute(db_session)
+        with timer("computation", self.name, phase="post_execution"):
+            self.post_execution(db_session)
         # updating db with new results
-        if len(entries) > 0:
-            db_session.add_all(entries)
-            db_session.commit()
+        with timer("computation", self.name, phase="commit"):
+            if self.resume and not self.bulk_insert:
+                # rows saved before the pipeline stopped are not added again (save_entries skips them batch by batch)
+                entries = self._unsaved_entries(db_session, entries)
+            if self.bulk_insert:
+                self.save_entries(db_session, entries)
+            elif len(entries) > 0:
+                db_session.add_all(entries)
+                db_session.commit()
 
 
 class SlurmComputation (Computation):
 
-    """Abstract computation to be executed in parallel on a SLURM cluster"""
+    """Abstract computation to be executed in parallel on a SLURM cluster (or on the local machine, with a LocalClient).
+    ARGS:
+        - slurm_client (Union[SlurmClient, LocalClient]): client to submit the commands with (large command lists are split to several array jobs by SlurmClient)
+        - job_limit (int): maximal number of commands in one execution. default=None (no limit)"""
 
     tablename = "slurm_computation"
+    bulk_insert = True
 
-    def __init__(self, slurm_client: SlurmClient, job_limit=5000):
+    def __init__(self, slurm_client: Union[SlurmClient, LocalClient], job_limit: Optional[int]=None):
         self.client = slurm_client
         self.job_limit = job_limit
         super().__init__()
@@ -88,23 +223,59 @@ class SlurmComputation (Computation):
         pass
 
     def execute(self, db_session) -> List[SqlBase]:
-        """Execute list of command-line arguments on a SLURM cluster"""
+        """Execute list of command-line arguments with the client (on a SLURM cluster or locally)"""
         entries, cmds = self.make_cmd_list(db_session)
-        if len(cmds) > self.job_limit:
+        per_entry = len(entries) == len(cmds)
+        # when resuming, commands (one per entry) run only for entries without results
+        if self.resume and per_entry:
+            pending = self.pending_entries(db_session, entries)
+            entries = [entries[i] for i in pending]
+            cmds = [cmds[i] for i in pending]
+            if len(cmds) == 0:
+                return []
+        if self.job_limit is not None and len(cmds) > self.job_limit:
             raise RuntimeError("Too many jobs are requested {} (max allowed {})".format(len(cmds), self.job_limit))
         # submit to client
         self.client.submit(cmds)
         # wating for task completion
         self.client.wait()
+        results = self.client.command_results
+        # commands that failed or didn't finish make the computation incomplete, so it runs again on resume
+        self.successful = len(results) == len(cmds) and all(res["exit_code"] == 0 for res in results)
+        if per_entry:
+            # only entries of successful commands are saved, the others run again on the next resume
+            if len(results) == len(cmds):
+                exit_codes = [res["exit_code"] for res in results]
+            else:
+                # results that can't be matched by order are attributed by command, only for commands that appear once
+                counts = {}
+                for cmd in cmds:
+                    counts[cmd] = counts.get(cmd, 0) + 1
+                by_cmd = {res["command"]: res["exit_code"] for res in results if counts.get(res["command"]) == 1}
+                exit_codes = [by_cmd.get(cmd) for cmd in cmds]
+            entries = [entry for entry, code in zip(entries, exit_codes) if code == 0]
         return entries
 
 class DaskComputation (Computation):
 
+    """Abstract computation to be executed in parallel on a Dask cluster.
+    ARGS:
+        - dask_client (distributed.Client): client of the cluster
+        - n_workers (int): number of workers. default=1
+        - as_completed (bool): save every result (in batches of batch_size) as soon as its task finishes, instead of waiting for all tasks.
+                               failed tasks are recorded in failed_tasks without stopping the computation. default=False
+        - max_in_flight (int): maximal number of tasks submitted to the cluster at a time in as_completed mode. default=1000"""
+
     tablename = "dask_computation"
+    bulk_insert = True
 
-    def __init__(self, dask_client, n_workers: int=1):
+    def __init__(self, dask_client, n_workers: int=1, as_completed: bool=False, max_in_flight: int=1000):
         self.n_workers = n_workers
         self.client = dask_client
+        self.as_completed = as_completed
+        self.max_in_flight = max_in_flight
+        # (task index, error) of the tasks that failed in the last as_completed execution
+        self.failed_tasks = []
         super().__init__()
 
     @abstractclassmethod
@@ -112,33 +283,199 @@ class DaskComputation (Computation):
         """Method to future objects to be executed on Dask client"""
         pass
 
-    def execute(self, db_session) -> List[SqlBase]:
+    def _iter_completed(self, tasks):
+        """Method to iterate over the results of tasks (delayed objects or futures) as they finish. At most max_in_flight tasks are submitted
+        at a time, and results are released from the cluster once they are read"""
+        if self.client is None:
+            raise ValueError("as_completed mode requires a dask distributed client")
+        from dask.distributed import Future, as_completed as dd_as_completed
+        tasks = enumerate(tasks)
+        indices = {}
+
+        def submit(n):
+            futures = []
+            for i, task in islice(tasks, n):
+                future = task if isinstance(task, Future) else self.client.compute(task)
+                indices[future] = i
+                futures.append(future)
+            return futures
+
+        completed = dd_as_completed(submit(self.max_in_flight), with_results=False)
+        for future in completed:
+            i = indices.pop(future)
+            if future.status == "finished":
+                yield future.result()
+            else:
+                error = future.exception() if future.status == "error" else future.status
+                self.failed_tasks.append((i, repr(error)))
+            future.release()
+            # keeping max_in_flight tasks on the cluster
+            for new_future in submit(1):
+                completed.add(new_future)
+
+    def execute(self, db_session) -> List[Union[dict, SqlBase]]:
         """Execute list of dask futures on a Dask cluster"""
         #self.client.cluster.scale(self.n_workers)
         futures = self.make_futures(db_session)
+        if self.as_completed:
+            self.failed_tasks = []
+            self.save_entries(db_session, self._iter_completed(futures))
+            if len(self.failed_tasks) > 0:
+                self.successful = False
+                print("WARNING: {} tasks of {} failed, see failed_tasks".format(len(self.failed_tasks), self.name))
+            return []
         dicts = da.compute(futures)[0]
         #self.client.cluster.scale(0)
+        # with bulk inserts the result dicts are inserted as they are, without making ORM objects
+        if self.bulk_insert:
+            return dicts
         return [self.sql_model(**d) for d in dicts]
 
-def run_computations(computations: List[Computation], db_path: Optional[str]=None, db_engine=None, db_session=None, verbose: int=1):
-    """Method to execute multiple computations consecutively, and save results to a database file"""
+def _computation_tables(comp: Computation) -> Tuple[Optional[Set[str]], Set[str]]:
+    """Method to get the tables a computation reads (None if unknown) and writes"""
+    reads = set(comp.reads) if comp.reads is not None else None
+    writes = set(comp.writes) if comp.writes is not None else set()
+    if comp.tablename:
+        writes.add(comp.tablename)
+    return reads, writes
+
+def _computation_client(comp: Computation):
+    """Method to get the client a computation submits its jobs with (None if it has none)"""
+    return getattr(comp, "client", None)
+
+def computation_dependencies(computations: List[Computation]) -> List[Set[int]]:
+    """Method to get the dependencies between computations. A computation depends on a previous one if one of them writes a table
+    the other reads or writes, if the tables of one of them are unknown, or if they share a client (clients track the jobs of
+    one computation at a time, see SlurmClient and LocalClient).
+    ARGS:
+        - computations (List[Computation]): computations, in the order they were given
+    RETURNS:
+        (List[Set[int]]) indices of the previous computations every computation depends on"""
+    tables = [_computation_tables(comp) for comp in computations]
+    dependencies = []
+    for j, (reads_j, writes_j) in enumerate(tables):
+        deps = set()
+        for i, (reads_i, writes_i) in enumerate(tables[:j]):
+            if reads_i is None or reads_j is None or len(writes_i & (reads_j | writes_j)) > 0 or len(writes_j & reads_i) > 0:
+                deps.add(i)
+            elif _computation_client(computations[i]) is not None and _computation_client(computations[i]) is _computation_client(computations[j]):
+                deps.add(i)
+        dependencies.append(deps)
+    return dependencies
+
+def _run_computation(comp: Computation, session, verbose: int):
+    """Method to run a computation in a database session. The start and end of the computation are recorded in its checkpoint"""
+    if verbose > 0:
+        print("Running {}".format(comp.name))
+    t1 = time()
+    if comp.tablename:
+        session.merge(ComputationCheckpoint(tablename=comp.tablename, status="running", started=t1, finished=None))
+        session.commit()
+    comp._execute(session)
+    t2 = time()
+    if comp.tablename:
+        status = "done" if comp.successful else "incomplete"
+        session.merge(ComputationCheckpoint(tablename=comp.tablename, status=status, started=t1, finished=t2))
+        session.commit()
+    if verbose > 0:
+        print("{} done in {} seconds".format(comp.name, round(t2 - t1, 3)))
+
+def _run_computation_in_new_session(comp: Computation, make_session, verbose: int):
+    """Method to run a computation with its own database session (for computations running in threads)"""
+    session = make_session()
+    try:
+        _run_computation(comp, session, verbose)
+    finally:
+        session.close()
+
+def _is_thread_local_sqlite(engine) -> bool:
+    """Method to check if the connections of an engine are an in-memory SQLite database per thread (so a thread doesn't see the tables of the others)"""
+    return engine.dialect.name == "sqlite" and engine.url.database in (None, "", ":memory:") and not isinstance(engine.pool, StaticPool)
+
+def run_computations(computations: List[Computation], db_path: Optional[str]=None, db_engine=None, db_session=None, verbose: int=1,
+                        n_workers: Optional[int]=None, resume: bool=False):
+    """Method to execute multiple computations and save results to a database file. With a database path, engine or session factory,
+    computations that don't depend on each other (see Computation.reads and Computation.writes) run at the same time, each in its own thread
+    and database session. With a database session, the computations run one at a time in the given order, in that session (so they see its
+    uncommitted changes, as in-memory SQLite databases require).
+    ARGS:
+        - computations (List[Computation]): computations to run. dependent computations run in the given order
+        - db_path (str): path to SQLite database file (opened with make_sqlite_engine)
+        - db_engine: SQLAlchemy engine of the database
+        - db_session (Union[Session, sessionmaker]): SQLAlchemy session of the database (computations run serially in it) or a session factory
+                                                     (computations run concurrently, each in a new session)
+        - verbose (int): print the progress of the computations if > 0. default=1
+        - n_workers (int): maximal number of computations running at the same time. default=None (no limit)
+        - resume (bool): resume a pipeline that stopped. computations that are done (by their checkpoints) are skipped, the other computations
+                         (also ones with failed entries) are run with resume=True, so they run only for entries without results. default=False"""
     if not db_engine and not db_path and not db_session:
         raise ValueError("Must provide a value for either db_engine or db_path or db_session")
-    # creating database session
-    if not db_session:
+    session = None
+    if isinstance(db_session, sessionmaker):
+        engine = db_session.kw.get("bind")
+        if engine is None:
+            raise ValueError("The session factory must be bound to an engine")
+        make_session = db_session
+    elif db_session:
+        # the caller's session is used as is, tables are created in its transaction
+        session = db_session
+        SqlBase.metadata.create_all(session.connection())
+    else:
         if db_engine:
             engine = db_engine
         elif db_path:
-            engine = create_engine("sqlite3///{}".format(db_path))
+            engine = make_sqlite_engine(db_path)
+        make_session = sessionmaker(bind=engine)
+    if session is None:
+        # tables of all computations (and the checkpoints table)
         SqlBase.metadata.create_all(engine)
-        session = sessionmaker(bind=engine)()
-    else:
-        session = db_session
+        if _is_thread_local_sqlite(engine):
+            # threads would get different databases, running serially in one session of this thread
+            session = make_session()
+    dependencies = computation_dependencies(computations)
+    done = set()
+    if resume:
+        resume_session = session if session is not None else make_session()
+        finished = {row.tablename for row in resume_session.query(ComputationCheckpoint).filter_by(status="done")}
+        if session is None:
+            resume_session.close()
+        for i, comp in enumerate(computations):
+            if comp.tablename in finished:
+                if verbose > 0:
+                    print("Skipping {} (done)".format(comp.name))
+                done.add(i)
     for comp in computations:
-        if verbose > 0:
-            print("Running {}".format(comp.name))
-        t1 = time()
-        comp._execute(session)
-        t2 = time()
-        if verbose > 0:
-            print("{} done in {} seconds".format(comp.name, round(t2 - t1, 3)))
+        comp.resume = resume
+    if session is not None:
+        try:
+            for i, comp in enumerate(computations):
+                if not i in done:
+                    _run_computation(comp, session, verbose)
+        finally:
+            if not session is db_session:
+                session.close()
+        return
+    running = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=n_workers or max(1, len(computations))) as executor:
+        while len(done) < len(computations):
+            # starting all computations whose dependencies are done (none after a failure)
+            if error is None:
+                started = set(done).union(running.values())
+                for i, comp in enumerate(computations):
+                    if not i in started and dependencies[i] <= done:
+                        running[executor.submit(_run_computation_in_new_session, comp, make_session, verbose)] = i
+            if len(running) == 0:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = running.pop(future)
+                try:
+                    future.result()
+                    done.add(i)
+                except Exception as err:
+                    # running computations are finished, the dependent ones don't start
+                    if error is None:
+                        error = err
+    if error is not None:
+        raise error
@@ -0,0 +1,51 @@
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool, StaticPool
+
+
+def sqlite_url(db_path: str) -> str:
+    """Method to make the SQLAlchemy URL of an SQLite database file (':memory:' for an in-memory database)"""
+    if db_path == ":memory:":
+        return "sqlite://"
+    return "sqlite:///{}".format(os.path.abspath(db_path))
+
+
+def make_sqlite_engine(db_path: str, busy_timeout: float=60, synchronous: str="NORMAL", cache_size_mb: int=64, mmap_size_mb: int=256,
+                        pool_size: int=8, max_overflow: int=8, echo: bool=False):
+    """Method to make an SQLAlchemy engine of an SQLite database, tuned for concurrent use. The database is in WAL journal mode,
+    so readers don't block the writer (and the other way around), and waiting writers retry for busy_timeout seconds before failing.
+    ARGS:
+        - db_path (str): path to the database file (':memory:' for an in-memory database, shared by all threads)
+        - busy_timeout (float): number of seconds to wait for a lock on the database. default=60
+        - synchronous (str): SQLite synchronous mode (OFF, NORMAL, FULL or EXTRA). NORMAL is safe in WAL mode. default='NORMAL'
+        - cache_size_mb (int): page cache size of every connection in MB. default=64
+        - mmap_size_mb (int): size of memory mapped I/O of every connection in MB. default=256
+        - pool_size (int): number of connections kept in the pool. default=8
+        - max_overflow (int): number of connections allowed above the pool size. default=8
+        - echo (bool): log the SQL statements. default=False
+    RETURNS:
+        (Engine) the engine"""
+    if not synchronous.upper() in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        raise ValueError("Unknown synchronous mode {}. supported modes are OFF, NORMAL, FULL and EXTRA".format(synchronous))
+    # connections are used by several threads (one at a time), the pool takes care of that
+    connect_args = {"timeout": busy_timeout, "check_same_thread": False}
+    if db_path == ":memory:":
+        # every connection to ':memory:' is a different database, so one connection is shared
+        engine = create_engine(sqlite_url(db_path), connect_args=connect_args, poolclass=StaticPool, echo=echo)
+    else:
+        engine = create_engine(sqlite_url(db_path), connect_args=connect_args, poolclass=QueuePool, pool_size=pool_size,
+                                max_overflow=max_overflow, echo=echo)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous={}".format(synchronous.upper()))
+        cursor.execute("PRAGMA busy_timeout={}".format(int(busy_timeout * 1000)))
+        # negative cache size is in KiB
+        cursor.execute("PRAGMA cache_size=-{}".format(int(cache_size_mb * 1024)))
+        cursor.execute("PRAGMA mmap_size={}".format(int(mmap_size_mb * 1024 * 1024)))
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    return engine
@@ -1,8 +1,4 @@
-try: 
-    import openbabel as ob
-    from .openbabel import atomic_numer_to_symbol, atomic_symbol_to_number
-except ImportError:
-    try:
-        pass
-    except ImportError:
-        pass
\ No newline at end of file
+from ..lazy import lazy_package
+
+# the openbabel bridge is imported on first use (requires openbabel)
+lazy_package(__name__, {"atomic_numer_to_symbol": ".openbabel", "atomic_symbol_to_number": ".openbabel"})
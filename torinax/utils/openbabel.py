@@ -1,6 +1,6 @@
 import openbabel as ob
+import numpy as np
 from ..base.Molecule import Molecule
-from ..base.Atom import Atom
 from ..base.Bond import Bond
 
 def ob_read_file_to_molecule(filename):    
@@ -10,12 +10,12 @@ def ob_read_file_to_molecule(filename):
     return obmol_to_molecule(obmol)
 
 def obmol_to_molecule(obmol: ob.OBMol):
-    atoms = []
+    symbols = []
+    coords = []
     for atom in ob.OBMolAtomIter(obmol):
-        element = ob.OBElementTable().GetSymbol(atom.GetAtomicNum())
-        coord = [atom.GetX(), atom.GetY(), atom.GetZ()]
-        atoms.append(Atom(element, coord))
-    mol = Molecule(atoms)
+        symbols.append(ob.OBElementTable().GetSymbol(atom.GetAtomicNum()))
+        coords.append([atom.GetX(), atom.GetY(), atom.GetZ()])
+    mol = Molecule(symbols=symbols, coordinates=np.array(coords))
     for bond in ob.OBMolBondIter(obmol):
         bond = Bond(bond.GetBeginAtomIdx() - 1, bond.GetEndAtomIdx() - 1, bond.GetBO())
         mol.add_bond(bond)
@@ -23,11 +23,12 @@ def obmol_to_molecule(obmol: ob.OBMol):
 
 def molecule_to_obmol(molecule: Molecule):
     obmol = ob.OBMol()
-    for atom in molecule.atoms:
+    for symbol, coords in zip(molecule.symbols, molecule.coordinates):
         obatom = ob.OBAtom()
-        obatom.SetAtomicNum(ob.OBElementTable().GetAtomicNum(atom.symbol))
-        if not len(atom.coordinates) == 0:
-            coord_vec = ob.vector3(*atom.coordinates)
+        obatom.SetAtomicNum(ob.OBElementTable().GetAtomicNum(symbol))
+        # atoms without coordinates have NaN coordinates
+        if not np.isnan(coords).any():
+            coord_vec = ob.vector3(*coords)
             obatom.SetVector(coord_vec)
         obmol.InsertAtom(obatom)
     for bond in molecule.bonds:
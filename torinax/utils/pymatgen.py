@@ -2,27 +2,24 @@ from pymatgen.core import Structure as pmtStructure
 from pymatgen.core import Lattice as pmtLattice
 from pymatgen.core import PeriodicSite as pmtSite
 from ..base.Lattice import Lattice
-from ..base.Atom import Atom
 from ..base.Structure import Structure
 
 
 def pmt_struct_to_structure(pmt_struct: pmtStructure):
     """Method to convert pymatgen.Structure element to internal Structure element"""
     lat = Lattice(pmt_struct.lattice.matrix)
-    atoms = []
-    for site in pmt_struct.sites:
-        atoms.append(Atom(site.specie.symbol, site.coords))
-    return Structure(atoms, lat)
+    symbols = [site.specie.symbol for site in pmt_struct.sites]
+    return Structure(lattice=lat, symbols=symbols, coordinates=pmt_struct.cart_coords)
 
 
 def structure_to_pmt_structure(structure):
     """Method to convert internal Structure element to pymatgen Structure element"""
     lat = pmtLattice(structure.lattice.vectors)
     sites = []
-    for atom in structure.atoms:
+    for symbol, coords in zip(structure.symbols, structure.coordinates):
         sites.append(pmtSite(
-            atom.symbol,
-            atom.coordinates,
+            symbol,
+            coords,
             lat,
             coords_are_cartesian=True
         ))